@@ -0,0 +1 @@
+"""Performance benchmarks for cortalv2i (see benchmarks.run)."""
@@ -0,0 +1,177 @@
+"""Benchmark cases, each run in a fresh interpreter so peak RSS is per case.
+
+Usage (normally invoked by benchmarks.run):
+    python -m benchmarks.cases <case> <spec json> <video path> <work dir>
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict
+
+from benchmarks.synthetic import VideoSpec
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def fps_extractor(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.frame_extractor import FPSFrameExtractor
+    return FPSFrameExtractor(work_dir, fps=5).extract_frames(video)
+
+
+def interval_extractor(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.frame_extractor import TimeIntervalFrameExtractor
+    return TimeIntervalFrameExtractor(work_dir, time_interval=0.5).extract_frames(video)
+
+
+def change_extractor(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.frame_extractor import ChangeDetectionFrameExtractor
+    return ChangeDetectionFrameExtractor(work_dir, threshold=0.1).extract_frames(video)
+
+
+def processor_fps(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.video_processor import VideoProcessor
+    config = {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg'}
+    return len(VideoProcessor(frames_dir=work_dir).extract_frames(video, 0, spec.frame_count, config))
+
+
+def processor_scene(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.video_processor import VideoProcessor
+    config = {'method': 'scene', 'params': {'threshold': 0.1}, 'output_format': 'jpg'}
+    return len(VideoProcessor(frames_dir=work_dir).extract_frames(video, 0, spec.frame_count, config))
+
+
+def processor_keyframes(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.video_processor import VideoProcessor
+    config = {'method': 'keyframes', 'output_format': 'jpg'}
+    return len(VideoProcessor(frames_dir=work_dir).extract_frames(video, 0, spec.frame_count, config))
+
+
+def audio_extract(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.audio_extractor import AudioExtractor
+    if not AudioExtractor(work_dir).extract_audio(video, format='mp3', bitrate='128k'):
+        raise RuntimeError("audio extraction failed")
+    return 0
+
+
+def pcm_stream(spec: VideoSpec, video: str, work_dir: str) -> int:
+    # 16 kHz mono float blocks in memory, as speech models read them
+    from cortalv2i.core.pcm_stream import PCMStream
+    for _ in PCMStream(video):
+        pass
+    return 0
+
+
+def processor_two_pass(spec: VideoSpec, video: str, work_dir: str) -> int:
+    from cortalv2i.core.audio_extractor import AudioExtractor
+    from cortalv2i.core.video_processor import VideoProcessor
+    config = {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg', 'decoder': 'ffmpeg-pipe'}
+    frames = VideoProcessor(frames_dir=work_dir).extract_frames(video, 0, spec.frame_count, config)
+    AudioExtractor(work_dir).extract_audio_chunks(video, 15 * 60, format='mp3', bitrate='128k')
+    return len(frames)
+
+
+def processor_single_pass(spec: VideoSpec, video: str, work_dir: str) -> int:
+    # Same work as processor_two_pass, reading the source once
+    from cortalv2i.core.video_processor import VideoProcessor
+    config = {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg', 'decoder': 'ffmpeg-pipe'}
+    processor = VideoProcessor(frames_dir=work_dir, audio_dir=work_dir)
+    frames, _ = processor.extract_frames_and_audio(video, spec.frame_count, config,
+                                                   {'format': 'mp3', 'bitrate': '128k'})
+    return len(frames)
+
+
+def main_chunked(spec: VideoSpec, video: str, work_dir: str) -> int:
+    import yaml
+
+    config_path = os.path.join(work_dir, 'config.yaml')
+    output_dir = os.path.join(work_dir, 'output')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump({
+            'input_path': video,
+            'output_path': output_dir,
+            'processing_options': {
+                'frames': {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg'},
+                'execution': {'backend': 'process', 'workers': 2}
+            }
+        }, f)
+    # Run from the work dir (main writes processing.log to the cwd) with the
+    # cortalv2i under test importable even when it is not installed
+    import cortalv2i
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(cortalv2i.__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+    subprocess.run([sys.executable, '-m', 'cortalv2i.main', '--config', config_path],
+                   cwd=work_dir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    frames_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(video))[0], 'frames')
+    return len(os.listdir(frames_dir))
+
+
+CASES: Dict[str, Callable[[VideoSpec, str, str], int]] = {
+    'fps_extractor': fps_extractor,
+    'interval_extractor': interval_extractor,
+    'change_extractor': change_extractor,
+    'processor_fps': processor_fps,
+    'processor_scene': processor_scene,
+    'processor_keyframes': processor_keyframes,
+    'audio_extract': audio_extract,
+    'pcm_stream': pcm_stream,
+    'processor_two_pass': processor_two_pass,
+    'processor_single_pass': processor_single_pass,
+    'main_chunked': main_chunked,
+}
+
+# Cases that need an audio track in the video
+AUDIO_CASES = ('audio_extract', 'pcm_stream', 'processor_two_pass', 'processor_single_pass')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its largest child, in MB"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+
+def read_mb():
+    """Bytes read by this process and its finished children, in MB.
+
+    Pipe reads count too, so compare cases that decode the same way.
+    """
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+    except (OSError, ValueError):  # Not Linux
+        return None
+    return int(counters['rchar']) / (1024 * 1024)
+
+
+def measure(case: str, spec: VideoSpec, video: str, work_dir: str) -> Dict:
+    read_before = read_mb()
+    start = time.perf_counter()
+    frames_out = CASES[case](spec, video, work_dir)
+    wall = time.perf_counter() - start
+    read_after = read_mb()
+    return {
+        'wall_s': wall,
+        'frames_out': frames_out,
+        # Source frames, and seconds of media, processed per wall-clock second
+        'fps': spec.frame_count / wall if wall else 0.0,
+        'realtime': spec.seconds / wall if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'read_mb': read_after - read_before if read_before is not None else None
+    }
+
+
+if __name__ == '__main__':
+    case_name, spec_json, video_path, work_path = sys.argv[1:5]
+    os.makedirs(work_path, exist_ok=True)
+    result = measure(case_name, VideoSpec(**json.loads(spec_json)), video_path, work_path)
+    print(json.dumps(result))
@@ -0,0 +1,162 @@
+"""Run the benchmark suite and compare against a stored baseline.
+
+Examples:
+    python -m benchmarks.run --quick --output results.json
+    python -m benchmarks.run --save-baseline benchmarks/baselines/mybox.json
+    python -m benchmarks.run --baseline benchmarks/baselines/mybox.json --tolerance 0.2
+
+Exits with status 1 when a case regressed beyond the tolerances.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+from benchmarks.cases import AUDIO_CASES, CASES
+from benchmarks.synthetic import QUICK_SCENARIOS, SCENARIOS, generate_video
+
+
+def run_case(case: str, spec, video: str, work_dir: str, repeat: int) -> Dict:
+    """Best-of-`repeat` timing of one case; peak RSS is the largest seen.
+
+    Every attempt gets an empty probe cache of its own inside its case
+    directory, so each one pays for probing and ~/.cache is never touched.
+    """
+    best = None
+    for attempt in range(repeat):
+        case_dir = os.path.join(work_dir, f"{spec.name}-{case}-{attempt}")
+        env = dict(os.environ, CORTALV2I_CACHE_DIR=os.path.join(case_dir, 'cache'))
+        try:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.cases', case, json.dumps(spec.to_dict()), video, case_dir],
+                check=True, capture_output=True, text=True, env=env
+            ).stdout
+        finally:
+            shutil.rmtree(case_dir, ignore_errors=True)
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['wall_s'] < best['wall_s']:
+            rss = best['peak_rss_mb'] if best else None
+            best = result
+            if rss is not None and result['peak_rss_mb'] is not None:
+                best['peak_rss_mb'] = max(rss, result['peak_rss_mb'])
+    return best
+
+
+def run_suite(scenarios, cases: List[str], work_dir: str, repeat: int = 1) -> Dict:
+    videos_dir = os.path.join(work_dir, 'videos')
+    results = {}
+    for spec in scenarios:
+        video = generate_video(spec, videos_dir)
+        for case in cases:
+            if case in AUDIO_CASES and not spec.audio:
+                continue
+            key = f"{spec.name}/{case}"
+            try:
+                results[key] = run_case(case, spec, video, work_dir, repeat)
+            except subprocess.CalledProcessError as e:
+                results[key] = {'error': (e.stderr or '').strip().splitlines()[-1:] or [str(e)]}
+            print(f"{key}: {format_result(results[key])}", flush=True)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'scenarios': {spec.name: spec.to_dict() for spec in scenarios}
+        },
+        'results': results
+    }
+
+
+def format_result(result: Dict) -> str:
+    if 'error' in result:
+        return f"ERROR {result['error']}"
+    rss = result.get('peak_rss_mb')
+    read = result.get('read_mb')
+    return (f"{result['wall_s']:.2f}s, {result['fps']:.1f} fps, {result['frames_out']} frames out"
+            + (f", peak RSS {rss:.0f} MB" if rss is not None else "")
+            + (f", read {read:.0f} MB" if read is not None else ""))
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.25,
+            rss_tolerance: Optional[float] = 0.5, min_delta_s: float = 0.1) -> List[str]:
+    """Return a message for every case that regressed against the baseline.
+
+    Args:
+        current: Results of this run (as returned by run_suite)
+        baseline: Stored results to compare with; cases it lacks are skipped
+        tolerance: Allowed relative increase in wall time
+        rss_tolerance: Allowed relative increase in peak RSS, None to ignore memory
+        min_delta_s: Absolute slowdown always tolerated, so timer noise on
+            very short cases is not reported
+    """
+    regressions = []
+    for key, result in current['results'].items():
+        reference = baseline.get('results', {}).get(key)
+        if not reference or 'error' in reference:
+            continue
+        if 'error' in result:
+            regressions.append(f"{key}: failed ({result['error']})")
+            continue
+        limit = max(reference['wall_s'] * (1 + tolerance), reference['wall_s'] + min_delta_s)
+        if result['wall_s'] > limit:
+            regressions.append(f"{key}: wall time {result['wall_s']:.2f}s exceeds "
+                               f"{reference['wall_s']:.2f}s + {tolerance:.0%}")
+        if (rss_tolerance is not None and result.get('peak_rss_mb') is not None
+                and reference.get('peak_rss_mb') is not None):
+            rss_limit = reference['peak_rss_mb'] * (1 + rss_tolerance)
+            if result['peak_rss_mb'] > rss_limit:
+                regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f} MB exceeds "
+                                   f"{reference['peak_rss_mb']:.0f} MB + {rss_tolerance:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="cortalv2i benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Run only the small quick scenario")
+    parser.add_argument("--cases", help=f"Comma-separated cases (default: all of {', '.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is kept")
+    parser.add_argument("--work-dir", help="Where videos and outputs go (default: a temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against")
+    parser.add_argument("--save-baseline", help="Write these results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative wall time increase")
+    parser.add_argument("--min-delta", type=float, default=0.1,
+                        help="Absolute wall time increase (seconds) always tolerated")
+    parser.add_argument("--rss-tolerance", type=float, default=0.5,
+                        help="Allowed relative peak RSS increase (negative to ignore memory)")
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(',') if args.cases else list(CASES)
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='cortalv2i-bench-')
+    results = run_suite(QUICK_SCENARIOS if args.quick else SCENARIOS, cases, work_dir, args.repeat)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        rss_tolerance = args.rss_tolerance if args.rss_tolerance >= 0 else None
+        regressions = compare(results, baseline, args.tolerance, rss_tolerance, args.min_delta)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
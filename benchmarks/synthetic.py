@@ -0,0 +1,109 @@
+"""Deterministic synthetic test videos for the benchmark suite."""
+import os
+import shutil
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class VideoSpec:
+    name: str
+    width: int
+    height: int
+    fps: float
+    seconds: float
+    # Keyframe interval; None keeps the OpenCV encoder's default
+    gop: Optional[int] = None
+    # Seconds between hard scene cuts, None for one continuous scene
+    cut_every: Optional[float] = None
+    # Add a sine-wave audio track (needs ffmpeg)
+    audio: bool = False
+    seed: int = 0
+
+    @property
+    def frame_count(self) -> int:
+        return int(round(self.fps * self.seconds))
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+# Default matrix: resolutions, frame rates, GOP sizes and cut patterns
+SCENARIOS = (
+    VideoSpec('sd30_static', 640, 360, 30, 20, gop=250),
+    VideoSpec('sd30_cuts', 640, 360, 30, 20, gop=30, cut_every=2.0, audio=True),
+    VideoSpec('hd25_cuts', 1280, 720, 25, 12, gop=12, cut_every=3.0),
+    VideoSpec('fhd60_longgop', 1920, 1080, 60, 5, gop=300, cut_every=2.5),
+)
+
+# Small matrix for quick runs and CI
+QUICK_SCENARIOS = (
+    VideoSpec('quick_cuts', 320, 240, 25, 6, gop=25, cut_every=1.5, audio=True),
+)
+
+
+def render_frame(spec: VideoSpec, index: int) -> np.ndarray:
+    """Frame `index` of a spec: a per-scene gradient with a moving block and counter"""
+    scene = int(index / (spec.cut_every * spec.fps)) if spec.cut_every else 0
+    rng = np.random.default_rng(spec.seed * 1000003 + scene)
+    base = rng.integers(0, 256, 3)
+    tint = rng.integers(0, 256, 3)
+
+    # Alternate horizontal and vertical gradients so every cut changes most pixels
+    if scene % 2:
+        ramp = np.linspace(0.0, 1.0, spec.height, dtype=np.float32)[:, None, None]
+    else:
+        ramp = np.linspace(0.0, 1.0, spec.width, dtype=np.float32)[None, :, None]
+    frame = (base + (tint - base) * ramp).astype(np.uint8)
+    frame = np.broadcast_to(frame, (spec.height, spec.width, 3)).copy()
+
+    size = max(8, spec.height // 6)
+    x = int((index * 7) % max(1, spec.width - size))
+    y = int((spec.height - size) / 2 + (spec.height / 4) * np.sin(index / 10.0))
+    cv2.rectangle(frame, (x, y), (x + size, y + size), (255, 255, 255), -1)
+    cv2.putText(frame, f"{index:06d}", (10, spec.height - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                max(0.4, spec.height / 720.0), (0, 0, 0), 2)
+    return frame
+
+
+def generate_video(spec: VideoSpec, output_dir: str) -> str:
+    """Write the video for a spec (once) and return its path.
+
+    Frames are written with cv2.VideoWriter. When ffmpeg is available the
+    result is re-encoded with the requested GOP size and audio track; without
+    ffmpeg the OpenCV encoder's keyframe interval is kept and no audio is
+    added.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{spec.name}.mp4")
+    if os.path.exists(path):
+        return path
+
+    raw_path = os.path.join(output_dir, f".{spec.name}.raw.mp4")
+    writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'mp4v'), spec.fps, (spec.width, spec.height))
+    if not writer.isOpened():
+        raise RuntimeError(f"OpenCV cannot write {raw_path}")
+    try:
+        for index in range(spec.frame_count):
+            writer.write(render_frame(spec, index))
+    finally:
+        writer.release()
+
+    if shutil.which('ffmpeg') and (spec.gop or spec.audio):
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-i', raw_path]
+        if spec.audio:
+            cmd.extend(['-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=44100:duration={spec.seconds}",
+                        '-c:a', 'aac', '-shortest'])
+        cmd.extend(['-c:v', 'mpeg4', '-q:v', '4'])
+        if spec.gop:
+            cmd.extend(['-g', str(spec.gop)])
+        cmd.append(path)
+        subprocess.run(cmd, check=True)
+        os.remove(raw_path)
+    else:
+        os.replace(raw_path, path)
+    return path
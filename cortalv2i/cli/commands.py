@@ -1,18 +1,40 @@
 import argparse
-import cv2
-from tqdm import tqdm
-from cortalv2i.core.video_processor import VideoProcessor
-from cortalv2i.core.audio_extractor import AudioExtractor
+from cortalv2i.core.progress import throttle
 from cortalv2i.utils.dir_manager import DirectoryManager
+from cortalv2i.utils.media_probe import probe_media
 
-def extract_frames_command():
+# These commands are run once per clip, so each one imports only what it
+# uses: extracting audio never loads OpenCV or NumPy
+
+def extract_frames_parser():
+    # Choices are spelled out rather than imported so that `--help` does not
+    # load the decoders (and OpenCV with them); see DECODERS, RESIZE_MODES,
+    # OUTPUT_MODES and ENCODERS
     parser = argparse.ArgumentParser(description="Extract frames from video")
     parser.add_argument("input_path", help="Path to input video file")
     parser.add_argument("output_path", help="Path to output directory")
     parser.add_argument("--fps", type=float, default=1.0, help="Frames per second to extract")
+    parser.add_argument("--keyframes", action="store_true",
+                        help="Extract only the keyframes (I-frames), decoding nothing else; ignores --fps")
     parser.add_argument("--format", choices=['jpg', 'png'], default='jpg', help="Output image format")
     parser.add_argument("--resolution", help="Output resolution (e.g., 1920*1080)")
-    args = parser.parse_args()
+    parser.add_argument("--resize-mode", choices=['stretch', 'fit', 'letterbox'], default='stretch',
+                        help="Stretch to the resolution, fit inside it keeping the aspect ratio, or fit and pad (letterbox)")
+    parser.add_argument("--decoder", choices=['opencv', 'ffmpeg-pipe', 'stream'],
+                        help="Frame decoding backend (default: 'stream' for URLs, else 'opencv')")
+    parser.add_argument("--output-mode", choices=['files', 'tar', 'npy'], default='files',
+                        help="One image file per frame, packed tar shards, or a raw .npy tensor store")
+    parser.add_argument("--encoder", choices=['threads', 'processes'], default='threads',
+                        help="Encode frames on threads, or on processes fed through shared memory")
+    parser.add_argument("--dedup-distance", type=int,
+                        help="Skip frames whose perceptual hash is within this many bits of a kept frame")
+    return parser
+
+def extract_frames_command():
+    args = extract_frames_parser().parse_args()
+
+    from tqdm import tqdm
+    from cortalv2i.core.video_processor import VideoProcessor
 
     dir_manager = DirectoryManager()
     paths = dir_manager.get_output_paths(args.input_path, args.output_path)
@@ -30,24 +52,37 @@ def extract_frames_command():
             start_frame=0,
             end_frame=total_frames,
             extraction_config={
-                'method': 'fps',
-                'params': {'fps': args.fps},
+                'method': 'keyframes' if args.keyframes else 'fps',
+                'params': {} if args.keyframes else {'fps': args.fps},
                 'output_format': args.format,
-                'resolution': args.resolution
+                'resolution': args.resolution,
+                'resize_mode': args.resize_mode,
+                'decoder': args.decoder,
+                'dedup': args.dedup_distance,
+                'output_mode': args.output_mode,
+                'encoder': args.encoder
             },
-            progress_callback=update_progress
+            progress_callback=throttle(update_progress)
         )
 
+    if processor.suppressed_frames:
+        print(f"\nSkipped {processor.suppressed_frames} near-duplicate frames")
     print(f"\nFrames extracted to: {paths['frames']}")
 
 def extract_audio_command():
     parser = argparse.ArgumentParser(description="Extract audio from video")
     parser.add_argument("input_path", help="Path to input video file")
     parser.add_argument("output_path", help="Path to output directory")
-    parser.add_argument("--format", choices=['mp3', 'wav', 'aac', 'm4a', 'flac'], default='mp3', help="Output audio format")
+    parser.add_argument("--format", choices=['mp3', 'wav', 'aac', 'm4a', 'flac'], nargs='+', default=['mp3'],
+                        help="Output audio format(s); several are written from one decode")
     parser.add_argument("--bitrate", choices=['64k', '128k', '192k', '256k', '320k'], default='192k', help="Output audio bitrate")
+    parser.add_argument("--no-copy", action="store_true",
+                        help="Always re-encode, even when the source audio could be copied as it is")
     args = parser.parse_args()
 
+    from tqdm import tqdm
+    from cortalv2i.core.audio_extractor import AudioExtractor, parse_audio_outputs
+
     dir_manager = DirectoryManager()
     paths = dir_manager.get_output_paths(args.input_path, args.output_path)
 
@@ -59,15 +94,12 @@ def extract_audio_command():
 
         audio_processor.extract_audio(
             args.input_path,
-            format=args.format,
-            bitrate=args.bitrate,
-            progress_callback=update_progress
+            progress_callback=throttle(update_progress),
+            outputs=parse_audio_outputs([{'format': format, 'bitrate': args.bitrate, 'copy': not args.no_copy}
+                                         for format in args.format])
         )
 
     print(f"\nAudio extracted to: {paths['audio']}")
 
 def get_total_frames(video_path):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    cap.release()
-    return total_frames
\ No newline at end of file
+    return probe_media(video_path).frame_count
\ No newline at end of file
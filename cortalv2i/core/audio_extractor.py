@@ -1,17 +1,107 @@
 import os
+import re
+import math
 import logging
 import subprocess
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from cortalv2i.utils.media_probe import probe_media
+from cortalv2i.utils.metrics import Metrics, get_metrics
 
 logger = logging.getLogger(__name__)
 
+# ffmpeg encoder used for each output format; anything else is encoded as mp3
+AUDIO_CODECS = {
+    'mp3': 'libmp3lame',
+    'aac': 'aac',
+    'm4a': 'aac',
+    'wav': 'pcm_s16le',
+    'flac': 'flac'
+}
+
+# Source audio codecs each output format can hold as they are, so the
+# stream is copied (remuxed) instead of decoded and encoded again
+COPY_CODECS = {
+    'mp3': ('mp3',),
+    'aac': ('aac',),
+    'm4a': ('aac', 'alac'),
+    'wav': ('pcm_s16le',),
+    'flac': ('flac',)
+}
+
+# Length of the audio chunks main() writes for each video
+DEFAULT_CHUNK_SECONDS = 15 * 60
+
+# The container duration can run slightly past the end of the audio, so a
+# last chunk shorter than this may legitimately never be written
+_CHUNK_TOLERANCE_S = 0.1
+
+
+@dataclass(frozen=True)
+class AudioOutput:
+    """One requested audio output.
+
+    Files are named {stem}{suffix}.{format}, or {stem}{suffix}_chunk{i}.{format}
+    when chunked. With `copy`, a source already encoded with a codec the
+    format can hold (see COPY_CODECS) is remuxed as is; the output then keeps
+    the source's bitrate, sample rate and channels.
+    """
+    format: str = 'mp3'
+    bitrate: str = '192k'
+    suffix: str = ''
+    copy: bool = True
+
+    def filename(self, video_name: str, chunk_index: Optional[int] = None) -> str:
+        stem = f"{video_name}{self.suffix}"
+        if chunk_index is not None:
+            stem += f"_chunk{chunk_index}"
+        return f"{stem}.{self.format}"
+
+
+def parse_audio_outputs(config: Union[None, str, Dict, Sequence]) -> List[AudioOutput]:
+    """Audio outputs requested by an 'audio' config section.
+
+    The section is one output ({'format': 'mp3', 'bitrate': '192k'}, plus
+    'copy': false to always re-encode) or a list of them, where an entry may
+    also be just a format name. Outputs that share a format get their
+    bitrate added to the file name ({stem}_128k.mp3) so they do not
+    overwrite each other.
+    """
+    if not config:
+        return []
+    entries = config if isinstance(config, (list, tuple)) else [config]
+    requested = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'format': entry}
+        output = (str(entry.get('format') or 'mp3').lower(), str(entry.get('bitrate') or '192k'),
+                  bool(entry.get('copy', True)))
+        if output not in requested:
+            requested.append(output)
+
+    formats = [format for format, _, _ in requested]
+    return [AudioOutput(format, bitrate, f"_{bitrate}" if formats.count(format) > 1 else '', copy)
+            for format, bitrate, copy in requested]
+
+
 class AudioExtractor:
-    def __init__(self, output_dir: str):
+    """Extract audio tracks with ffmpeg.
+
+    Every method writes one or more AudioOutputs from a single run, so
+    asking for both wav and mp3 decodes the source once. Outputs that can
+    take the source stream as it is are remuxed instead of re-encoded.
+    """
+
+    def __init__(self, output_dir: str, metrics: Optional[Metrics] = None):
         self.output_dir = output_dir
+        # ffmpeg run times are recorded under the 'audio' stage
+        self.metrics = metrics or get_metrics()
 
     def extract_audio(self, video_path: str, format: str = 'mp3', bitrate: str = '192k',
                       progress_callback=None, start_time: float = None, end_time: float = None,
-                      chunk_index: int = None):
+                      chunk_index: int = None, outputs: Optional[Sequence[AudioOutput]] = None):
         """
         Extract audio from video file, optionally in chunks.
 
@@ -23,32 +113,11 @@ class AudioExtractor:
             start_time: Start time in seconds for chunk extraction
             end_time: End time in seconds for chunk extraction
             chunk_index: Index of current chunk (for filename)
+            outputs: Outputs to write instead of one of `format` and `bitrate`
         """
         try:
-            video_name = Path(video_path).stem
-            if chunk_index is not None:
-                output_filename = f"{video_name}_chunk{chunk_index}.{format}"
-            else:
-                output_filename = f"{video_name}.{format}"
-            output_path = os.path.join(self.output_dir, output_filename)
-
-            # Base ffmpeg command
-            cmd = ['ffmpeg', '-y', '-i', video_path]
-
-            # Add time parameters if chunking
-            if start_time is not None and end_time is not None:
-                duration = end_time - start_time
-                cmd.extend(['-ss', str(start_time), '-t', str(duration)])
-
-            # Add encoding parameters
-            cmd.extend([
-                '-vn',  # No video
-                '-acodec', self._get_codec(format),
-                '-ab', bitrate,
-                '-ar', '44100',  # Sample rate
-                '-ac', '2',  # Stereo
-                output_path
-            ])
+            cmd, output_paths = self._extract_command(video_path, self._outputs(format, bitrate, outputs),
+                                                      start_time, end_time, chunk_index)
 
             # Run ffmpeg process
             process = subprocess.Popen(
@@ -60,75 +129,356 @@ class AudioExtractor:
 
             # Monitor progress
             duration = end_time - start_time if (start_time is not None and end_time is not None) else self._get_duration(video_path)
-            self._monitor_progress(process, duration, progress_callback)
+            with self.metrics.time('audio'):
+                self._monitor_progress(process, duration, progress_callback)
 
             # Check if extraction was successful
-            if process.returncode == 0:
-                logger.info(f"Successfully extracted audio to: {output_path}")
-                return True
-            else:
-                raise Exception(f"FFmpeg process failed with return code {process.returncode}")
+            return self._extract_done(process.returncode, output_paths, duration)
 
         except Exception as e:
             logger.error(f"Error extracting audio: {str(e)}")
             raise
 
+    def extract_audio_chunks(self, video_path: str, chunk_duration: float, format: str = 'mp3',
+                             bitrate: str = '192k', progress_callback=None,
+                             duration: float = None,
+                             outputs: Optional[Sequence[AudioOutput]] = None) -> List[str]:
+        """
+        Extract audio split into fixed-length chunks with a single ffmpeg pass.
+
+        The segment muxer cuts the encoded stream into {stem}_chunk{i}.{format}
+        files (i starting at 1), so the source is demuxed and decoded once
+        regardless of the number of chunks. A video no longer than one chunk
+        is written as {stem}.{format}, like extract_audio without chunking.
+
+        Args:
+            video_path: Path to input video file
+            chunk_duration: Length of each chunk in seconds
+            format: Output audio format (mp3, wav, etc.)
+            bitrate: Audio bitrate
+            progress_callback: Callback function for progress updates
+            duration: Source duration in seconds (probed when omitted)
+            outputs: Outputs to write instead of one of `format` and `bitrate`
+
+        Returns:
+            Paths of the written audio files, by output and then in chunk order
+        """
+        if duration is None:
+            duration = self._get_duration(video_path)
+        outputs = self._outputs(format, bitrate, outputs)
+
+        if duration <= chunk_duration:
+            self.extract_audio(video_path, progress_callback=progress_callback, outputs=outputs)
+            return [self._output_path(video_path, output) for output in outputs]
+
+        try:
+            process = subprocess.Popen(
+                self._segment_command(video_path, chunk_duration, outputs),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True
+            )
+            with self.metrics.time('audio'):
+                self._monitor_progress(process, duration, progress_callback)
+
+            return self._chunks_done(process.returncode, video_path, chunk_duration, outputs, duration)
+
+        except Exception as e:
+            logger.error(f"Error extracting audio chunks: {str(e)}")
+            raise
+
+    def chunk_output_args(self, video_path: str, chunk_duration: float, format: str = 'mp3',
+                          bitrate: str = '192k', duration: float = None,
+                          outputs: Optional[Sequence[AudioOutput]] = None) -> List[str]:
+        """ffmpeg output options writing the files of extract_audio_chunks.
+
+        They can be appended to another ffmpeg command that reads `video_path`
+        from the start, so that its demux pass produces the audio as well.
+        Once that command has finished, chunk_outputs() returns the paths.
+        """
+        if duration is None:
+            duration = self._get_duration(video_path)
+        outputs = self._outputs(format, bitrate, outputs)
+        if duration <= chunk_duration:
+            return self._output_args(video_path, outputs)
+        return self._segment_args(video_path, chunk_duration, outputs)
+
+    def chunk_outputs(self, video_path: str, chunk_duration: float, format: str = 'mp3',
+                      duration: float = None, outputs: Optional[Sequence[AudioOutput]] = None) -> List[str]:
+        """Paths written by a finished command using chunk_output_args, in chunk order"""
+        if duration is None:
+            duration = self._get_duration(video_path)
+        outputs = self._outputs(format, None, outputs)
+        if duration <= chunk_duration:
+            output_paths = [self._output_path(video_path, output) for output in outputs]
+            self._extract_done(0, output_paths, duration)
+            return output_paths
+        return self._chunks_done(0, video_path, chunk_duration, outputs, duration)
+
+    @staticmethod
+    def _outputs(format: str, bitrate: Optional[str], outputs: Optional[Sequence[AudioOutput]]) -> List[AudioOutput]:
+        if outputs:
+            return list(outputs)
+        return [AudioOutput(format, bitrate or '192k')]
+
+    def _output_path(self, video_path: str, output: AudioOutput, chunk_index: int = None) -> str:
+        return os.path.join(self.output_dir, output.filename(Path(video_path).stem, chunk_index))
+
+    def _output_args(self, video_path: str, outputs: Sequence[AudioOutput], chunk_index: int = None) -> List[str]:
+        """Encoding options and path of each output, for one ffmpeg command"""
+        source_codec = self._source_codec(video_path)
+        args = []
+        for output in outputs:
+            args.extend(self._encoding_args(output, source_codec))
+            args.append(self._output_path(video_path, output, chunk_index))
+        return args
+
+    def _extract_command(self, video_path: str, outputs: Sequence[AudioOutput], start_time: float = None,
+                         end_time: float = None, chunk_index: int = None) -> Tuple[List[str], List[str]]:
+        """ffmpeg command and output paths for extract_audio"""
+        # Base ffmpeg command
+        cmd = ['ffmpeg', '-y']
+
+        # Seek on the input side so ffmpeg jumps to the chunk instead of
+        # decoding (and discarding) everything before it
+        if start_time is not None and end_time is not None:
+            cmd.extend(['-ss', str(start_time), '-t', str(end_time - start_time)])
+
+        cmd.extend(['-i', video_path])
+
+        # Add encoding parameters and the path of every output
+        cmd.extend(self._output_args(video_path, outputs, chunk_index))
+        return cmd, [self._output_path(video_path, output, chunk_index) for output in outputs]
+
+    def _segment_command(self, video_path: str, chunk_duration: float, outputs: Sequence[AudioOutput]) -> List[str]:
+        """ffmpeg command for extract_audio_chunks"""
+        return ['ffmpeg', '-y', '-i', video_path] + self._segment_args(video_path, chunk_duration, outputs)
+
+    def _segment_args(self, video_path: str, chunk_duration: float, outputs: Sequence[AudioOutput]) -> List[str]:
+        """Output options cutting each output's audio into chunk files"""
+        source_codec = self._source_codec(video_path)
+        cmd = []
+        for output in outputs:
+            # The segment muxer expands %d, so escape any literal % in the name
+            pattern = self._output_path(video_path, output).replace('%', '%%')
+            pattern = f"{pattern[:-len(output.format) - 1]}_chunk%d.{output.format}"
+            cmd.extend(self._encoding_args(output, source_codec))
+            cmd.extend([
+                '-f', 'segment',
+                '-segment_time', str(chunk_duration),
+                '-segment_start_number', '1',
+                '-reset_timestamps', '1',
+                pattern
+            ])
+        return cmd
+
+    def _extract_done(self, returncode: int, output_paths: List[str], duration: float) -> bool:
+        if returncode != 0:
+            raise Exception(f"FFmpeg process failed with return code {returncode}")
+        logger.info(f"Successfully extracted audio to: {', '.join(output_paths)}")
+        self.metrics.count('audio_files', len(output_paths))
+        self.metrics.count('audio_seconds', duration)
+        return True
+
+    def _chunks_done(self, returncode: int, video_path: str, chunk_duration: float,
+                     outputs: Sequence[AudioOutput], duration: float) -> List[str]:
+        if returncode != 0:
+            raise Exception(f"FFmpeg process failed with return code {returncode}")
+
+        chunk_count = int(math.ceil(duration / chunk_duration))
+        optional_last = duration - (chunk_count - 1) * chunk_duration < _CHUNK_TOLERANCE_S
+        output_paths = []
+        missing = []
+        for output in outputs:
+            for i in range(1, chunk_count + 1):
+                path = self._output_path(video_path, output, i)
+                if os.path.exists(path):
+                    output_paths.append(path)
+                elif not (i == chunk_count and optional_last):
+                    missing.append(path)
+        if missing:
+            raise IOError(f"FFmpeg did not write the expected audio chunks: {', '.join(missing)}")
+        self.metrics.count('audio_files', len(output_paths))
+        self.metrics.count('audio_seconds', duration)
+        logger.info(f"Successfully extracted {len(output_paths)} audio chunks to: {self.output_dir}")
+        return output_paths
+
+    def _encoding_args(self, output: AudioOutput, source_codec: Optional[str] = None) -> List[str]:
+        """Audio-only encoding arguments shared by every extraction mode."""
+        if output.copy and source_codec in COPY_CODECS.get(output.format, ()):
+            # Remux the source stream; nothing is decoded or encoded
+            self.metrics.count('audio_stream_copies')
+            return ['-vn', '-acodec', 'copy']
+        return [
+            '-vn',  # No video
+            '-acodec', self._get_codec(output.format),
+            '-ab', output.bitrate,
+            '-ar', '44100',  # Sample rate
+            '-ac', '2',  # Stereo
+        ]
+
     def _get_codec(self, format: str) -> str:
         """Map format to ffmpeg codec name."""
-        codec_map = {
-            'mp3': 'libmp3lame',
-            'aac': 'aac',
-            'm4a': 'aac',
-            'wav': 'pcm_s16le',
-            'flac': 'flac'
-        }
-        return codec_map.get(format, 'libmp3lame')
+        return AUDIO_CODECS.get(format, 'libmp3lame')
+
+    def _source_codec(self, video_path: str) -> Optional[str]:
+        """Codec of the source's audio track, None when it cannot be probed"""
+        try:
+            return probe_media(video_path).audio_codec
+        except (OSError, ValueError) as e:
+            logger.debug(f"Cannot probe the audio codec of {video_path}: {str(e)}")
+            return None
 
     def _get_duration(self, video_path: str) -> float:
-        """Get video duration using ffprobe."""
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            video_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        return float(result.stdout.strip())
+        """Get video duration from the shared probe cache."""
+        return probe_media(video_path).duration
 
     def _monitor_progress(self, process, duration: float, progress_callback=None):
         """Monitor ffmpeg progress and call progress callback."""
-        time_processed = 0
-        last_progress = 0
+        progress = FFmpegProgress(duration, progress_callback)
         while True:
             line = process.stderr.readline()
             if not line:
                 break
-            # Parse ffmpeg output to find time
-            if "time=" in line:
-                try:
-                    # Extract time in format HH:MM:SS.ms
-                    time_str = line.split("time=")[1].split()[0]
-                    # Handle different time formats
-                    if '.' in time_str:
-                        time_str = time_str.split('.')[0]  # Remove milliseconds
-                    if ':' in time_str:
-                        h, m, s = time_str.split(':')
-                        time_processed = float(h) * 3600 + float(m) * 60 + float(s)
-                    else:
-                        time_processed = float(time_str)
-                    if progress_callback and duration > 0:
-                        progress = min(time_processed / duration, 1.0)
-                        # Only update if progress has changed significantly (avoid too frequent updates)
-                        if progress - last_progress >= 0.01:  # Update every 1%
-                            progress_callback(progress)
-                            last_progress = progress
-                except Exception as e:
-                    logger.debug(f"Error parsing progress: {str(e)}")
-                    pass
+            progress.feed(line)
+        progress.finish()
+        process.wait()
+        process.stderr.close()
+        process.stdout.close()
+
+
+class FFmpegProgress:
+    """Turn ffmpeg's stderr status lines into 0..1 progress callbacks."""
 
+    def __init__(self, duration: float, progress_callback=None):
+        self.duration = duration
+        self.progress_callback = progress_callback
+        self.last_progress = 0
+
+    def feed(self, line: str):
+        # Parse ffmpeg output to find time
+        if not self.progress_callback or "time=" not in line:
+            return
+        try:
+            # Extract time in format HH:MM:SS.ms
+            time_str = line.split("time=")[1].split()[0]
+            # Handle different time formats
+            if '.' in time_str:
+                time_str = time_str.split('.')[0]  # Remove milliseconds
+            if ':' in time_str:
+                h, m, s = time_str.split(':')
+                time_processed = float(h) * 3600 + float(m) * 60 + float(s)
+            else:
+                time_processed = float(time_str)
+            if self.duration > 0:
+                progress = min(time_processed / self.duration, 1.0)
+                # Only update if progress has changed significantly (avoid too frequent updates)
+                if progress - self.last_progress >= 0.01:  # Update every 1%
+                    self.progress_callback(progress)
+                    self.last_progress = progress
+        except Exception as e:
+            logger.debug(f"Error parsing progress: {str(e)}")
+
+    def finish(self):
         # Ensure we show 100% at the end
-        if progress_callback and last_progress < 1.0:
-            progress_callback(1.0)
+        if self.progress_callback and self.last_progress < 1.0:
+            self.progress_callback(1.0)
+
 
-        process.wait()
\ No newline at end of file
+class AsyncAudioExtractor(AudioExtractor):
+    """AudioExtractor for asyncio applications.
+
+    ffmpeg runs as an asyncio subprocess and its stderr is parsed as it
+    arrives, so an extraction occupies no thread while it waits and many can
+    run on one event loop. Progress callbacks are called on the loop.
+    Cancelling the awaiting task kills the ffmpeg process.
+
+    asyncio is imported by the methods themselves so the synchronous CLI
+    does not pay for it at startup.
+    """
+
+    async def extract_audio(self, video_path: str, format: str = 'mp3', bitrate: str = '192k',
+                            progress_callback=None, start_time: float = None, end_time: float = None,
+                            chunk_index: int = None, outputs: Optional[Sequence[AudioOutput]] = None):
+        """Async counterpart of AudioExtractor.extract_audio"""
+        try:
+            await self._source_codec_async(video_path)
+            cmd, output_paths = self._extract_command(video_path, self._outputs(format, bitrate, outputs),
+                                                      start_time, end_time, chunk_index)
+            if start_time is not None and end_time is not None:
+                duration = end_time - start_time
+            else:
+                duration = await self._get_duration_async(video_path)
+            with self.metrics.time('audio'):
+                returncode = await self._run_ffmpeg(cmd, duration, progress_callback)
+            return self._extract_done(returncode, output_paths, duration)
+        except Exception as e:
+            logger.error(f"Error extracting audio: {str(e)}")
+            raise
+
+    async def extract_audio_chunks(self, video_path: str, chunk_duration: float, format: str = 'mp3',
+                                   bitrate: str = '192k', progress_callback=None,
+                                   duration: float = None,
+                                   outputs: Optional[Sequence[AudioOutput]] = None) -> List[str]:
+        """Async counterpart of AudioExtractor.extract_audio_chunks"""
+        if duration is None:
+            duration = await self._get_duration_async(video_path)
+        outputs = self._outputs(format, bitrate, outputs)
+
+        if duration <= chunk_duration:
+            await self.extract_audio(video_path, progress_callback=progress_callback, outputs=outputs)
+            return [self._output_path(video_path, output) for output in outputs]
+
+        try:
+            await self._source_codec_async(video_path)
+            cmd = self._segment_command(video_path, chunk_duration, outputs)
+            with self.metrics.time('audio'):
+                returncode = await self._run_ffmpeg(cmd, duration, progress_callback)
+            return self._chunks_done(returncode, video_path, chunk_duration, outputs, duration)
+        except Exception as e:
+            logger.error(f"Error extracting audio chunks: {str(e)}")
+            raise
+
+    async def _get_duration_async(self, video_path: str) -> float:
+        import asyncio
+
+        # ffprobe runs once per file (the result is cached); keep it off the loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._get_duration, video_path)
+
+    async def _source_codec_async(self, video_path: str) -> Optional[str]:
+        import asyncio
+
+        # Probing also caches the result the command builders read
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._source_codec, video_path)
+
+    async def _run_ffmpeg(self, cmd: List[str], duration: float, progress_callback=None) -> int:
+        """Run ffmpeg, feeding its status lines to the progress parser; returns the exit code"""
+        import asyncio
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        progress = FFmpegProgress(duration, progress_callback)
+        pending = b''
+        try:
+            while True:
+                data = await process.stderr.read(4096)
+                if not data:
+                    break
+                # Status updates end with a carriage return, other messages with a newline
+                *lines, pending = re.split(rb'[\r\n]', pending + data)
+                for line in lines:
+                    progress.feed(line.decode('utf-8', 'replace'))
+            progress.finish()
+            return await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            raise
@@ -0,0 +1,121 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from cortalv2i.core.chunk_executor import ChunkExecutor
+from cortalv2i.core.progress import ProgressUpdate
+from cortalv2i.utils.media_probe import MediaInfo
+
+logger = logging.getLogger(__name__)
+
+# 'combined' items extract a video's frames and audio in one pass
+WORK_KINDS = ('frames', 'audio', 'combined')
+
+# Relative decode cost per second of 1-megapixel video. Scene detection
+# decodes every frame; sampled methods can skip ahead between targets, and
+# keyframe extraction decodes only the keyframes
+_METHOD_COST = {'scene': 1.0, 'keyframes': 0.05}
+_SAMPLED_COST = 0.6
+# Audio re-encoding per second of input, relative to decoding 1 MP of video
+_AUDIO_COST = 0.05
+
+
+def estimate_frames_cost(info: MediaInfo, chunk_range: Sequence[int], method: Optional[str] = None) -> float:
+    """Estimated cost of extracting frames from a (start_frame, end_frame) range"""
+    seconds = (chunk_range[1] - chunk_range[0]) / info.fps if info.fps else 0.0
+    megapixels = max(info.width * info.height / 1e6, 0.01)
+    return seconds * megapixels * _METHOD_COST.get(method, _SAMPLED_COST)
+
+
+def estimate_audio_cost(chunk_range: Sequence[float]) -> float:
+    """Estimated cost of extracting audio from a (start_seconds, end_seconds) range"""
+    return (chunk_range[1] - chunk_range[0]) * _AUDIO_COST
+
+
+@dataclass
+class WorkItem:
+    source: str
+    kind: str
+    chunk_range: Sequence[float]
+    cost: float
+    payload: Dict = field(default_factory=dict)
+
+
+@dataclass
+class VideoStatus:
+    source: str
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.succeeded + self.failed == self.total
+
+
+class BatchScheduler:
+    """One work queue for the frame and audio chunks of every input video.
+
+    Items from all videos are ordered longest-processing-time first by their
+    cost estimate and submitted to a single ChunkExecutor pool, so workers
+    move on to the next video's chunks instead of idling at video
+    boundaries, and the longest chunks do not end up running alone at the
+    end of the batch.
+    """
+
+    def __init__(self, executor: ChunkExecutor):
+        self.executor = executor
+        self.items: List[WorkItem] = []
+
+    def add(self, item: WorkItem):
+        if item.kind not in WORK_KINDS:
+            raise ValueError(f"Unknown work kind: {item.kind} (expected one of {', '.join(WORK_KINDS)})")
+        self.items.append(item)
+
+    def ordered(self) -> List[WorkItem]:
+        """Queued items, most expensive first (stable for equal costs)"""
+        return sorted(self.items, key=lambda item: -item.cost)
+
+    def run(self, func: Callable[[dict], Any],
+            on_item_complete: Optional[Callable[[WorkItem, Any], None]] = None,
+            on_video_complete: Optional[Callable[[VideoStatus], None]] = None,
+            on_progress: Optional[Callable[[ProgressUpdate], None]] = None) -> Dict[str, VideoStatus]:
+        """Process every queued item and return the status of each video.
+
+        Args:
+            func: Picklable chunk function receiving the item as a chunk dict
+                ('source', 'kind', 'chunk_path', 'index', 'total' and the payload)
+            on_item_complete: Called with (item, result) as each item finishes
+            on_video_complete: Called once all items of a video have finished
+            on_progress: Called with throttled ProgressUpdates; their
+                'sources' map gives the cost-weighted progress of each video
+        """
+        items = self.ordered()
+        statuses = {}
+        for item in items:
+            statuses.setdefault(item.source, VideoStatus(item.source)).total += 1
+
+        chunks = [
+            dict(item.payload, source=item.source, kind=item.kind, chunk_path=item.chunk_range,
+                 index=position + 1, total=len(items))
+            for position, item in enumerate(items)
+        ]
+
+        def complete(chunk, result):
+            item = items[chunk['index'] - 1]
+            status = statuses[item.source]
+            if result:
+                status.succeeded += 1
+            else:
+                status.failed += 1
+            if on_item_complete:
+                on_item_complete(item, result)
+            if status.finished:
+                logger.info(f"Finished {item.source}: {status.succeeded} of {status.total} chunks succeeded")
+                if on_video_complete:
+                    on_video_complete(status)
+
+        self.executor.run(func, chunks, desc="Batch", on_complete=complete,
+                          weights=[item.cost for item in items], on_progress=on_progress)
+        self.items = []
+        return statuses
@@ -0,0 +1,116 @@
+import logging
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional
+
+from cortalv2i.core.progress import DEFAULT_INTERVAL, ProgressBars, ProgressBus, ProgressUpdate, report_progress
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('process', 'thread')
+
+
+def default_workers() -> int:
+    """Default worker count: one per available core"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _init_worker():
+    # Each worker process decodes on its own core; keep OpenCV from spawning
+    # a full thread pool per process on top of that
+    import cv2
+    cv2.setNumThreads(1)
+
+
+class ChunkExecutor:
+    """Run chunk jobs on a process or thread pool with progress in the parent.
+
+    Each job is a picklable dict handed to `func`. A 'progress_queue' entry is
+    added to it; workers post (index, progress) tuples through
+    `report_progress` and a ProgressBus in the parent aggregates them and
+    redraws the progress bars at a fixed rate.
+    """
+
+    def __init__(self, backend: str = 'process', max_workers: Optional[int] = None,
+                 progress_interval: float = DEFAULT_INTERVAL, show_progress: bool = True):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown execution backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        self.backend = backend
+        self.max_workers = max_workers or default_workers()
+        self.progress_interval = progress_interval
+        self.show_progress = show_progress
+
+    def run(self, func: Callable[[dict], Any], chunks: List[dict], desc: str = "Chunk",
+            on_complete: Optional[Callable[[dict, Any], None]] = None,
+            weights: Optional[List[float]] = None,
+            on_progress: Optional[Callable[[ProgressUpdate], None]] = None) -> List[Any]:
+        """Run func over every chunk and return the per-chunk results in order.
+
+        Chunks are submitted in list order, and idle workers pick up the next
+        one as soon as they finish.
+
+        Args:
+            func: Picklable chunk function, returning a falsy value on failure
+            chunks: Chunk descriptions with at least a unique 'index' and 'total'
+            desc: Progress bar label
+            on_complete: Called in the parent with (chunk, result) as each
+                chunk finishes; result is False when the chunk raised
+            weights: Relative cost of each chunk; when given, a single bar
+                shows weighted overall progress instead of one bar per chunk
+            on_progress: Called with an aggregated ProgressUpdate at most once
+                per progress_interval, and once more when the run ends
+        """
+        if not chunks:
+            return []
+
+        workers = min(self.max_workers, len(chunks))
+        manager = multiprocessing.Manager() if self.backend == 'process' else None
+        progress_queue = manager.Queue() if manager else queue.Queue()
+        for chunk in chunks:
+            chunk['progress_queue'] = progress_queue
+
+        bus = ProgressBus(chunks, progress_queue, weights, self.progress_interval)
+        bars = ProgressBars(chunks, desc, per_chunk=weights is None) if self.show_progress else None
+        if bars:
+            bus.subscribe(bars)
+        if on_progress:
+            bus.subscribe(on_progress)
+        bus.start()
+
+        results = [False] * len(chunks)
+        try:
+            with self._make_pool(workers) as executor:
+                futures = {executor.submit(func, chunk): i for i, chunk in enumerate(chunks)}
+                for future in as_completed(futures):
+                    position = futures[future]
+                    try:
+                        results[position] = future.result()
+                    except Exception as e:
+                        logger.error(f"{desc} processing error: {str(e)}")
+                    bus.complete(chunks[position]['index'])
+                    if on_complete:
+                        on_complete(chunks[position], results[position])
+        finally:
+            bus.stop()
+            if bars:
+                bars.close()
+            for chunk in chunks:
+                chunk.pop('progress_queue', None)
+            if manager:
+                manager.shutdown()
+
+        return results
+
+    def _make_pool(self, workers: int):
+        if self.backend == 'process':
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return ThreadPoolExecutor(max_workers=workers)
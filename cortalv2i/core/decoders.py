@@ -0,0 +1,560 @@
+import cv2
+import logging
+import subprocess
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cortalv2i.core.frame_resize import BufferRing, FrameResizer, ffmpeg_scale_filters, resize_plan
+from cortalv2i.core.frame_sampler import DEFAULT_SEEK_COST, FrameSampler
+from cortalv2i.core.stream_ingest import CHUNK_SIZE, DEFAULT_READ_AHEAD_MB, HTTPStream
+from cortalv2i.utils.media_probe import KeyframeIndex, keyframe_index, probe_head, probe_media
+from cortalv2i.utils.metrics import Metrics, get_metrics
+from cortalv2i.utils.utils import is_url, normalize_url
+
+logger = logging.getLogger(__name__)
+
+DECODERS = ('opencv', 'ffmpeg-pipe', 'stream')
+
+# Longest explicit frame list turned into a single ffmpeg select expression;
+# every listed frame adds a term that is evaluated for each decoded frame
+_MAX_SELECT_TERMS = 256
+
+# Bytes of a stream's head handed to ffprobe to read its stream layout
+_PROBE_BYTES = 4 * 1024 * 1024
+
+
+def default_decoder(source) -> str:
+    """Decoder backend used when none is configured: 'stream' for URLs, else 'opencv'"""
+    return 'stream' if is_url(source) else 'opencv'
+
+
+class OpenCVDecoder:
+    """Decoder backend built on cv2.VideoCapture and FrameSampler"""
+
+    name = 'opencv'
+
+    def __init__(self, source, seek_cost: float = DEFAULT_SEEK_COST, threads: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Args:
+            source: Video path, or an already opened cv2.VideoCapture (not released on close)
+            seek_cost: Prior seek cost for the FrameSampler cost model
+            threads: Unused, decoder threading is managed by OpenCV
+            metrics: Registry for 'decode' and 'resize' timings (default: get_metrics())
+        """
+        self.metrics = metrics or get_metrics()
+        if isinstance(source, cv2.VideoCapture):
+            self.cap = source
+            self._owns_capture = False
+        else:
+            self.cap = cv2.VideoCapture(source)
+            self._owns_capture = True
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video file: {source}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.sampler = FrameSampler(self.cap, seek_cost=seek_cost)
+
+    @property
+    def position(self) -> int:
+        return self.sampler.position
+
+    def read(self, schedule: Iterable[int], size: Optional[Tuple[int, int]] = None, gray: bool = False,
+             progress_callback: Optional[Callable[[int], None]] = None, resize_mode: str = 'stretch',
+             buffers: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for an ascending schedule of frame indices.
+
+        Args:
+            schedule: Ascending absolute frame indices
+            size: Optional (width, height) to scale frames to
+            gray: Return single-channel grayscale frames instead of BGR
+            progress_callback: Called with the absolute stream position after each frame
+            resize_mode: How `size` treats the aspect ratio, one of RESIZE_MODES
+            buffers: Reuse this many preallocated output frames (see BufferRing),
+                0 to return a new array for every frame
+        """
+        metrics = self.metrics
+        resizer = FrameResizer(size, resize_mode, gray, buffers) if size or gray else None
+        for index, frame in metrics.timed('decode', self.sampler.sample(schedule, progress_callback)):
+            metrics.count('frames_decoded')
+            if resizer:
+                with metrics.time('resize'):
+                    frame = resizer(frame)
+            yield index, frame
+
+    def release(self):
+        if self._owns_capture:
+            self.cap.release()
+
+
+class FFmpegPipeDecoder:
+    """Decoder backend that reads rawvideo from an ffmpeg pipe.
+
+    Frame selection (`select`) and scaling (`scale`) run inside ffmpeg's
+    multithreaded filtergraph, so a 4K source downscaled to 720p crosses the
+    pipe at 720p. Python only wraps each raw frame from the pipe with
+    `np.frombuffer`, without copying it again (returned frames are then
+    read-only), or with `buffers` reads it straight into a reused array.
+
+    Extra ffmpeg outputs (an audio encode, say) can be attached to the next
+    decode with `attach_outputs`, so one demux pass of the source feeds both.
+    """
+
+    name = 'ffmpeg-pipe'
+
+    def __init__(self, source: str, seek_cost: float = DEFAULT_SEEK_COST, threads: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Args:
+            source: Video path or URL understood by ffmpeg
+            seek_cost: Unused, ffmpeg seeks on the input side
+            threads: Decoder thread count passed to ffmpeg (ffmpeg picks by default)
+            metrics: Registry for 'decode' timings, which include ffmpeg's
+                scaling (default: get_metrics())
+        """
+        self.metrics = metrics or get_metrics()
+        if not isinstance(source, str):
+            raise ValueError("The ffmpeg-pipe decoder needs a video path, not an opened capture")
+        self.source = source
+        self.threads = threads
+        self.position = 0
+        self._keyframe_index = None
+        self._outputs: List[str] = []
+        info = probe_media(source)
+        if not info.width or not info.height:
+            raise ValueError(f"No video stream found in: {source}")
+        self.fps, self.frame_count, self.width, self.height = info.fps, info.frame_count, info.width, info.height
+
+    def read(self, schedule: Iterable[int], size: Optional[Tuple[int, int]] = None, gray: bool = False,
+             progress_callback: Optional[Callable[[int], None]] = None, resize_mode: str = 'stretch',
+             buffers: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for an ascending schedule of frame indices.
+
+        Args:
+            schedule: Ascending absolute frame indices (a range or a list)
+            size: Optional (width, height) to scale frames to inside ffmpeg
+            gray: Return single-channel grayscale frames instead of BGR
+            progress_callback: Called with the absolute stream position after each frame
+            resize_mode: How `size` treats the aspect ratio, one of RESIZE_MODES
+            buffers: Read frames into this many preallocated arrays in
+                rotation (see BufferRing), 0 for a new array per frame
+        """
+        # A range maps onto a single select expression; explicit (or open-ended)
+        # schedules are decoded in windows of bounded expression length
+        windows = [schedule] if isinstance(schedule, range) else self._windows(schedule)
+        ring = BufferRing(buffers)
+        for window in windows:
+            yield from self._read_window(window, size, gray, progress_callback, resize_mode, ring)
+
+    @property
+    def keyframe_index(self) -> KeyframeIndex:
+        """Keyframes of the source, from the probe cache (see VideoChunker)"""
+        if self._keyframe_index is None:
+            self._keyframe_index = keyframe_index(self.source)
+        return self._keyframe_index
+
+    def keyframes(self, start_frame: int = 0, end_frame: Optional[int] = None,
+                  size: Optional[Tuple[int, int]] = None, gray: bool = False,
+                  progress_callback: Optional[Callable[[int], None]] = None, resize_mode: str = 'stretch',
+                  buffers: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for the keyframes in [start_frame, end_frame).
+
+        Only keyframes are decoded (ffmpeg's -skip_frame nokey), which on
+        long-GOP video is a small fraction of the decode work. Each frame's
+        presentation timestamp is in `keyframe_index`. The other arguments
+        are those of `read`.
+        """
+        indices = [index for index, _ in self.keyframe_index.between(start_frame, end_frame)]
+        yield from self._read_window(indices, size, gray, progress_callback, resize_mode,
+                                     BufferRing(buffers), keyframes=True)
+
+    def attach_outputs(self, outputs: Sequence[str]):
+        """Have the next ffmpeg run of this decoder also write `outputs`.
+
+        `outputs` are ffmpeg output options ending in an output path, such as
+        ['-vn', '-c:a', 'flac', 'audio.flac']. They are added to the command
+        of the next read() or keyframes() window, which then runs on to the
+        end of the input (after its last frame is read) and raises IOError if
+        ffmpeg fails. The outputs cover the whole input: that window does not
+        seek and decodes from the start even if its first frame is later. Call
+        finish_outputs() once decoding is done in case no window ran.
+        """
+        self._outputs.extend(outputs)
+
+    def finish_outputs(self):
+        """Write attached outputs that no decode has picked up, in a pass of their own"""
+        outputs, self._outputs = self._outputs, []
+        if not outputs:
+            return
+        cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', self.source]
+        result = subprocess.run(cmd + outputs, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise IOError(f"ffmpeg failed writing outputs of {self.source}: "
+                          f"{result.stderr.decode(errors='replace').strip()}")
+
+    def release(self):
+        pass
+
+    def _take_outputs(self) -> List[str]:
+        outputs, self._outputs = self._outputs, []
+        return outputs
+
+    @staticmethod
+    def _finish(process: subprocess.Popen, stderr, outputs: List[str], completed: bool, name: str):
+        """Stop an ffmpeg decode and log its errors.
+
+        A decode with attached outputs that was read to the end is left to
+        finish writing them; anything still in the pipe is drained.
+        """
+        if outputs and completed:
+            while process.stdout.read(CHUNK_SIZE):
+                pass
+        elif process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+        stderr.seek(0)
+        errors = stderr.read().decode(errors='replace').strip()
+        stderr.close()
+        if outputs and completed and returncode != 0:
+            raise IOError(f"{name} failed writing its attached outputs: {errors}")
+        if errors:
+            logger.debug(f"{name}: {errors}")
+
+    def _frame_shape(self, size, gray, resize_mode) -> Tuple[int, ...]:
+        """Shape of the raw frames ffmpeg writes for these read arguments"""
+        width, height = (resize_plan(self.width, self.height, size, resize_mode)[2] if size
+                         else (self.width, self.height))
+        return (height, width) if gray else (height, width, 3)
+
+    @staticmethod
+    def _read_frame(pipe, shape, ring: BufferRing) -> Optional[np.ndarray]:
+        """The next raw frame from the pipe, None once it ends"""
+        frame_bytes = int(np.prod(shape))
+        if not ring.count:
+            buffer = pipe.read(frame_bytes)
+            if len(buffer) < frame_bytes:
+                return None
+            return np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+        frame = ring.next(shape)
+        view = memoryview(frame.reshape(-1))
+        filled = 0
+        while filled < frame_bytes:
+            count = pipe.readinto(view[filled:])
+            if not count:
+                return None
+            filled += count
+        return frame
+
+    def _read_window(self, indices, size, gray, progress_callback, resize_mode='stretch', ring=None,
+                     keyframes=False):
+        if not len(indices):
+            return
+
+        shape = self._frame_shape(size, gray, resize_mode)
+        ring = ring or BufferRing()
+
+        stderr = tempfile.TemporaryFile()
+        outputs = self._take_outputs()
+        process = self._spawn(indices, size, gray, stderr, resize_mode, keyframes, outputs)
+        completed = False
+        try:
+            for index in indices:
+                with self.metrics.time('decode'):
+                    frame = self._read_frame(process.stdout, shape, ring)
+                if frame is None:
+                    break
+                self.metrics.count('frames_decoded')
+                self.position = index + 1
+                if progress_callback:
+                    progress_callback(self.position)
+                yield index, frame
+            completed = True
+        finally:
+            self._finish(process, stderr, outputs, completed, "ffmpeg decoder")
+
+    @staticmethod
+    def _windows(schedule):
+        window = []
+        for index in schedule:
+            window.append(index)
+            if len(window) == _MAX_SELECT_TERMS:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def _spawn(self, indices, size, gray, stderr, resize_mode='stretch', keyframes=False,
+               outputs=()) -> subprocess.Popen:
+        first = indices[0]
+        cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error']
+        if outputs:
+            cmd.append('-y')
+        if self.threads:
+            cmd.extend(['-threads', str(self.threads)])
+        # Attached outputs cover the input from its start, so with outputs
+        # the input is not seeked and frames are selected by absolute number
+        origin = first if first > 0 and self.fps > 0 and not outputs else 0
+        if origin:
+            # Input-side seek to half a frame before the first target: ffmpeg
+            # drops everything earlier, so the frame counter n restarts at it
+            cmd.extend(['-ss', f"{(origin - 0.5) / self.fps:.6f}"])
+        if keyframes:
+            # The decoder skips every other frame, so only keyframes come out
+            cmd.extend(['-skip_frame', 'nokey'])
+        cmd.extend(['-i', self.source, '-an', '-sn', '-dn'])
+
+        if not keyframes:
+            filters = [f"select={self._select_expression(indices, origin)}"]
+        elif first > origin:
+            # n counts keyframes only: drop those before the first target
+            filters = [f"select=gte(n\\,{bisect_left(self.keyframe_index.frames, first)})"]
+        else:
+            filters = []
+        if size:
+            filters.extend(ffmpeg_scale_filters(self.width, self.height, size, resize_mode,
+                                                'gray' if gray else 'bgr24'))
+        if filters:
+            cmd.extend(['-vf', ','.join(filters)])
+        cmd.extend([
+            '-vsync', '0',
+            '-frames:v', str(len(indices)),
+            '-f', 'rawvideo',
+            '-pix_fmt', 'gray' if gray else 'bgr24',
+            'pipe:1'
+        ])
+        # -frames:v ends only the pipe output; ffmpeg keeps demuxing for these
+        cmd.extend(outputs)
+
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+
+    @staticmethod
+    def _select_expression(indices, origin: int) -> str:
+        """select filter expression for `indices`, with the frame counter n starting at `origin`"""
+        if isinstance(indices, range):
+            start = indices.start - origin
+            if start:
+                expression = f"between(n\\,{start}\\,{indices.stop - origin - 1})"
+                if indices.step > 1:
+                    expression += f"*not(mod(n-{start}\\,{indices.step}))"
+                return expression
+            expression = f"lt(n\\,{indices.stop - origin})"
+            if indices.step > 1:
+                expression += f"*not(mod(n\\,{indices.step}))"
+            return expression
+        return '+'.join(f"eq(n\\,{index - origin})" for index in indices)
+
+
+class StreamDecoder(FFmpegPipeDecoder):
+    """Decoder backend for http(s) sources that decodes while downloading.
+
+    The response is downloaded by an HTTPStream into a bounded read-ahead
+    buffer and piped into ffmpeg's stdin, so the first frames are decoded
+    while the rest of the file is still arriving and nothing is written to
+    disk. Stream metadata comes from ffprobe run on the buffered head.
+
+    A pipe is read front to back: every read() fetches the source again from
+    the start (scene detection reads it twice), and frames before the
+    schedule are decoded and dropped. ffmpeg stops once the schedule is
+    complete, which also ends the download. Sources whose header is not at
+    the start (MP4 without fast start) cannot be decoded from a pipe; for
+    those, ffmpeg reads the URL itself with HTTP range requests.
+    """
+
+    name = 'stream'
+
+    def __init__(self, source: str, seek_cost: float = DEFAULT_SEEK_COST, threads: Optional[int] = None,
+                 metrics: Optional[Metrics] = None, read_ahead_mb: float = DEFAULT_READ_AHEAD_MB):
+        """
+        Args:
+            source: http(s) URL of the media file
+            seek_cost: Unused, streams cannot seek
+            threads: Decoder thread count passed to ffmpeg (ffmpeg picks by default)
+            metrics: Registry for 'decode' timings (default: get_metrics())
+            read_ahead_mb: Most data downloaded ahead of the decoder
+        """
+        self.metrics = metrics or get_metrics()
+        if not isinstance(source, str):
+            raise ValueError("The stream decoder needs a URL, not an opened capture")
+        self.source = normalize_url(source)
+        self.threads = threads
+        self.position = 0
+        self._keyframe_index = None
+        self._outputs = []
+        self.read_ahead_mb = read_ahead_mb
+
+        # The first read reuses the download started for probing
+        self._stream = HTTPStream(self.source, read_ahead_mb)
+        try:
+            info = probe_head(self.source, self._stream.peek(_PROBE_BYTES))
+        except ValueError as e:
+            logger.debug(f"Cannot probe the head of {self.source}: {str(e)}")
+            info = None
+        self.piped = bool(info and info.width and info.height)
+        if not self.piped:
+            logger.info(f"{self.source} cannot be decoded from a pipe, reading it with range requests")
+            self._stream.close()
+            self._stream = None
+            info = probe_media(self.source)
+            if not info.width or not info.height:
+                raise ValueError(f"No video stream found in: {self.source}")
+        self.fps, self.frame_count, self.width, self.height = info.fps, info.frame_count, info.width, info.height
+
+    def read(self, schedule: Iterable[int], size: Optional[Tuple[int, int]] = None, gray: bool = False,
+             progress_callback: Optional[Callable[[int], None]] = None, resize_mode: str = 'stretch',
+             buffers: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for an ascending schedule of frame indices.
+
+        Args:
+            schedule: Ascending absolute frame indices (a range, a list or an open-ended iterator)
+            size: Optional (width, height) to scale frames to inside ffmpeg
+            gray: Return single-channel grayscale frames instead of BGR
+            progress_callback: Called with the absolute stream position after each frame
+            resize_mode: How `size` treats the aspect ratio, one of RESIZE_MODES
+            buffers: Read frames into this many preallocated arrays in
+                rotation (see BufferRing), 0 for a new array per frame
+        """
+        if not self.piped:
+            yield from super().read(schedule, size, gray, progress_callback, resize_mode, buffers)
+            return
+
+        exact = isinstance(schedule, range) or (isinstance(schedule, list) and len(schedule) <= _MAX_SELECT_TERMS)
+        targets = iter(schedule)
+        target = next(targets, None)
+        if target is None:
+            return
+
+        shape = self._frame_shape(size, gray, resize_mode)
+        ring = BufferRing(buffers)
+        # Frames dropped by the schedule below must not take turns in the ring
+        skipped = BufferRing(1) if buffers else ring
+
+        stream, self._stream = self._stream or HTTPStream(self.source, self.read_ahead_mb), None
+        stderr = tempfile.TemporaryFile()
+        outputs = self._take_outputs()
+        process = self._spawn_stream(schedule if exact else None, target, size, gray, stderr, resize_mode, outputs)
+        feeder = threading.Thread(target=self._feed, args=(stream, process.stdin), daemon=True)
+        feeder.start()
+        # Without an exact select expression every frame from the first target
+        # on comes through the pipe and the schedule is applied here
+        index = target
+        completed = False
+        try:
+            while target is not None:
+                with self.metrics.time('decode'):
+                    frame = self._read_frame(process.stdout, shape, ring if exact or index == target else skipped)
+                if frame is None:
+                    break
+                if exact:
+                    index = target
+                elif index != target:
+                    index += 1
+                    continue
+                self.metrics.count('frames_decoded')
+                self.position = index + 1
+                if progress_callback:
+                    progress_callback(self.position)
+                yield index, frame
+                target = next(targets, None)
+                index += 1
+            completed = True
+        finally:
+            try:
+                self._finish(process, stderr, outputs, completed, "ffmpeg stream decoder")
+            finally:
+                stream.close()
+                feeder.join()
+        if stream.buffer.error is not None:
+            raise IOError(f"Download of {self.source} failed: {stream.buffer.error}")
+
+    def release(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    @staticmethod
+    def _feed(stream: HTTPStream, stdin):
+        """Copy the download into ffmpeg until either side ends"""
+        try:
+            while True:
+                data = stream.read(CHUNK_SIZE)
+                if not data:
+                    break
+                stdin.write(data)
+        except (BrokenPipeError, OSError, ValueError):
+            # ffmpeg exited (schedule complete) or the download failed
+            pass
+        finally:
+            try:
+                stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def _spawn_stream(self, schedule, first: int, size, gray, stderr, resize_mode='stretch',
+                      outputs=()) -> subprocess.Popen:
+        cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error']
+        if outputs:
+            cmd.append('-y')
+        if self.threads:
+            cmd.extend(['-threads', str(self.threads)])
+        cmd.extend(['-i', 'pipe:0', '-an', '-sn', '-dn'])
+
+        # No seeking: n counts from the start of the stream
+        if isinstance(schedule, range):
+            select = f"between(n\\,{schedule.start}\\,{schedule.stop - 1})"
+            if schedule.step > 1:
+                select += f"*not(mod(n-{schedule.start}\\,{schedule.step}))"
+        elif schedule is not None:
+            select = '+'.join(f"eq(n\\,{index})" for index in schedule)
+        else:
+            select = f"gte(n\\,{first})"
+        filters = [f"select={select}"]
+        if size:
+            filters.extend(ffmpeg_scale_filters(self.width, self.height, size, resize_mode,
+                                                'gray' if gray else 'bgr24'))
+        cmd.extend(['-vf', ','.join(filters), '-vsync', '0'])
+        if schedule is not None:
+            cmd.extend(['-frames:v', str(len(schedule))])
+        cmd.extend(['-f', 'rawvideo', '-pix_fmt', 'gray' if gray else 'bgr24', 'pipe:1'])
+        cmd.extend(outputs)
+
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr)
+
+
+def open_decoder(source, backend: str = 'opencv', seek_cost: float = DEFAULT_SEEK_COST,
+                 threads: Optional[int] = None, metrics: Optional[Metrics] = None,
+                 read_ahead_mb: Optional[float] = None):
+    """Return a decoder for a path, an opened cv2.VideoCapture or an existing decoder.
+
+    Args:
+        source: Video path, URL, cv2.VideoCapture, or a decoder instance (returned as is)
+        backend: 'opencv', 'ffmpeg-pipe' or 'stream' (ignored for captures and decoders)
+        seek_cost: Prior seek cost for the OpenCV FrameSampler
+        threads: Decoder threads for the ffmpeg-pipe and stream backends
+        metrics: Registry the decoder records its timings in
+        read_ahead_mb: Download buffer of the stream backend
+    """
+    if isinstance(source, (OpenCVDecoder, FFmpegPipeDecoder)):
+        return source
+    if isinstance(source, cv2.VideoCapture):
+        if backend != 'opencv':
+            raise ValueError(f"The {backend} decoder needs a video path, not an opened capture")
+        return OpenCVDecoder(source, seek_cost=seek_cost, metrics=metrics)
+    if backend == 'opencv':
+        return OpenCVDecoder(source, seek_cost=seek_cost, threads=threads, metrics=metrics)
+    if backend == 'ffmpeg-pipe':
+        return FFmpegPipeDecoder(source, seek_cost=seek_cost, threads=threads, metrics=metrics)
+    if backend == 'stream':
+        return StreamDecoder(source, seek_cost=seek_cost, threads=threads, metrics=metrics,
+                             read_ahead_mb=read_ahead_mb or DEFAULT_READ_AHEAD_MB)
+    raise ValueError(f"Unknown decoder: {backend} (expected one of {', '.join(DECODERS)})")
@@ -0,0 +1,124 @@
+import cv2
+import logging
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from cortalv2i.core.frame_resize import resize_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISTANCE = 4
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash of a frame as a hash_size * hash_size bit integer.
+
+    The frame is shrunk to (hash_size + 1) x hash_size grayscale and each bit
+    records whether a pixel is brighter than its right-hand neighbour, so the
+    hash survives re-encoding, scaling and small brightness changes.
+    """
+    small = resize_frame(frame, (hash_size + 1, hash_size))
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree of hashes under the Hamming distance.
+
+    A lookup within distance d only descends into children whose edge
+    distance lies in [dist - d, dist + d], so it touches a small part of the
+    tree instead of every stored hash.
+    """
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, value: int):
+        self.size += 1
+        if self._root is None:
+            self._root = (value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                self.size -= 1
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                return
+            node = child
+
+    def find(self, value: int, max_distance: int) -> Optional[int]:
+        """Return a stored hash within max_distance of value, or None"""
+        if self._root is None:
+            return None
+        stack = [self._root]
+        while stack:
+            stored, children = stack.pop()
+            distance = hamming_distance(value, stored)
+            if distance <= max_distance:
+                return stored
+            for edge in range(max(1, distance - max_distance), distance + max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        return None
+
+    def __len__(self):
+        return self.size
+
+
+class FrameDeduplicator:
+    """Suppress frames that look like a frame that was already kept.
+
+    Every kept frame's dHash goes into a BK-tree; a new frame whose hash is
+    within `max_distance` bits of any kept hash is reported as a duplicate
+    and should be skipped before it is encoded.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, hash_size: int = 8):
+        """
+        Args:
+            max_distance: Largest Hamming distance (in bits) treated as a duplicate
+            hash_size: Hash grid size; the hash has hash_size ** 2 bits
+        """
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.index = BKTree()
+        self.kept = 0
+        self.suppressed = 0
+
+    def is_duplicate(self, frame: np.ndarray) -> bool:
+        """Check a frame against the kept frames and remember it when it is new"""
+        value = dhash(frame, self.hash_size)
+        if self.index.find(value, self.max_distance) is not None:
+            self.suppressed += 1
+            return True
+        self.index.add(value)
+        self.kept += 1
+        return False
+
+
+def make_deduplicator(config: Union[None, bool, int, Dict]) -> Optional[FrameDeduplicator]:
+    """Build a deduplicator from a 'dedup' config value.
+
+    Accepts None/False (disabled), True (defaults), a maximum distance, or a
+    dict of FrameDeduplicator arguments.
+    """
+    if config is None or config is False:
+        return None
+    if config is True:
+        return FrameDeduplicator()
+    if isinstance(config, dict):
+        return FrameDeduplicator(**config)
+    return FrameDeduplicator(max_distance=int(config))
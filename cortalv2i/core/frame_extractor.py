@@ -3,65 +3,208 @@ import os
 import logging
 import numpy as np
 from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+
+from cortalv2i.core.decoders import open_decoder
+from cortalv2i.core.frame_dedup import make_deduplicator
+from cortalv2i.core.frame_resize import FrameResizer, parse_resolution
+from cortalv2i.core.frame_sampler import DEFAULT_SEEK_COST, build_schedule, build_time_schedule
+from cortalv2i.core.frame_store import DEFAULT_SHARD_SIZE_MB, OUTPUT_MODES, TarShardWriter, TensorStoreWriter
+from cortalv2i.core.scene_detector import SceneDetector
+from cortalv2i.core.shm_encoder import ENCODERS, SharedMemoryEncoderPool
+from cortalv2i.utils.metrics import get_metrics
+from cortalv2i.utils.utils import atomic_write
 
 class FrameExtractor(ABC):
-    def __init__(self, output_dir, output_format='jpg', resolution=None):
+    def __init__(self, output_dir, output_format='jpg', resolution=None, seek_cost=DEFAULT_SEEK_COST,
+                 decoder='opencv', decoder_threads=None, dedup=None, output_mode='files',
+                 shard_size_mb=DEFAULT_SHARD_SIZE_MB, encoder='threads', encoder_workers=4, metrics=None,
+                 resize_mode='stretch'):
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode} (expected one of {', '.join(OUTPUT_MODES)})")
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder: {encoder} (expected one of {', '.join(ENCODERS)})")
         # Use the exact path provided without any additional nesting
         self.output_dir = output_dir
         self.output_format = output_format
-        self.resolution = resolution
+        # Parsed once; 'fit' and 'letterbox' keep the source aspect ratio
+        self.resolution = parse_resolution(resolution)
+        self.resize_mode = resize_mode
+        # Frames are encoded or copied before the next one arrives, so one output buffer suffices
+        self._resizer = FrameResizer(self.resolution, resize_mode, buffers=1) if self.resolution else None
+        self.seek_cost = seek_cost
+        self.decoder = decoder
+        self.decoder_threads = decoder_threads
+        # None disables near-duplicate suppression; see make_deduplicator
+        self.deduplicator = make_deduplicator(dedup)
+        # 'tar' packs encoded frames into shards, 'npy' keeps raw pixels in a tensor store
+        self.output_mode = output_mode
+        self.shard_size_mb = shard_size_mb
+        self.outputs = []
+        # 'processes' hands frames to encoder processes through shared memory
+        self.encoder = encoder
+        self.encoder_workers = encoder_workers
+        self._store = None
+        self._encoder_pool = None
+        # Frames save_frame accepted that the encoder processes failed to encode or write
+        self.frames_failed = 0
+        # Stage timings and counters; the process-wide registry is disabled by default
+        self.metrics = metrics or get_metrics()
         self.logger = logging.getLogger(self.__class__.__name__)
 
     @abstractmethod
     def extract_frames(self, cap, progress_callback=None):
+        """Extract frames from `cap`: an opened cv2.VideoCapture, or a video
+        path (required for the 'ffmpeg-pipe' decoder)."""
         pass
 
-    def save_frame(self, frame, frame_count):
+    def save_frame(self, frame, frame_count, timestamp=None):
         try:
-            if self.resolution:
-                if isinstance(self.resolution, str):
-                    width, height = map(int, self.resolution.split('*'))
-                    self.resolution = (width, height)
-                frame = cv2.resize(frame, self.resolution)
+            metrics = self.metrics
+            resizer = self._resizer
+            if resizer and frame.shape[1::-1] != resizer.output_size(frame.shape[1], frame.shape[0]):
+                with metrics.time('resize'):
+                    frame = resizer(frame)
+
+            if self.output_mode == 'npy':
+                with metrics.time('write'):
+                    self._store.append(frame, frame_count, timestamp)
+                metrics.count('frames_written')
+                return True
             
             filename = f"frame_{frame_count:06d}.{self.output_format}"
             output_path = os.path.join(self.output_dir, filename)
             
-            if self.output_format.lower() in ['jpg', 'jpeg']:
-                cv2.imwrite(output_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-            else:
-                cv2.imwrite(output_path, frame)
+            ext, params = self._encode_args()
+            if self._encoder_pool is not None:
+                # Encoded asynchronously; failures are counted in frames_failed
+                # once the session has waited for the pool
+                with metrics.time('queue_wait'):
+                    self._encoder_pool.submit(frame, ext, params, None if self._store else output_path,
+                                              frame_count, timestamp)
+                return True
+
+            with metrics.time('encode'):
+                ok, encoded = cv2.imencode(ext, frame, params)
+            if not ok:
+                raise ValueError("image encoding failed")
+            with metrics.time('write'):
+                if self.output_mode == 'tar':
+                    self._store.add(encoded.tobytes(), frame_count, timestamp)
+                else:
+                    atomic_write(output_path, encoded.tobytes())
+            metrics.count('frames_written')
+            metrics.count('bytes_written', encoded.nbytes)
             return True
         except Exception as e:
             self.logger.exception(f"Error saving frame: {str(e)}")
             return False
 
+    @contextmanager
+    def output_session(self):
+        """Open the packed output writer and encoder processes around one
+        extraction; `outputs` lists the packed files afterwards"""
+        if self.output_mode == 'tar':
+            store = TarShardWriter(self.output_dir, 'frames', self.output_format, self.shard_size_mb)
+        elif self.output_mode == 'npy':
+            store = TensorStoreWriter(self.output_dir, 'frames')
+        else:
+            store = None
+        pool = None
+        if self.encoder == 'processes' and self.output_mode != 'npy':
+            pool = SharedMemoryEncoderPool(self.encoder_workers, on_encoded=self._on_encoded)
+
+        self._store, self._encoder_pool = store, pool
+        self.frames_failed = 0
+        try:
+            with store or nullcontext():
+                with pool or nullcontext():
+                    yield
+            if store is not None:
+                self.outputs = store.outputs
+        finally:
+            self._store = self._encoder_pool = None
+            if pool is not None:
+                self.frames_failed = pool.failures
+
+    def _on_encoded(self, data, output_path, frame_count, timestamp):
+        if data is not None:
+            with self.metrics.time('write'):
+                self._store.add(data, frame_count, timestamp)
+        self.metrics.count('frames_written')
+
+    def _encode_args(self):
+        if self.output_format.lower() in ['jpg', 'jpeg']:
+            return '.jpg', [cv2.IMWRITE_JPEG_QUALITY, 95]
+        return f'.{self.output_format}', []
+
+    def _frames_saved(self, frames_submitted):
+        """Frames saved out of those save_frame accepted, once the session has ended"""
+        if self.frames_failed:
+            self.logger.error(f"{self.frames_failed} of {frames_submitted} frames could not be encoded or written")
+        return frames_submitted - self.frames_failed
+
+    @property
+    def frames_suppressed(self):
+        return self.deduplicator.suppressed if self.deduplicator else 0
+
+    def is_duplicate(self, frame):
+        """True when dedup is enabled and the frame matches one already kept"""
+        if not self.deduplicator:
+            return False
+        with self.metrics.time('dedup'):
+            duplicate = self.deduplicator.is_duplicate(frame)
+        if duplicate:
+            self.metrics.count('frames_suppressed')
+        return duplicate
+
+    def _read(self, decoder, schedule, progress_callback=None):
+        """Decode a schedule at the target size; each frame is only valid until
+        the next one, which is all save_frame needs"""
+        return decoder.read(schedule, size=self.resolution, progress_callback=progress_callback,
+                            resize_mode=self.resize_mode, buffers=2)
+
+    def _open_decoder(self, cap):
+        return open_decoder(cap, self.decoder, seek_cost=self.seek_cost, threads=self.decoder_threads,
+                            metrics=self.metrics)
+
+    @staticmethod
+    def _timestamp(decoder, index):
+        return index / decoder.fps if decoder.fps else None
+
+    @staticmethod
+    def _position_callback(progress_callback, total_frames):
+        """Adapt a fractional progress callback to decoder stream positions"""
+        if not progress_callback or total_frames <= 0:
+            return None
+        return lambda position: progress_callback(min(position / total_frames, 1.0))
+
 class FPSFrameExtractor(FrameExtractor):
     def __init__(self, output_dir, fps, **kwargs):
         super().__init__(output_dir, **kwargs)
         self.fps = fps
 
     def extract_frames(self, cap, progress_callback=None):
-        frame_count = 0
         frames_extracted = 0
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(video_fps / self.fps)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                if self.save_frame(frame, frames_extracted):
-                    frames_extracted += 1
-            
-            frame_count += 1
-            if progress_callback:
-                progress_callback(frame_count / total_frames)
-        
-        return frames_extracted
+        decoder = self._open_decoder(cap)
+        frame_interval = int(decoder.fps / self.fps)
+        total_frames = decoder.frame_count
+
+        schedule = build_schedule(decoder.position, total_frames if total_frames > 0 else None, frame_interval)
+        frames = self._read(decoder, schedule, self._position_callback(progress_callback, total_frames))
+        try:
+            with self.output_session():
+                for index, frame in frames:
+                    if self.is_duplicate(frame):
+                        continue
+                    if self.save_frame(frame, frames_extracted, self._timestamp(decoder, index)):
+                        frames_extracted += 1
+        finally:
+            decoder.release()
+
+        if self.frames_suppressed:
+            self.logger.info(f"Suppressed {self.frames_suppressed} near-duplicate frames")
+        return self._frames_saved(frames_extracted)
 
 class TimeIntervalFrameExtractor(FrameExtractor):
     def __init__(self, output_dir, time_interval, **kwargs):
@@ -69,66 +212,53 @@ class TimeIntervalFrameExtractor(FrameExtractor):
         self.time_interval = time_interval
 
     def extract_frames(self, cap, progress_callback=None):
-        frame_count = 0
         frames_extracted = 0
-        prev_timestamp = 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            current_timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-            if current_timestamp - prev_timestamp >= self.time_interval:
-                if self.save_frame(frame, frames_extracted):
-                    frames_extracted += 1
-                prev_timestamp = current_timestamp
-            
-            frame_count += 1
-            if progress_callback:
-                progress_callback(frame_count / total_frames)
-        
-        return frames_extracted
+        decoder = self._open_decoder(cap)
+        total_frames = decoder.frame_count
+
+        schedule = build_time_schedule(decoder.fps, self.time_interval, decoder.position,
+                                       total_frames if total_frames > 0 else None)
+        frames = self._read(decoder, schedule, self._position_callback(progress_callback, total_frames))
+        try:
+            with self.output_session():
+                for index, frame in frames:
+                    if self.is_duplicate(frame):
+                        continue
+                    if self.save_frame(frame, frames_extracted, self._timestamp(decoder, index)):
+                        frames_extracted += 1
+        finally:
+            decoder.release()
+
+        if self.frames_suppressed:
+            self.logger.info(f"Suppressed {self.frames_suppressed} near-duplicate frames")
+        return self._frames_saved(frames_extracted)
 
 class ChangeDetectionFrameExtractor(FrameExtractor):
-    def __init__(self, output_dir, threshold, min_area=500, **kwargs):
+    def __init__(self, output_dir, threshold, min_area=500, analysis_width=160, **kwargs):
         super().__init__(output_dir, **kwargs)
         self.threshold = threshold
         self.min_area = min_area
+        self.detector = SceneDetector(threshold=threshold, min_area=min_area, analysis_width=analysis_width)
 
     def extract_frames(self, cap, progress_callback=None):
-        frame_count = 0
         frames_extracted = 0
-        prev_frame = None
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if prev_frame is None:
-                prev_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                continue
-            
-            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            frame_delta = cv2.absdiff(prev_frame, gray_frame)
-            thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
-            contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            total_change_area = sum(cv2.contourArea(c) for c in contours)
-            frame_area = gray_frame.shape[0] * gray_frame.shape[1]
-            change_percentage = total_change_area / frame_area
-            
-            if change_percentage >= self.threshold and total_change_area >= self.min_area:
-                if self.save_frame(frame, frames_extracted):
-                    frames_extracted += 1
-            
-            prev_frame = gray_frame
-            frame_count += 1
-            if progress_callback:
-                progress_callback(frame_count / total_frames)
-        
-        return frames_extracted
+        decoder = self._open_decoder(cap)
+        total_frames = decoder.frame_count
+
+        try:
+            # Detect changes on downscaled frames, then decode only the kept ones
+            with self.metrics.time('scene'):
+                changes = self.detector.detect(decoder, decoder.position, None,
+                                               self._position_callback(progress_callback, total_frames))
+            with self.output_session():
+                for index, frame in self._read(decoder, changes):
+                    if self.is_duplicate(frame):
+                        continue
+                    if self.save_frame(frame, frames_extracted, self._timestamp(decoder, index)):
+                        frames_extracted += 1
+        finally:
+            decoder.release()
+
+        if self.frames_suppressed:
+            self.logger.info(f"Suppressed {self.frames_suppressed} near-duplicate frames")
+        return self._frames_saved(frames_extracted)
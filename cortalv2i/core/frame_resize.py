@@ -0,0 +1,164 @@
+import cv2
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 'stretch' scales to exactly (width, height); 'fit' keeps the aspect ratio
+# inside that box; 'letterbox' fits and pads the rest of the box with black
+RESIZE_MODES = ('stretch', 'fit', 'letterbox')
+
+
+def parse_resolution(value: Union[None, str, Sequence[int]]) -> Optional[Tuple[int, int]]:
+    """Parse a 'W*H' (or 'WxH') resolution string or a (width, height) pair"""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, str):
+            separator = '*' if '*' in value else 'x'
+            width, height = (int(part) for part in value.lower().split(separator))
+        else:
+            width, height = (int(part) for part in value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid resolution: {value!r} (expected WIDTH*HEIGHT)")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution: {value!r} (expected WIDTH*HEIGHT)")
+    return width, height
+
+
+def resize_plan(width: int, height: int, size: Tuple[int, int], mode: str = 'stretch'):
+    """Layout of a (width, height) frame resized to `size`.
+
+    Returns ((scaled_width, scaled_height), (x, y), (frame_width, frame_height)):
+    the picture is scaled to the first size and placed at (x, y) in a frame of
+    the last size.
+    """
+    if mode not in RESIZE_MODES:
+        raise ValueError(f"Unknown resize mode: {mode} (expected one of {', '.join(RESIZE_MODES)})")
+    size = tuple(size)
+    if mode == 'stretch' or not width or not height:
+        return size, (0, 0), size
+    scale = min(size[0] / width, size[1] / height)
+    scaled = (min(size[0], max(1, round(width * scale))), min(size[1], max(1, round(height * scale))))
+    if mode == 'fit':
+        return scaled, (0, 0), scaled
+    return scaled, ((size[0] - scaled[0]) // 2, (size[1] - scaled[1]) // 2), size
+
+
+def ffmpeg_scale_filters(width: int, height: int, size: Tuple[int, int], mode: str, pix_fmt: str) -> List[str]:
+    """ffmpeg filters producing the same layout as FrameResizer, decoding straight to `size`"""
+    scaled, (x, y), frame = resize_plan(width, height, size, mode)
+    flags = 'area' if scaled[0] < width else 'bicubic'
+    filters = [f"scale={scaled[0]}:{scaled[1]}:flags={flags}"]
+    if frame != scaled:
+        # Padding after the pixel format conversion keeps odd offsets exact
+        filters.extend([f"format={pix_fmt}", f"pad={frame[0]}:{frame[1]}:{x}:{y}:black"])
+    return filters
+
+
+class BufferRing:
+    """A fixed number of reusable frame buffers, handed out in rotation.
+
+    A buffer comes round again `count` calls later, so a caller may hold at
+    most `count - 1` earlier frames while writing the next one. A count of 0
+    allocates a new array on every call.
+    """
+
+    def __init__(self, count: int = 0):
+        self.count = max(0, int(count or 0))
+        self._buffers: Dict[Tuple, List[np.ndarray]] = {}
+        self._next: Dict[Tuple, int] = {}
+
+    def next(self, shape: Tuple[int, ...], zero: bool = False) -> np.ndarray:
+        """The next buffer of `shape`; with `zero` it is zero-filled when first allocated"""
+        if not self.count:
+            return np.zeros(shape, dtype=np.uint8) if zero else np.empty(shape, dtype=np.uint8)
+        buffers = self._buffers.setdefault(shape, [])
+        position = self._next.get(shape, 0)
+        if position == len(buffers) and len(buffers) < self.count:
+            buffers.append(np.zeros(shape, dtype=np.uint8) if zero else np.empty(shape, dtype=np.uint8))
+        self._next[shape] = (position + 1) % self.count
+        return buffers[position]
+
+
+class FrameResizer:
+    """Scale frames to a target size, writing into preallocated buffers.
+
+    Downscaling uses INTER_AREA, preceded by a bilinear step to twice the
+    target size when the frame is more than twice as wide, since a full area
+    pass over a 4K frame is expensive. Upscaling uses INTER_LINEAR. The
+    intermediate and (with `buffers`) the output arrays are allocated once
+    per input shape and reused, instead of on every frame.
+    """
+
+    def __init__(self, size: Optional[Tuple[int, int]], mode: str = 'stretch', gray: bool = False,
+                 buffers: int = 0):
+        """
+        Args:
+            size: Target (width, height), None to keep the frame size
+            mode: One of RESIZE_MODES
+            gray: Also convert BGR frames to single-channel grayscale
+            buffers: Output buffers to rotate through, 0 for a new array per
+                frame; see BufferRing for how long a returned frame stays valid
+        """
+        if mode not in RESIZE_MODES:
+            raise ValueError(f"Unknown resize mode: {mode} (expected one of {', '.join(RESIZE_MODES)})")
+        self.size = tuple(size) if size else None
+        self.mode = mode
+        self.gray = gray
+        self.ring = BufferRing(buffers)
+        self._plans = {}
+        self._scratch: Dict[Tuple, np.ndarray] = {}
+
+    def output_size(self, width: int, height: int) -> Tuple[int, int]:
+        """(width, height) of the frames produced from a width x height input"""
+        if not self.size:
+            return width, height
+        return resize_plan(width, height, self.size, self.mode)[2]
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        gray = self.gray and frame.ndim == 3
+        plan = self._plans.get((height, width))
+        if plan is None:
+            plan = self._plans[(height, width)] = (resize_plan(width, height, self.size, self.mode)
+                                                   if self.size else ((width, height), (0, 0), (width, height)))
+        scaled, (x, y), size = plan
+        if scaled == (width, height) and size == scaled and not gray:
+            return frame
+
+        channels = () if gray or frame.ndim == 2 else frame.shape[2:]
+        output = self.ring.next((size[1], size[0]) + channels, zero=size != scaled)
+        target = output[y:y + scaled[1], x:x + scaled[0]] if size != scaled else output
+        if gray:
+            if scaled != (width, height):
+                frame = self._resize(frame, self._buffer('color', (scaled[1], scaled[0]) + frame.shape[2:]))
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=target)
+        else:
+            self._resize(frame, target)
+        return output
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        key = (name, shape)
+        buffer = self._scratch.get(key)
+        if buffer is None:
+            buffer = self._scratch[key] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def _resize(self, frame: np.ndarray, target: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (target.shape[1], target.shape[0])
+        if (width, height) == size:
+            np.copyto(target, frame)
+        elif width > 2 * size[0]:
+            step = self._buffer('step', (2 * size[1], 2 * size[0]) + frame.shape[2:])
+            cv2.resize(frame, (2 * size[0], 2 * size[1]), dst=step, interpolation=cv2.INTER_LINEAR)
+            cv2.resize(step, size, dst=target, interpolation=cv2.INTER_AREA)
+        else:
+            interpolation = cv2.INTER_AREA if width > size[0] else cv2.INTER_LINEAR
+            cv2.resize(frame, size, dst=target, interpolation=interpolation)
+        return target
+
+
+def resize_frame(frame: np.ndarray, size: Tuple[int, int], mode: str = 'stretch') -> np.ndarray:
+    """Resize a single frame to (width, height) with an interpolation suited to the scale"""
+    return FrameResizer(size, mode)(frame)
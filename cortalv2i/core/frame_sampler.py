@@ -0,0 +1,159 @@
+import cv2
+import itertools
+import logging
+import math
+import time
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Prior cost of a seek, expressed in sequential grabs. A seek lands on the
+# preceding keyframe and decodes forward from there, so it costs roughly half
+# a GOP plus the demuxer reset. Two seconds of 30 fps footage is a sane prior
+# until real timings have been measured.
+DEFAULT_SEEK_COST = 60
+
+# Weight of the newest timing sample in the running cost estimates
+_EWMA_ALPHA = 0.2
+
+
+def build_schedule(start_frame: int, end_frame: Optional[int], step: int,
+                   origin: Optional[int] = None) -> Iterable[int]:
+    """Return the frame indices to sample in [start_frame, end_frame).
+
+    Args:
+        start_frame: First frame of the range
+        end_frame: End of the range (exclusive), None for an open-ended stream
+        step: Distance in frames between two samples
+        origin: Frame the sampling grid is anchored to (defaults to start_frame)
+    """
+    step = max(1, int(step))
+    origin = start_frame if origin is None else origin
+    first = start_frame + (origin - start_frame) % step
+    if end_frame is None:
+        return itertools.count(first, step)
+    return range(first, end_frame, step)
+
+
+def build_time_schedule(fps: float, interval: float, start_frame: int = 0,
+                        end_frame: Optional[int] = None) -> Iterator[int]:
+    """Yield one frame index per `interval` seconds of video time.
+
+    The first sample is taken once `interval` seconds have elapsed, matching
+    the timestamp-based selection of TimeIntervalFrameExtractor.
+    """
+    if fps <= 0 or interval <= 0:
+        return
+    last = -1
+    for k in itertools.count(1):
+        target = start_frame + int(math.ceil(k * interval * fps - 1e-6))
+        if end_frame is not None and target >= end_frame:
+            return
+        if target > last:
+            last = target
+            yield target
+
+
+class FrameSampler:
+    """Decode only the frames of a sampling schedule from a VideoCapture.
+
+    Skipped frames are advanced with `grab()` (no `retrieve()` and no BGR
+    conversion). For every gap a small cost model decides whether walking
+    forward with grabs or seeking straight to the target is cheaper; the
+    model starts from DEFAULT_SEEK_COST and refines itself from measured
+    grab and seek timings.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, seek_cost: float = DEFAULT_SEEK_COST):
+        self.cap = cap
+        self.seek_cost = seek_cost
+        self.position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        self.grabs = 0
+        self.seeks = 0
+        self.skipped = 0
+        self._grab_time = None
+        self._seek_time = None
+
+    def sample(self, schedule: Iterable[int],
+               progress_callback: Optional[Callable[[int], None]] = None
+               ) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for every index in an ascending schedule.
+
+        Args:
+            schedule: Ascending absolute frame indices to decode
+            progress_callback: Called with the absolute stream position after
+                each sampled frame
+        """
+        for target in schedule:
+            if not self._advance_to(target):
+                return
+            if self.position > target:
+                # Not even a seek to the start landed before it; never label
+                # a later frame with this index
+                logger.debug(f"Skipping frame {target}, stream is already at {self.position}")
+                self.skipped += 1
+                continue
+
+            ret, frame = self.cap.read()
+            if not ret:
+                return
+            self.position = target + 1
+
+            if progress_callback:
+                progress_callback(self.position)
+            yield target, frame
+
+    def _advance_to(self, target: int) -> bool:
+        gap = target - self.position
+        if gap < 0 or (gap > 0 and self._seek_is_cheaper(gap)):
+            self._seek(target)
+            if self.position > target:
+                logger.debug(f"Seek to frame {target} landed at {self.position}")
+                self._seek_before(target)
+                if self.position > target:
+                    return True
+            gap = target - self.position
+
+        if gap == 0:
+            return True
+
+        started = time.perf_counter()
+        for _ in range(gap):
+            if not self.cap.grab():
+                return False
+        self._record_grab((time.perf_counter() - started) / gap)
+        self.grabs += gap
+        self.position = target
+        return True
+
+    def _seek_is_cheaper(self, gap: int) -> bool:
+        if self._grab_time is None or self._seek_time is None:
+            return gap > self.seek_cost
+        return gap * self._grab_time > self._seek_time
+
+    def _seek_before(self, target: int):
+        """Seek further back, doubling the distance, until the stream is at or before target"""
+        backoff = max(1, int(self.seek_cost))
+        while self.position > target:
+            earlier = max(0, target - backoff)
+            self._seek(earlier)
+            if earlier == 0:
+                return
+            backoff *= 2
+
+    def _seek(self, target: int):
+        started = time.perf_counter()
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        # Reading the position back forces the demuxer to settle, and some
+        # containers land on a different frame than requested
+        self.position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        elapsed = time.perf_counter() - started
+        self._seek_time = elapsed if self._seek_time is None else (
+            _EWMA_ALPHA * elapsed + (1 - _EWMA_ALPHA) * self._seek_time)
+        self.seeks += 1
+
+    def _record_grab(self, elapsed: float):
+        self._grab_time = elapsed if self._grab_time is None else (
+            _EWMA_ALPHA * elapsed + (1 - _EWMA_ALPHA) * self._grab_time)
@@ -0,0 +1,215 @@
+import io
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cortalv2i.utils.utils import atomic_write, partial_path
+
+logger = logging.getLogger(__name__)
+
+# 'files' writes one image per frame; 'tar' packs encoded images into
+# shards; 'npy' stores decoded pixels in a memory-mappable tensor
+OUTPUT_MODES = ('files', 'tar', 'npy')
+
+DEFAULT_SHARD_SIZE_MB = 1024
+
+# Fixed .npy header length, so the header can be rewritten in place once the
+# final frame count is known
+_NPY_HEADER_SIZE = 128
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+INDEX_DTYPE = np.dtype([('frame', '<i8'), ('timestamp', '<f8'), ('offset', '<i8')])
+
+
+class TarShardWriter:
+    """Pack encoded frames into size-bounded, WebDataset-style tar shards.
+
+    Shards are named `{prefix}-00000.tar`, `{prefix}-00001.tar`, ... and a
+    new one is started before a shard would exceed `shard_size_mb`. Each shard
+    is written under a hidden temporary name and renamed when complete.
+    `{prefix}-index.json` records, for every frame, the shard it lives in and
+    the byte offset and size of its data, so a single frame can be read with
+    one seek without scanning the archive. `add` is thread-safe.
+    """
+
+    def __init__(self, output_dir: str, prefix: str = 'frames', output_format: str = 'jpg',
+                 shard_size_mb: float = DEFAULT_SHARD_SIZE_MB):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.output_format = output_format
+        self.shard_size = int(shard_size_mb * 1024 * 1024)
+        self.index_path = os.path.join(output_dir, f"{prefix}-index.json")
+        self.shards: List[str] = []
+        self.samples: List[Dict] = []
+        self.outputs: List[str] = []
+
+        self._lock = threading.Lock()
+        self._tar = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def add(self, data: bytes, frame_index: int, timestamp: Optional[float] = None):
+        """Append one encoded frame as `frame_{frame_index:06d}.{format}`"""
+        key = f"frame_{frame_index:06d}"
+        info = tarfile.TarInfo(f"{key}.{self.output_format}")
+        info.size = len(data)
+        info.mtime = int(time.time())
+
+        with self._lock:
+            if self._tar is None or (self._tar.offset + len(data) > self.shard_size and self._tar.offset > 0):
+                self._next_shard()
+            self._tar.addfile(info, io.BytesIO(data))
+            # Member data ends on a 512-byte block boundary right before the new offset
+            padded = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            self.samples.append({
+                'key': key,
+                'shard': os.path.basename(self.shards[-1]),
+                'offset': self._tar.offset - padded,
+                'size': len(data),
+                'frame': frame_index,
+                'timestamp': timestamp
+            })
+
+    def close(self) -> List[str]:
+        """Finish the last shard, write the index and return all output paths"""
+        with self._lock:
+            self._finish_shard()
+            self.samples.sort(key=lambda sample: sample['frame'])
+            index = {
+                'format': self.output_format,
+                'shards': [os.path.basename(path) for path in self.shards],
+                'samples': self.samples
+            }
+            atomic_write(self.index_path, json.dumps(index).encode())
+        self.outputs = self.shards + [self.index_path]
+        return self.outputs
+
+    def abort(self):
+        with self._lock:
+            if self._tar is not None:
+                self._tar.close()
+                os.remove(self._tmp_path)
+                self._tar = None
+
+    def _next_shard(self):
+        self._finish_shard()
+        path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.shards):05d}.tar")
+        self._tmp_path = partial_path(path)
+        self._tar = tarfile.open(self._tmp_path, 'w', format=tarfile.USTAR_FORMAT)
+        self.shards.append(path)
+
+    def _finish_shard(self):
+        if self._tar is None:
+            return
+        self._tar.close()
+        os.replace(self._tmp_path, self.shards[-1])
+        self._tar = None
+
+
+class TensorStoreWriter:
+    """Write decoded frames into one memory-mappable `.npy` tensor.
+
+    Frames are appended as raw uint8 pixels behind a fixed-size header that
+    is filled in with the final (count, height, width[, channels]) shape on
+    close, so the frame count does not have to be known up front. A
+    companion `{prefix}-index.npy` table holds the frame number, timestamp
+    and byte offset of each row. All frames must have the same shape.
+    """
+
+    def __init__(self, output_dir: str, prefix: str = 'frames'):
+        self.path = os.path.join(output_dir, f"{prefix}.npy")
+        self.index_path = os.path.join(output_dir, f"{prefix}-index.npy")
+        self.frame_shape = None
+        self.rows: List[Tuple[int, float, int]] = []
+        self.outputs: List[str] = []
+
+        self._tmp_path = partial_path(self.path)
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(b'\0' * _NPY_HEADER_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def append(self, frame: np.ndarray, frame_index: int, timestamp: Optional[float] = None):
+        if frame.dtype != np.uint8:
+            raise ValueError(f"Tensor store only holds uint8 frames, got {frame.dtype}")
+        if self.frame_shape is None:
+            self.frame_shape = frame.shape
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the store's {self.frame_shape}")
+        offset = self._file.tell()
+        self._file.write(np.ascontiguousarray(frame).data)
+        self.rows.append((frame_index, np.nan if timestamp is None else timestamp, offset))
+
+    def close(self) -> List[str]:
+        """Write the final header and the index table, and return both paths"""
+        shape = (len(self.rows),) + tuple(self.frame_shape or (0, 0, 3))
+        self._file.seek(0)
+        self._file.write(_npy_header(shape))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+        buffer = io.BytesIO()
+        np.save(buffer, np.array(self.rows, dtype=INDEX_DTYPE))
+        atomic_write(self.index_path, buffer.getvalue())
+        self.outputs = [self.path, self.index_path]
+        return self.outputs
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp_path)
+
+
+def _npy_header(shape: Tuple[int, ...]) -> bytes:
+    header = f"{{'descr': '|u1', 'fortran_order': False, 'shape': {shape!r}, }}"
+    length = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2
+    if len(header) + 1 > length:
+        raise ValueError(f"Shape {shape} does not fit in the fixed .npy header")
+    header = header.ljust(length - 1) + '\n'
+    return _NPY_MAGIC + length.to_bytes(2, 'little') + header.encode('latin1')
+
+
+def open_tensor_store(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Memory-map a tensor store written by TensorStoreWriter.
+
+    Returns:
+        (frames, index): the read-only frames array and its
+        (frame, timestamp, offset) record table
+    """
+    frames = np.load(path, mmap_mode='r')
+    index = np.load(os.path.splitext(path)[0] + '-index.npy')
+    return frames, index
+
+
+def read_tar_frame(index_path: str, frame_index: int) -> bytes:
+    """Return the encoded bytes of one frame from a set of tar shards"""
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    for sample in index['samples']:
+        if sample['frame'] == frame_index:
+            with open(os.path.join(os.path.dirname(index_path), sample['shard']), 'rb') as shard:
+                shard.seek(sample['offset'])
+                return shard.read(sample['size'])
+    raise KeyError(f"Frame {frame_index} is not in {index_path}")
@@ -0,0 +1,93 @@
+import logging
+import queue
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default cap on the bytes of decoded frames waiting for (or being) encoded
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+_STOP = object()
+
+
+class FrameWriterPipeline:
+    """Bounded producer/consumer pipeline for encoding frames during decode.
+
+    The decode loop hands frames to `submit`, which returns immediately while
+    the in-flight frames fit in the memory budget and blocks otherwise
+    (backpressure). Writer threads encode and release frames as they go, so
+    peak memory is bounded by the budget instead of by the chunk length.
+    """
+
+    def __init__(self, write_fn: Callable, max_workers: int = 4,
+                 memory_budget_mb: Optional[float] = DEFAULT_MEMORY_BUDGET_MB):
+        """
+        Args:
+            write_fn: Called as write_fn(frame, *args) on a writer thread
+            max_workers: Number of writer threads
+            memory_budget_mb: Upper bound on in-flight frame memory, None for unbounded
+        """
+        self.write_fn = write_fn
+        self.max_workers = max(1, max_workers)
+        self.memory_budget = None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        self.frames_written = 0
+        self.peak_bytes = 0
+
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self):
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"frame-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, frame, *args):
+        """Queue a frame for writing, blocking while the memory budget is exhausted"""
+        nbytes = frame.nbytes
+        with self._cond:
+            # Always admit a frame when nothing is in flight so an oversized
+            # frame cannot deadlock the pipeline
+            while (self.memory_budget is not None and self._in_flight
+                   and self._in_flight + nbytes > self.memory_budget):
+                self._cond.wait()
+            self._in_flight += nbytes
+            self.peak_bytes = max(self.peak_bytes, self._in_flight)
+        self._queue.put((frame, args, nbytes))
+
+    def close(self):
+        """Wait until every queued frame has been written and stop the writers"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            frame, args, nbytes = item
+            try:
+                self.write_fn(frame, *args)
+                with self._cond:
+                    self.frames_written += 1
+            except Exception as e:
+                logger.error(f"Error writing frame: {str(e)}")
+            finally:
+                del frame, item
+                with self._cond:
+                    self._in_flight -= nbytes
+                    self._cond.notify()
@@ -0,0 +1,195 @@
+import logging
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cortalv2i.utils.media_probe import probe_media
+from cortalv2i.utils.metrics import Metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg raw sample format for each block dtype (always little-endian)
+PCM_FORMATS = {
+    'int16': 's16le',
+    'int32': 's32le',
+    'float32': 'f32le',
+    'float64': 'f64le'
+}
+
+# Blocks decoded ahead of the consumer
+DEFAULT_READ_AHEAD = 8
+
+
+def time_ranges(duration: float, chunk_duration: float) -> List[Tuple[float, float]]:
+    """(start_time, end_time) ranges splitting `duration` seconds into chunks, for one PCMStream each"""
+    if duration <= 0 or chunk_duration <= 0:
+        return []
+    count = max(1, int(-(-duration // chunk_duration)))
+    return [(i * chunk_duration, min((i + 1) * chunk_duration, duration)) for i in range(count)]
+
+
+class PCMStream:
+    """Decoded audio as fixed-size NumPy blocks, straight from an ffmpeg pipe.
+
+    ffmpeg decodes, downmixes and resamples the source's first audio track
+    to raw samples on stdout; nothing is encoded or written to disk. Each
+    block is a (block_size, channels) array, only the last one may be
+    shorter (or zero-padded with `pad`). Iterating yields
+    (sample_offset, block), the offset counting samples from the start of
+    the source, so blocks of separate time ranges line up.
+
+    A reader thread keeps up to `read_ahead` blocks decoded ahead of the
+    consumer. ffmpeg runs in its own process, so a stream can be consumed
+    next to frame extraction (in another thread, or interleaved) without
+    either waiting on the other; several streams over `time_ranges` can
+    run side by side.
+    """
+
+    def __init__(self, source: str, sample_rate: int = 16000, channels: int = 1, dtype: str = 'float32',
+                 block_size: Optional[int] = None, start_time: Optional[float] = None,
+                 end_time: Optional[float] = None, pad: bool = False,
+                 read_ahead: int = DEFAULT_READ_AHEAD, metrics: Optional[Metrics] = None):
+        """
+        Args:
+            source: Media path or URL understood by ffmpeg
+            sample_rate: Output sample rate in Hz
+            channels: Output channel count (1 downmixes to mono)
+            dtype: Sample type, one of PCM_FORMATS; floats are in [-1, 1]
+            block_size: Samples per channel in each block (default: one second)
+            start_time: Start of the range in seconds (default: the beginning)
+            end_time: End of the range in seconds (default: the end)
+            pad: Zero-pad the last block to block_size
+            read_ahead: Most blocks decoded ahead of the consumer
+            metrics: Registry for 'audio' timings (default: get_metrics())
+        """
+        dtype = np.dtype(dtype).name
+        if dtype not in PCM_FORMATS:
+            raise ValueError(f"Unsupported sample type: {dtype} (expected one of {', '.join(PCM_FORMATS)})")
+        if sample_rate <= 0 or channels <= 0:
+            raise ValueError("Sample rate and channel count must be positive")
+        self.source = source
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.sample_format = PCM_FORMATS[dtype]
+        self.block_size = int(block_size or self.sample_rate)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.pad = pad
+        self.read_ahead = max(1, read_ahead)
+        self.metrics = metrics or get_metrics()
+
+        if not probe_media(source).has_audio:
+            raise ValueError(f"No audio stream found in: {source}")
+
+    @property
+    def first_sample(self) -> int:
+        """Offset of the first sample of the range from the start of the source"""
+        return int(round((self.start_time or 0.0) * self.sample_rate))
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        stderr = tempfile.TemporaryFile()
+        process = subprocess.Popen(self._command(), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+        blocks = queue.Queue(maxsize=self.read_ahead)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_blocks, args=(process.stdout, blocks, stop), daemon=True)
+        reader.start()
+
+        offset = self.first_sample
+        completed = False
+        try:
+            while True:
+                with self.metrics.time('audio'):
+                    block = blocks.get()
+                if isinstance(block, BaseException):
+                    raise block
+                if block is None:
+                    break
+                samples = len(block)
+                if self.pad and samples < self.block_size:
+                    block = np.concatenate([block, np.zeros((self.block_size - samples, self.channels),
+                                                            dtype=self.dtype)])
+                self.metrics.count('audio_seconds', samples / self.sample_rate)
+                yield offset, block
+                offset += samples
+            completed = True
+        finally:
+            stop.set()
+            if not completed and process.poll() is None:
+                process.kill()
+            # Unblock the reader if it is waiting for room in the queue
+            while reader.is_alive():
+                try:
+                    blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            returncode = process.wait()
+            process.stdout.close()
+            stderr.seek(0)
+            errors = stderr.read().decode(errors='replace').strip()
+            stderr.close()
+        if returncode != 0:
+            raise IOError(f"ffmpeg failed decoding the audio of {self.source}: {errors}")
+        if errors:
+            logger.debug(f"ffmpeg pcm stream: {errors}")
+
+    def read(self) -> np.ndarray:
+        """The whole range as one (samples, channels) array"""
+        blocks = [block for _, block in self]
+        if not blocks:
+            return np.empty((0, self.channels), dtype=self.dtype)
+        return np.concatenate(blocks)
+
+    def _command(self) -> List[str]:
+        cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error']
+        # Seek on the input side, as AudioExtractor does for its chunks
+        if self.start_time:
+            cmd.extend(['-ss', str(self.start_time)])
+        if self.end_time is not None:
+            cmd.extend(['-t', str(self.end_time - (self.start_time or 0.0))])
+        cmd.extend([
+            '-i', self.source,
+            '-map', '0:a:0', '-vn', '-sn', '-dn',
+            '-ac', str(self.channels),
+            '-ar', str(self.sample_rate),
+            '-acodec', f"pcm_{self.sample_format}",
+            '-f', self.sample_format,
+            'pipe:1'
+        ])
+        return cmd
+
+    def _read_blocks(self, pipe, blocks: queue.Queue, stop: threading.Event):
+        """Reader thread: fill blocks from the pipe until it ends or the consumer stops"""
+        block_bytes = self.block_size * self.channels * self.dtype.itemsize
+        try:
+            while not stop.is_set():
+                block = np.empty((self.block_size, self.channels), dtype=self.dtype)
+                view = memoryview(block.reshape(-1).view(np.uint8))
+                filled = 0
+                while filled < block_bytes:
+                    count = pipe.readinto(view[filled:])
+                    if not count:
+                        break
+                    filled += count
+                # A partial sample at the very end cannot be used
+                samples = filled // (self.channels * self.dtype.itemsize)
+                if samples:
+                    self._put(blocks, block[:samples], stop)
+                if filled < block_bytes:
+                    break
+            self._put(blocks, None, stop)
+        except Exception as e:
+            self._put(blocks, e, stop)
+
+    @staticmethod
+    def _put(blocks: queue.Queue, item, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
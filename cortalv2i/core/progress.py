@@ -0,0 +1,220 @@
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between aggregated updates published by a ProgressBus
+DEFAULT_INTERVAL = 0.25
+# Minimum seconds between two posts of the same chunk from a worker
+POST_INTERVAL = 0.1
+
+# Time of the last post per (process, chunk)
+_last_posted = {}
+# Posted by the parent when a chunk's future has finished
+_COMPLETE = None
+
+
+def report_progress(chunk_info: dict, progress: float):
+    """Post a chunk's progress (0..1) to the parent's progress queue.
+
+    Cheap enough to call on every frame: a chunk posts at most once per
+    POST_INTERVAL, plus its final 1.0. Nothing is posted when the chunk has
+    no 'progress_queue'.
+    """
+    progress_queue = chunk_info.get('progress_queue')
+    if progress_queue is None:
+        return
+    key = (os.getpid(), chunk_info['index'])
+    now = time.monotonic()
+    if progress < 1.0:
+        last = _last_posted.get(key)
+        if last is not None and now - last < POST_INTERVAL:
+            return
+        _last_posted[key] = now
+    else:
+        _last_posted.pop(key, None)
+    progress_queue.put((chunk_info['index'], progress))
+
+
+def throttle(callback: Optional[Callable[[float], None]],
+             interval: float = POST_INTERVAL) -> Optional[Callable[[float], None]]:
+    """Wrap a progress callback so it runs at most once per `interval`
+    seconds; a final 1.0 is always passed through"""
+    if callback is None:
+        return None
+    last = [None]
+
+    def throttled(progress):
+        now = time.monotonic()
+        if progress < 1.0 and last[0] is not None and now - last[0] < interval:
+            return
+        last[0] = now
+        callback(progress)
+    return throttled
+
+
+@dataclass
+class ProgressUpdate:
+    """Aggregated progress of one ChunkExecutor run"""
+    overall: float
+    completed: int
+    total: int
+    elapsed: float
+    # chunk index -> progress (0..1)
+    chunks: Dict[int, float] = field(default_factory=dict)
+    # source -> weighted progress of its chunks, for chunks with a 'source'
+    sources: Dict[str, float] = field(default_factory=dict)
+    final: bool = False
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the average rate so far, None before any progress"""
+        if self.overall <= 0:
+            return None
+        return self.elapsed * (1.0 - self.overall) / self.overall
+
+
+class ProgressBus:
+    """Aggregates the progress workers post and publishes it at a fixed rate.
+
+    Workers put (index, progress) tuples on `progress_queue` (see
+    report_progress). A single reporter thread drains the queue, keeps the
+    latest value per chunk and, at most once per `interval`, hands a
+    ProgressUpdate to every subscriber. Subscribers, including the tqdm bars,
+    therefore run on one thread only and never contend with the workers.
+    """
+
+    def __init__(self, chunks: List[dict], progress_queue, weights: Optional[List[float]] = None,
+                 interval: float = DEFAULT_INTERVAL):
+        """
+        Args:
+            chunks: Chunk descriptions with a unique 'index' and optional 'source'
+            progress_queue: Queue the workers post to (thread or Manager queue)
+            weights: Relative cost of each chunk, equal when omitted or all zero
+            interval: Seconds between published updates
+        """
+        self.queue = progress_queue
+        self.interval = interval
+        if not weights or not sum(weights):
+            weights = [1.0] * len(chunks)
+        total_weight = float(sum(weights))
+        self._shares = {chunk['index']: weight / total_weight for chunk, weight in zip(chunks, weights)}
+        self._sources = {chunk['index']: chunk['source'] for chunk in chunks if chunk.get('source')}
+        self._progress = {chunk['index']: 0.0 for chunk in chunks}
+        self._completed = set()
+        self._subscribers: List[Callable[[ProgressUpdate], None]] = []
+        self._thread = None
+        self._started = None
+
+    def subscribe(self, callback: Callable[[ProgressUpdate], None]):
+        """Call `callback` with every published ProgressUpdate (on the reporter thread)"""
+        self._subscribers.append(callback)
+        return callback
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def complete(self, index: int):
+        """Mark a chunk as finished, whether or not it posted its final progress"""
+        self.queue.put((index, _COMPLETE))
+
+    def stop(self):
+        """Publish the final update and wait for the reporter thread"""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def snapshot(self, final: bool = False) -> ProgressUpdate:
+        overall = sum(self._progress[index] * share for index, share in self._shares.items())
+        sources, source_shares = {}, {}
+        for index, source in self._sources.items():
+            share = self._shares[index]
+            sources[source] = sources.get(source, 0.0) + self._progress[index] * share
+            source_shares[source] = source_shares.get(source, 0.0) + share
+        return ProgressUpdate(
+            overall=min(overall, 1.0),
+            completed=len(self._completed),
+            total=len(self._progress),
+            elapsed=time.monotonic() - self._started if self._started else 0.0,
+            chunks=dict(self._progress),
+            sources={source: min(done / source_shares[source], 1.0) if source_shares[source] else 1.0
+                     for source, done in sources.items()},
+            final=final
+        )
+
+    def _apply(self, message):
+        index, progress = message
+        if index not in self._progress:
+            return
+        if progress is _COMPLETE:
+            self._completed.add(index)
+            progress = 1.0
+        # A chunk marked complete stays at 1.0 whatever it posted last
+        self._progress[index] = max(self._progress[index], min(progress, 1.0))
+
+    def _publish(self, final: bool = False):
+        update = self.snapshot(final)
+        for callback in self._subscribers:
+            try:
+                callback(update)
+            except Exception as e:
+                logger.error(f"Progress subscriber error: {str(e)}")
+
+    def _run(self):
+        next_publish = time.monotonic() + self.interval
+        changed = False
+        while True:
+            try:
+                message = self.queue.get(timeout=max(0.0, next_publish - time.monotonic()))
+            except queue.Empty:
+                message = ()
+            if message is None:
+                self._publish(final=True)
+                return
+            if message:
+                self._apply(message)
+                changed = True
+            if time.monotonic() >= next_publish:
+                if changed:
+                    self._publish()
+                    changed = False
+                next_publish = time.monotonic() + self.interval
+
+
+class ProgressBars:
+    """Render ProgressUpdates with tqdm: one bar per chunk, or a single
+    weighted total bar"""
+
+    def __init__(self, chunks: List[dict], desc: str = "Chunk", per_chunk: bool = True):
+        # Imported here so headless runs and `--help` do not pay for tqdm
+        from tqdm import tqdm
+
+        if per_chunk:
+            self.bars = {
+                chunk['index']: tqdm(total=100, desc=f"{desc} {chunk['index']}/{chunk['total']}",
+                                     position=position)
+                for position, chunk in enumerate(chunks)
+            }
+        else:
+            self.bars = {None: tqdm(total=100, desc=desc, unit="%")}
+
+    def __call__(self, update: ProgressUpdate):
+        for index, bar in self.bars.items():
+            progress = update.overall if index is None else update.chunks.get(index, 0.0)
+            percent = min(int(progress * 100), 100)
+            if percent != bar.n:
+                bar.n = percent
+                bar.refresh()
+
+    def close(self):
+        for bar in self.bars.values():
+            bar.close()
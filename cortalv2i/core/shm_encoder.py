@@ -0,0 +1,197 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from cortalv2i.utils.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Where frames are encoded: writer threads in the decoding process, or
+# encoder processes fed through shared memory
+ENCODERS = ('threads', 'processes')
+
+_STOP = None
+
+
+def _encode_slot(shm, offset, shape, dtype, ext, params) -> np.ndarray:
+    import cv2
+
+    # The view into the ring only lives for the duration of the encode
+    frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+    ok, encoded = cv2.imencode(ext, frame, params)
+    if not ok:
+        raise ValueError("image encoding failed")
+    return encoded
+
+
+def _encoder_worker(shm_name: str, tasks, results):
+    import cv2
+    cv2.setNumThreads(1)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                return
+            slot, offset, shape, dtype, ext, params, output_path = task
+            try:
+                encoded = _encode_slot(shm, offset, shape, dtype, ext, params)
+                if output_path is None:
+                    results.put((slot, True, encoded.tobytes()))
+                else:
+                    atomic_write(output_path, encoded.tobytes())
+                    results.put((slot, True, None))
+            except Exception as e:
+                results.put((slot, False, f"{output_path or 'frame'}: {str(e)}"))
+    finally:
+        shm.close()
+
+
+class SharedMemoryEncoderPool:
+    """Encode frames on worker processes fed through a shared-memory ring buffer.
+
+    The ring holds `slots` preallocated frame buffers in one
+    `multiprocessing.shared_memory` block, sized from the first submitted
+    frame. `submit` copies a frame into a free slot and only sends the slot
+    number and encoding arguments to a worker, which encodes the frame in
+    place, so frames are never pickled. A slot is recycled as soon as its
+    frame is encoded; when every slot is busy `submit` blocks (backpressure).
+    Results are delivered to `on_encoded` on a collector thread in the parent.
+    """
+
+    def __init__(self, max_workers: int = 4, slots: Optional[int] = None,
+                 on_encoded: Optional[Callable] = None):
+        """
+        Args:
+            max_workers: Number of encoder processes
+            slots: Number of frame slots in the ring (default: 2 per worker)
+            on_encoded: Called as on_encoded(data, output_path, *args) after a
+                frame is encoded; data is the encoded bytes when submit was
+                given no output path, None when the worker wrote the file itself
+        """
+        self.max_workers = max(1, max_workers)
+        self.slots = max(slots or 2 * self.max_workers, 1)
+        self.on_encoded = on_encoded
+        self.slot_bytes = 0
+        self.frames_written = 0
+        self.failures = 0
+
+        self._context = multiprocessing.get_context('spawn')
+        self._shm = None
+        self._workers = []
+        self._tasks = None
+        self._results = None
+        self._collector = None
+        self._free = queue.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def submit(self, frame: np.ndarray, ext: str, params: Sequence[int] = (),
+               output_path: Optional[str] = None, *args):
+        """Copy a frame into a free slot and queue it for encoding.
+
+        Args:
+            frame: Frame to encode; every frame must fit in the first one's slot
+            ext: Image extension for cv2.imencode ('.jpg', '.png', ...)
+            params: cv2.imencode parameters
+            output_path: File the worker writes atomically, or None to get
+                the encoded bytes back through on_encoded
+            *args: Passed through to on_encoded
+        """
+        if self._shm is None:
+            self._start(frame.nbytes)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit in a {self.slot_bytes} byte slot")
+
+        slot = self._acquire_slot()
+        offset = slot * self.slot_bytes
+        target = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=offset)
+        np.copyto(target, frame)
+        del target
+
+        with self._lock:
+            self._pending[slot] = (output_path, args)
+        self._tasks.put((slot, offset, frame.shape, frame.dtype.str, ext, list(params), output_path))
+
+    def close(self):
+        """Wait for every queued frame, stop the workers and free the ring"""
+        if self._shm is None:
+            return
+        try:
+            for _ in self._workers:
+                self._tasks.put(_STOP)
+            for worker in self._workers:
+                worker.join()
+            self._results.put(_STOP)
+            self._collector.join()
+        finally:
+            self._workers = []
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _start(self, slot_bytes: int):
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(slot_bytes * self.slots, 1))
+        for slot in range(self.slots):
+            self._free.put(slot)
+
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        for i in range(self.max_workers):
+            worker = self._context.Process(
+                target=_encoder_worker,
+                args=(self._shm.name, self._tasks, self._results),
+                name=f"frame-encoder-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+        self._collector = threading.Thread(target=self._collect, name="frame-encoder-results", daemon=True)
+        self._collector.start()
+
+    def _acquire_slot(self) -> int:
+        while True:
+            try:
+                return self._free.get(timeout=1.0)
+            except queue.Empty:
+                # A dead worker would never hand its slot back
+                if not all(worker.is_alive() for worker in self._workers):
+                    raise RuntimeError("A frame encoder process exited unexpectedly")
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is _STOP:
+                return
+            slot, ok, payload = message
+            with self._lock:
+                output_path, args = self._pending.pop(slot)
+            self._free.put(slot)
+
+            if not ok:
+                self.failures += 1
+                logger.error(f"Error encoding frame {payload}")
+                continue
+            if self.on_encoded:
+                try:
+                    self.on_encoded(payload, output_path, *args)
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Error handling encoded frame: {str(e)}")
+                    continue
+            self.frames_written += 1
@@ -0,0 +1,178 @@
+import logging
+import threading
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from cortalv2i.utils.utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_AHEAD_MB = 32
+# Size of each network read and of each write into the decoder
+CHUNK_SIZE = 256 * 1024
+# Reconnect attempts after a dropped connection, resuming with a Range request
+DEFAULT_RETRIES = 3
+
+
+class ReadAheadBuffer:
+    """Bounded byte FIFO between one producer thread and one consumer.
+
+    `write` blocks while `capacity` bytes are waiting, so a fast network
+    cannot run ahead of a slow decoder by more than the buffer size.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._data = bytearray()
+        self._cond = threading.Condition()
+        self._eof = False
+        self._closed = False
+        self.error: Optional[BaseException] = None
+
+    def write(self, data: bytes) -> bool:
+        """Append data, waiting for room; False once the consumer has closed the buffer"""
+        view = memoryview(data)
+        while len(view):
+            with self._cond:
+                while len(self._data) >= self.capacity and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return False
+                room = self.capacity - len(self._data)
+                self._data += view[:room]
+                view = view[room:]
+                self._cond.notify_all()
+        return True
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Mark the end of the data; readers see `error` raised after the buffered bytes"""
+        with self._cond:
+            self._eof = True
+            self.error = error
+            self._cond.notify_all()
+
+    def read(self, size: int) -> bytes:
+        """Up to `size` bytes, waiting for at least one; b'' at the end of the data"""
+        with self._cond:
+            while not self._data and not self._eof and not self._closed:
+                self._cond.wait()
+            if not self._data and self.error is not None:
+                raise IOError(f"Stream download failed: {self.error}")
+            data = bytes(self._data[:size])
+            del self._data[:size]
+            self._cond.notify_all()
+            return data
+
+    def peek(self, size: int) -> bytes:
+        """The first `size` bytes (fewer at the end of the data) without consuming them"""
+        size = min(size, self.capacity)
+        with self._cond:
+            while len(self._data) < size and not self._eof and not self._closed:
+                self._cond.wait()
+            return bytes(self._data[:size])
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Stop the producer and drop buffered data"""
+        with self._cond:
+            self._closed = True
+            self._data.clear()
+            self._cond.notify_all()
+
+
+class HTTPStream:
+    """Download an http(s) resource on a background thread into a ReadAheadBuffer.
+
+    Reading starts as soon as the first bytes arrive, and the download pauses
+    whenever `read_ahead_mb` is buffered and not yet consumed. A dropped
+    connection is resumed with a Range request when the server supports them.
+    """
+
+    def __init__(self, url: str, read_ahead_mb: float = DEFAULT_READ_AHEAD_MB,
+                 timeout: float = 30.0, retries: int = DEFAULT_RETRIES):
+        self.url = normalize_url(url)
+        self.timeout = timeout
+        self.retries = retries
+        self.buffer = ReadAheadBuffer(int(read_ahead_mb * 1024 * 1024))
+        self.bytes_downloaded = 0
+        self.content_length: Optional[int] = None
+        self.complete = False
+        self._response = None
+        self._thread = threading.Thread(target=self._download, daemon=True)
+        self._thread.start()
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        return self.buffer.read(size)
+
+    def peek(self, size: int) -> bytes:
+        return self.buffer.peek(size)
+
+    def close(self):
+        """Abort the download; safe to call more than once"""
+        self.buffer.close()
+        response = self._response
+        if response is not None:
+            # Unblocks a read waiting on a slow server
+            try:
+                response.close()
+            except Exception:
+                pass
+        self._thread.join(self.timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _open(self):
+        request = urllib.request.Request(self.url, headers={'User-Agent': 'cortalv2i'})
+        if self.bytes_downloaded:
+            request.add_header('Range', f"bytes={self.bytes_downloaded}-")
+        response = urllib.request.urlopen(request, timeout=self.timeout)
+        if self.bytes_downloaded and response.status != 206:
+            response.close()
+            raise IOError("server does not support resuming with Range requests")
+        if self.content_length is None and response.headers.get('Content-Length'):
+            self.content_length = int(response.headers['Content-Length'])
+        return response
+
+    def _download(self):
+        attempts = 0
+        error = None
+        while True:
+            try:
+                with self._open() as response:
+                    self._response = response
+                    while True:
+                        data = response.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        if not self.buffer.write(data):
+                            return
+                        self.bytes_downloaded += len(data)
+                        attempts = 0
+                if self.content_length is not None and self.bytes_downloaded < self.content_length:
+                    raise IOError(f"connection closed after {self.bytes_downloaded} of {self.content_length} bytes")
+                self.complete = True
+                break
+            except Exception as e:
+                if self.buffer.closed:
+                    return
+                attempts += 1
+                if isinstance(e, urllib.error.HTTPError) and e.code < 500:
+                    # Client errors (missing file, no access) do not go away on retry
+                    attempts = self.retries + 1
+                resumable = self.bytes_downloaded == 0 or self.content_length is not None
+                if attempts > self.retries or not resumable:
+                    error = e
+                    break
+                logger.warning(f"Retrying download of {self.url} at byte {self.bytes_downloaded}: {str(e)}")
+        if error is not None:
+            logger.error(f"Error downloading {self.url}: {str(error)}")
+        self.buffer.finish(error)
@@ -1,44 +1,113 @@
 # video_chunker.py
-import cv2
+import logging
+import math
 import os
-import numpy as np
-from typing import List, Tuple
-import tempfile
+from bisect import bisect_left
+from typing import List, Optional, Sequence, Tuple
+
+from cortalv2i.utils.media_probe import KeyframeIndex, keyframe_index, probe_media
+
+logger = logging.getLogger(__name__)
+
+# Chunks shorter than this are not worth a worker's startup and first seek
+DEFAULT_MIN_CHUNK_SECONDS = 30.0
+# Length of a work unit when a video is split into many small units
+DEFAULT_UNIT_SECONDS = 10.0
+
+
+def align_to_keyframes(targets: Sequence[int], keyframes: Sequence[int], total_frames: int) -> List[int]:
+    """Move each chunk boundary to the nearest keyframe.
+
+    Boundaries that land on the same keyframe are merged, and the first
+    frame is never a boundary, so fewer boundaries may come back.
+    """
+    keyframes = [frame for frame in keyframes if 0 < frame < total_frames]
+    if not keyframes:
+        return []
+    aligned = set()
+    for target in targets:
+        position = bisect_left(keyframes, target)
+        candidates = keyframes[max(position - 1, 0):position + 1]
+        aligned.add(min(candidates, key=lambda frame: abs(frame - target)))
+    return sorted(aligned)
+
 
 class VideoChunker:
-    def __init__(self, chunk_minutes: int = 15):
+    """Plan the frame ranges a video is split into for parallel workers.
+
+    A video gets one chunk per worker: fewer when chunks would be shorter
+    than `min_chunk_seconds`, more when `chunk_minutes` caps their length.
+    Each boundary is moved to the nearest keyframe from the video's packet
+    index (cached with the probe results), so every chunk starts on a
+    keyframe and its worker's seek is exact and decodes nothing before the
+    first frame it needs.
+
+    With `unit_seconds` a video is instead cut into many short work units.
+    They all go into the executor's shared queue, and each worker pulls the
+    next unit as soon as it is idle, so a slow stretch of video (say, one
+    full of scene changes) holds up one unit rather than a whole chunk.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_minutes: Optional[float] = None,
+                 min_chunk_seconds: float = DEFAULT_MIN_CHUNK_SECONDS, align: bool = True,
+                 unit_seconds: Optional[float] = None):
         """Initialize VideoChunker
-        
+
         Args:
-            chunk_minutes: Length of each chunk in minutes
+            workers: Number of chunk workers (default: number of cores)
+            chunk_minutes: Optional upper bound on the length of a chunk in minutes
+            min_chunk_seconds: Lower bound on the length of a chunk when splitting for workers
+            align: Snap chunk boundaries to keyframes
+            unit_seconds: Split into work units of about this length instead
+                of one chunk per worker (units never split a GOP)
         """
+        self.workers = max(1, workers or os.cpu_count() or 1)
         self.chunk_minutes = chunk_minutes
-        self.temp_dir = tempfile.mkdtemp()
+        self.min_chunk_seconds = min_chunk_seconds
+        self.align = align
+        self.unit_seconds = unit_seconds
 
     def get_video_info(self, video_path: str) -> Tuple[int, float, int, int]:
         """Get video information"""
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        cap.release()
-        return total_frames, fps, width, height
+        info = probe_media(video_path)
+        return info.frame_count, info.fps, info.width, info.height
+
+    def chunk_count(self, total_frames: int, fps: float) -> int:
+        """Number of chunks to aim for before keyframe alignment"""
+        count = self.workers
+        if fps and self.min_chunk_seconds:
+            count = min(count, max(1, int(total_frames / fps // self.min_chunk_seconds)))
+        if fps and self.chunk_minutes:
+            count = max(count, math.ceil(total_frames / (fps * self.chunk_minutes * 60)))
+        if fps and self.unit_seconds:
+            count = max(count, math.ceil(total_frames / (fps * self.unit_seconds)))
+        return max(1, min(count, total_frames))
 
     def split_video(self, video_path: str) -> List[Tuple[int, int]]:
-        """Split video into frame ranges based on time chunks
-        
+        """Split video into keyframe-aligned frame ranges
+
         Returns:
             List of (start_frame, end_frame) tuples
         """
         total_frames, fps, _, _ = self.get_video_info(video_path)
-        
-        # Calculate frames per chunk (15 minutes = 900 seconds)
-        frames_per_chunk = int(fps * self.chunk_minutes * 60)
-        chunks = []
-        
-        for start_frame in range(0, total_frames, frames_per_chunk):
-            end_frame = min(start_frame + frames_per_chunk, total_frames)
-            chunks.append((start_frame, end_frame))
-            
-        return chunks
\ No newline at end of file
+        if total_frames <= 0:
+            return []
+
+        count = self.chunk_count(total_frames, fps)
+        boundaries = [round(i * total_frames / count) for i in range(1, count)]
+        if boundaries and self.align:
+            index = self._keyframes(video_path)
+            if index is not None:
+                boundaries = align_to_keyframes(boundaries, index.frames, total_frames)
+
+        edges = [0] + boundaries + [total_frames]
+        return [(start, end) for start, end in zip(edges, edges[1:]) if end > start]
+
+    @staticmethod
+    def _keyframes(video_path: str) -> Optional[KeyframeIndex]:
+        try:
+            return keyframe_index(video_path)
+        except (OSError, ValueError) as e:
+            # Without ffprobe, or for containers it cannot index, cut at even offsets
+            logger.warning(f"No keyframe index for {video_path}, chunks are not keyframe-aligned: {str(e)}")
+            return None
@@ -1,120 +1,337 @@
 import cv2
-import concurrent.futures
+import json
 import os
-from typing import Callable, Optional
+import asyncio
+import functools
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from typing import Callable, List, Optional, Tuple
 import numpy as np
 
+from cortalv2i.core.audio_extractor import (DEFAULT_CHUNK_SECONDS, AsyncAudioExtractor, AudioExtractor,
+                                            parse_audio_outputs)
+from cortalv2i.core.decoders import default_decoder, open_decoder
+from cortalv2i.core.frame_dedup import make_deduplicator
+from cortalv2i.core.frame_resize import parse_resolution
+from cortalv2i.core.frame_sampler import DEFAULT_SEEK_COST, build_schedule
+from cortalv2i.core.frame_store import DEFAULT_SHARD_SIZE_MB, OUTPUT_MODES, TarShardWriter, TensorStoreWriter
+from cortalv2i.core.frame_writer import DEFAULT_MEMORY_BUDGET_MB, FrameWriterPipeline
+from cortalv2i.core.progress import throttle
+from cortalv2i.core.scene_detector import SceneDetector
+from cortalv2i.core.shm_encoder import ENCODERS, SharedMemoryEncoderPool
+from cortalv2i.utils.media_probe import probe_media
+from cortalv2i.utils.metrics import Metrics, get_metrics
+from cortalv2i.utils.utils import atomic_write
+
 class VideoProcessor:
     def __init__(self, frames_dir: Optional[str] = None,
                  audio_dir: Optional[str] = None,
-                 max_workers: int = 4):
+                 max_workers: int = 4,
+                 memory_budget_mb: Optional[float] = DEFAULT_MEMORY_BUDGET_MB,
+                 metrics: Optional[Metrics] = None):
         self.frames_dir = frames_dir
         self.audio_dir = audio_dir
         self.max_workers = max_workers
+        self.memory_budget_mb = memory_budget_mb
+        # Near-duplicate frames skipped by the last extract_frames call
+        self.suppressed_frames = 0
+        # Stage timings and counters; the process-wide registry is disabled by default
+        self.metrics = metrics or get_metrics()
 
-    def extract_frames(self, video_path: str, start_frame: int, end_frame: int, config: dict, progress_callback: Callable = None):
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
+    def extract_frames(self, video_path: str, start_frame: int, end_frame: int, config: dict, progress_callback: Callable = None,
+                       outputs: Optional[List[str]] = None):
+        method = config.get('method', 'fps')
+        backend = config.get('decoder') or default_decoder(video_path)
+        if (method == 'keyframes' or outputs) and backend == 'opencv':
+            # Only ffmpeg can skip the non-key frames inside the decoder, or
+            # write other outputs from the same demux pass
+            backend = 'ffmpeg-pipe'
+        if outputs and start_frame != 0:
+            raise ValueError("Outputs written alongside the frames need a decode from frame 0")
+        decoder = open_decoder(
+            video_path,
+            backend,
+            seek_cost=config.get('seek_cost', DEFAULT_SEEK_COST),
+            threads=config.get('decoder_threads'),
+            metrics=self.metrics,
+            read_ahead_mb=config.get('read_ahead_mb')
+        )
+        if outputs:
+            decoder.attach_outputs(outputs)
 
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
         total_frames = end_frame - start_frame
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = decoder.fps
 
         frame_count = 0
-        method = config.get('method', 'fps')
 
-        # Calculate frame interval based on method
-        if method == 'fps':
-            target_fps = config['params'].get('fps', 1.0)
-            frame_interval = int(fps / target_fps)
-        elif method == 'interval':
-            interval = config['params'].get('interval', 1.0)
-            frame_interval = int(interval * fps)
-        elif method == 'scene':  # treat scene method as interval with 1 second
-            frame_interval = int(fps)
-        else:
-            frame_interval = int(fps)  # default to 1 second interval
-
-        # Get resolution if specified
-        if 'resolution' in config:
-            try:
-                width, height = map(int, config['resolution'].split('*'))
-            except:
-                width, height = None, None
-        else:
-            width, height = None, None
-
-        current_frame = start_frame
-        frames_to_process = []
-
-        while current_frame < end_frame:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if (current_frame - start_frame) % frame_interval == 0:
-                # Resize if resolution is specified
-                if width and height:
-                    frame = cv2.resize(frame, (width, height))
-
-                output_path = os.path.join(
-                    self.frames_dir,
-                    f"frame_{current_frame:06d}.{config.get('output_format', 'jpg')}"
-                )
-
-                frames_to_process.append((frame.copy(), output_path))
-                frame_count += 1
-
-            current_frame += 1
-            if progress_callback:
-                progress = (current_frame - start_frame) / total_frames
-                progress_callback(progress)
-
-        # Process frames using thread pool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            for frame, output_path in frames_to_process:
-                futures.append(
-                    executor.submit(
-                        self._save_frame,
-                        frame,
-                        output_path,
-                        config.get('output_format', 'jpg')
+        def on_position(position):
+            # An empty range is done as soon as anything reports on it
+            if total_frames <= 0:
+                progress_callback(1.0)
+                return
+            progress_callback(min((position - start_frame) / total_frames, 1.0))
+
+        # Get resolution if specified; an unparsable one keeps the source size
+        try:
+            size = parse_resolution(config.get('resolution'))
+        except ValueError:
+            size = None
+        resize_mode = config.get('resize_mode', 'stretch')
+
+        keyframes = None
+        try:
+            # Build the frame schedule based on method. Sampling grids are
+            # anchored to the first frame of the video, not of the chunk, so
+            # the same frames are picked however the video is split
+            if method == 'fps':
+                target_fps = config['params'].get('fps', 1.0)
+                schedule = build_schedule(start_frame, end_frame, int(fps / target_fps), origin=0)
+            elif method == 'interval':
+                interval = config['params'].get('interval', 1.0)
+                schedule = build_schedule(start_frame, end_frame, int(interval * fps), origin=0)
+            elif method == 'keyframes':
+                # Presentation timestamps from the packet index, by frame number
+                keyframes = dict(decoder.keyframe_index.between(start_frame, end_frame))
+            elif method == 'scene':
+                # Analyse low-resolution frames first, then decode only the first
+                # frame of the range and each cut. 'threshold' is the fraction of
+                # changed pixels that makes a cut, so a clip without cuts yields
+                # a single frame (this method used to take one frame per second).
+                detector = SceneDetector(**config.get('params', {}))
+                with self.metrics.time('scene'):
+                    schedule = detector.detect(decoder, start_frame, end_frame,
+                                               on_position if progress_callback else None,
+                                               include_start=True)
+            else:
+                schedule = build_schedule(start_frame, end_frame, int(fps), origin=0)  # default to 1 second interval
+
+            # For scenes, progress was already reported by the analysis pass
+            sample_progress = on_position if progress_callback and method != 'scene' else None
+
+            output_format = config.get('output_format', 'jpg')
+            output_mode = config.get('output_mode', 'files')
+            if output_mode not in OUTPUT_MODES:
+                raise ValueError(f"Unknown output mode: {output_mode} (expected one of {', '.join(OUTPUT_MODES)})")
+            dedup = make_deduplicator(config.get('dedup'))
+            self.suppressed_frames = 0
+            metrics = self.metrics
+
+            def is_duplicate(frame):
+                if not dedup:
+                    return False
+                with metrics.time('dedup'):
+                    return dedup.is_duplicate(frame)
+            written = []
+            # Packed outputs are named after the chunk so parallel chunks never share a file
+            prefix = f"frames_{start_frame:06d}"
+
+            # The tensor store and the encoder processes copy each frame before
+            # the next one is decoded, so those frames can reuse two buffers;
+            # writer threads hold frames until they are encoded
+            reuse = output_mode == 'npy' or config.get('encoder', 'threads') == 'processes'
+            if keyframes is not None:
+                frames = decoder.keyframes(start_frame, end_frame, size=size, progress_callback=sample_progress,
+                                           resize_mode=resize_mode, buffers=2 if reuse else 0)
+            else:
+                frames = decoder.read(schedule, size=size, progress_callback=sample_progress,
+                                      resize_mode=resize_mode, buffers=2 if reuse else 0)
+
+            def timestamp(index):
+                if keyframes is not None:
+                    return keyframes.get(index)
+                return index / fps if fps else None
+
+            if output_mode == 'npy':
+                # Raw pixels need no encoding, so they are appended in the decode loop
+                with TensorStoreWriter(self.frames_dir, prefix) as store:
+                    for current_frame, frame in frames:
+                        if is_duplicate(frame):
+                            continue
+                        with metrics.time('write'):
+                            store.append(frame, current_frame, timestamp(current_frame))
+                        metrics.count('frames_written')
+                written = store.outputs
+            else:
+                shards = None
+                if output_mode == 'tar':
+                    shards = TarShardWriter(self.frames_dir, prefix, output_format,
+                                            config.get('shard_size_mb', DEFAULT_SHARD_SIZE_MB))
+
+                encoder = config.get('encoder', 'threads')
+                if encoder not in ENCODERS:
+                    raise ValueError(f"Unknown encoder: {encoder} (expected one of {', '.join(ENCODERS)})")
+
+                if encoder == 'processes':
+                    # Frames are copied once into shared memory and encoded by
+                    # worker processes, outside this process's GIL
+                    ext, params = self._encode_args(output_format)
+
+                    def on_encoded(data, output_path, current_frame):
+                        if shards is not None:
+                            with metrics.time('write'):
+                                shards.add(data, current_frame, timestamp(current_frame))
+                        metrics.count('frames_written')
+                        written.append(output_path)
+
+                    pipeline = SharedMemoryEncoderPool(
+                        max_workers=self.max_workers,
+                        slots=config.get('encoder_slots'),
+                        on_encoded=on_encoded
                     )
-                )
 
-            # Wait for all frames to be saved
-            concurrent.futures.wait(futures)
+                    def submit(frame, output_path, current_frame):
+                        pipeline.submit(frame, ext, params, None if shards else output_path,
+                                        current_frame)
+                else:
+                    def write(frame, output_path, format, current_frame):
+                        if shards is None:
+                            if self._save_frame(frame, output_path, format):
+                                written.append(output_path)
+                            return
+                        data = self._encode_frame(frame, format, output_path)
+                        if data is not None:
+                            with metrics.time('write'):
+                                shards.add(data, current_frame, timestamp(current_frame))
+                            metrics.count('frames_written')
+                            metrics.count('bytes_written', len(data))
+                            # Counts the frame; replaced by the shard paths on close
+                            written.append(output_path)
+
+                    pipeline = FrameWriterPipeline(
+                        write,
+                        max_workers=self.max_workers,
+                        memory_budget_mb=config.get('memory_budget_mb', self.memory_budget_mb)
+                    )
+
+                    def submit(frame, output_path, current_frame):
+                        pipeline.submit(frame, output_path, output_format, current_frame)
+
+                # The decoder scales to the requested resolution, and frames are
+                # encoded by the writer threads while decoding continues
+                submitted = []
+                with shards or nullcontext():
+                    with pipeline:
+                        for current_frame, frame in frames:
+                            if is_duplicate(frame):
+                                continue
+                            output_path = os.path.join(
+                                self.frames_dir,
+                                f"frame_{current_frame:06d}.{output_format}"
+                            )
+
+                            # Time blocked on the encoders' backpressure
+                            with metrics.time('queue_wait'):
+                                submit(frame, output_path, current_frame)
+                            frame_count += 1
+                            submitted.append(current_frame)
+
+                    if len(written) < frame_count:
+                        raise IOError(f"{frame_count - len(written)} of {frame_count} frames could not be saved")
 
-        cap.release()
+                if keyframes is not None and shards is None:
+                    # Image files carry no timestamps; list them next to the frames
+                    self._write_timestamps(os.path.join(self.frames_dir, f"{prefix}-keyframes.json"),
+                                           submitted, keyframes, output_format)
 
-    def _save_frame(self, frame, output_path: str, format: str):
-        """Save a single frame to disk"""
+                if shards is not None:
+                    written = shards.outputs
+
+            if dedup:
+                self.suppressed_frames = dedup.suppressed
+                metrics.count('frames_suppressed', dedup.suppressed)
+            if outputs:
+                decoder.finish_outputs()
+
+            if progress_callback:
+                progress_callback(1.0)
+            return written
+        finally:
+            decoder.release()
+
+    @staticmethod
+    def _write_timestamps(path: str, frames, timestamps: dict, output_format: str):
+        entries = [{'frame': index, 'timestamp': timestamps[index], 'file': f"frame_{index:06d}.{output_format}"}
+                   for index in sorted(frames)]
+        atomic_write(path, json.dumps({'frames': entries}, indent=2).encode())
+
+    @staticmethod
+    def _encode_args(format: str):
+        """cv2.imencode extension and parameters for an output format"""
+        if format.lower() == 'png':
+            return '.png', [cv2.IMWRITE_PNG_COMPRESSION, 9]
+        return '.jpg', [cv2.IMWRITE_JPEG_QUALITY, 95]
+
+    def _encode_frame(self, frame, format: str, output_path: str) -> Optional[bytes]:
+        """Encode a frame as png or jpg, or return None when encoding fails"""
         try:
-            if format.lower() == 'png':
-                cv2.imwrite(output_path, frame, [cv2.IMWRITE_PNG_COMPRESSION, 9])
-            else:
-                cv2.imwrite(output_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            ext, params = self._encode_args(format)
+            with self.metrics.time('encode'):
+                ok, encoded = cv2.imencode(ext, frame, params)
+            if not ok:
+                raise ValueError("image encoding failed")
+            return encoded.tobytes()
         except Exception as e:
-            print(f"Error saving frame to {output_path}: {str(e)}")
+            print(f"Error encoding frame {output_path}: {str(e)}")
+            return None
 
-    def extract_audio(self, video_path: str, config: dict, progress_callback: Callable = None):
-        """Extract audio from video"""
+    def _save_frame(self, frame, output_path: str, format: str) -> bool:
+        """Save a single frame to disk (atomically, so a partial file is never left behind)"""
+        data = self._encode_frame(frame, format, output_path)
+        if data is None:
+            return False
         try:
-            import ffmpeg
+            with self.metrics.time('write'):
+                atomic_write(output_path, data)
+            self.metrics.count('frames_written')
+            self.metrics.count('bytes_written', len(data))
+            return True
+        except Exception as e:
+            print(f"Error saving frame to {output_path}: {str(e)}")
+            return False
+
+    def extract_frames_and_audio(self, video_path: str, end_frame: int, config: dict, audio_config,
+                                 progress_callback: Callable = None,
+                                 chunk_duration: float = DEFAULT_CHUNK_SECONDS,
+                                 duration: Optional[float] = None) -> Tuple[list, List[str]]:
+        """Extract frames [0, end_frame) and the audio in a single read of the source.
 
-            output_format = config.get('format', 'mp3')
-            bitrate = config.get('bitrate', '192k')
-            output_filename = os.path.splitext(os.path.basename(video_path))[0] + f".{output_format}"
-            output_path = os.path.join(self.audio_dir, output_filename)
+        The audio encode is added as a second output of the ffmpeg process
+        that decodes the frames, so the container is demuxed once instead of
+        once for the frames and again for the audio; on network storage or a
+        URL that halves the bytes read. Frames are decoded by ffmpeg even when
+        the config asks for the opencv decoder. The audio is written as by
+        AudioExtractor.extract_audio_chunks.
 
-            # Extract audio using ffmpeg
-            stream = ffmpeg.input(video_path)
-            stream = ffmpeg.output(stream, output_path, acodec=output_format, audio_bitrate=bitrate)
+        Args:
+            video_path: Path or URL of the video
+            end_frame: End of the frame range (exclusive)
+            config: Frame extraction config, as for extract_frames
+            audio_config: Audio config section, one or a list of outputs (see parse_audio_outputs)
+            progress_callback: Frame extraction progress; the audio encode
+                finishes with the last frames
+            chunk_duration: Length of each audio file in seconds
+            duration: Source duration in seconds (probed when omitted)
 
-            # Run the ffmpeg command
-            ffmpeg.run(stream, capture_stdout=True, capture_stderr=True)
+        Returns:
+            (frame paths, audio paths)
+        """
+        extractor = AudioExtractor(self.audio_dir, metrics=self.metrics)
+        audio_outputs = parse_audio_outputs(audio_config)
+        if duration is None:
+            duration = probe_media(video_path).duration
+        outputs = extractor.chunk_output_args(video_path, chunk_duration, duration=duration, outputs=audio_outputs)
+        written = self.extract_frames(video_path, 0, end_frame, config, progress_callback, outputs=outputs)
+        return written, extractor.chunk_outputs(video_path, chunk_duration, duration=duration, outputs=audio_outputs)
+
+    def extract_audio(self, video_path: str, config, progress_callback: Callable = None):
+        """Extract audio from video
+
+        `config` is an audio config section, one or a list of outputs (see
+        parse_audio_outputs); all of them come out of one ffmpeg run.
+        """
+        try:
+            extractor = AudioExtractor(self.audio_dir, metrics=self.metrics)
+            extractor.extract_audio(video_path, outputs=parse_audio_outputs(config))
 
             if progress_callback:
                 progress_callback(1.0)  # Audio extraction completed
@@ -126,10 +343,116 @@ class VideoProcessor:
 
     def process_input(self, input_source: str, start_frame: int, end_frame: int, 
                       extraction_config: dict = None, audio_config: dict = None, 
-                      progress_callback: Callable = None):
-        """Process input source with given configurations"""
+                      progress_callback: Callable = None, single_pass: bool = False):
+        """Process input source with given configurations
+
+        With `single_pass`, frames from frame 0 and audio come out of one
+        read of the source (see extract_frames_and_audio).
+
+        Returns:
+            Paths of the frames written, or None when no frames were extracted
+        """
+        written = None
+        if (single_pass and start_frame == 0 and extraction_config and self.frames_dir
+                and audio_config and self.audio_dir):
+            return self.extract_frames_and_audio(input_source, end_frame, extraction_config, audio_config,
+                                                 progress_callback)[0]
+
         if extraction_config and self.frames_dir:
-            self.extract_frames(input_source, start_frame, end_frame, extraction_config, progress_callback)
+            written = self.extract_frames(input_source, start_frame, end_frame, extraction_config, progress_callback)
         
         if audio_config and self.audio_dir:
-            self.extract_audio(input_source, audio_config, progress_callback)
\ No newline at end of file
+            self.extract_audio(input_source, audio_config, progress_callback)
+
+        return written
+
+
+class AsyncVideoProcessor:
+    """asyncio front end of VideoProcessor for services running many jobs on one loop.
+
+    Frame extraction is CPU work (decode, resize, encode) and runs on
+    `executor`, the loop's default thread pool when None; OpenCV releases the
+    GIL while it decodes and encodes. Audio is extracted by an ffmpeg asyncio
+    subprocess and holds no thread while it runs. Every call uses its own
+    VideoProcessor, so concurrent jobs share no state, and progress callbacks
+    are always invoked on the event loop.
+    """
+
+    def __init__(self, frames_dir: Optional[str] = None,
+                 audio_dir: Optional[str] = None,
+                 executor: Optional[Executor] = None,
+                 max_workers: int = 4,
+                 memory_budget_mb: Optional[float] = DEFAULT_MEMORY_BUDGET_MB,
+                 metrics: Optional[Metrics] = None):
+        self.frames_dir = frames_dir
+        self.audio_dir = audio_dir
+        self.executor = executor
+        self.max_workers = max_workers
+        self.memory_budget_mb = memory_budget_mb
+        self.metrics = metrics or get_metrics()
+        # Near-duplicate frames skipped by the last extract_frames call to finish
+        self.suppressed_frames = 0
+
+    async def extract_frames(self, video_path: str, start_frame: int, end_frame: int, config: dict,
+                             progress_callback: Callable = None):
+        """Async counterpart of VideoProcessor.extract_frames"""
+        loop = asyncio.get_running_loop()
+        processor = VideoProcessor(frames_dir=self.frames_dir, max_workers=self.max_workers,
+                                   memory_budget_mb=self.memory_budget_mb, metrics=self.metrics)
+        written = await loop.run_in_executor(self.executor, functools.partial(
+            processor.extract_frames, video_path, start_frame, end_frame, config,
+            self._on_loop(loop, progress_callback)
+        ))
+        self.suppressed_frames = processor.suppressed_frames
+        return written
+
+    async def extract_audio(self, video_path: str, config, progress_callback: Callable = None):
+        """Extract the audio track to audio_dir; True on success, like VideoProcessor.extract_audio"""
+        try:
+            extractor = AsyncAudioExtractor(self.audio_dir, metrics=self.metrics)
+            return await extractor.extract_audio(video_path, outputs=parse_audio_outputs(config),
+                                                 progress_callback=progress_callback)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error extracting audio: {str(e)}")
+            return False
+
+    async def process_input(self, input_source: str, start_frame: int, end_frame: int,
+                            extraction_config: dict = None, audio_config: dict = None,
+                            progress_callback: Callable = None):
+        """Extract frames and audio concurrently
+
+        Returns:
+            Paths of the frames written, or None when no frames were extracted
+        """
+        jobs = []
+        if extraction_config and self.frames_dir:
+            jobs.append(('frames', lambda callback: self.extract_frames(
+                input_source, start_frame, end_frame, extraction_config, callback)))
+        if audio_config and self.audio_dir:
+            jobs.append(('audio', lambda callback: self.extract_audio(input_source, audio_config, callback)))
+        if not jobs:
+            return None
+
+        # Report the mean progress of the jobs so the value never goes backwards
+        progress = {name: 0.0 for name, _ in jobs}
+
+        def job_callback(name):
+            if not progress_callback:
+                return None
+
+            def update(value):
+                progress[name] = value
+                progress_callback(sum(progress.values()) / len(progress))
+            return update
+
+        results = await asyncio.gather(*(start(job_callback(name)) for name, start in jobs))
+        return results[0] if jobs[0][0] == 'frames' else None
+
+    @staticmethod
+    def _on_loop(loop, progress_callback):
+        """Forward executor-thread progress to the loop, at most every POST_INTERVAL"""
+        if not progress_callback:
+            return None
+        return throttle(lambda progress: loop.call_soon_threadsafe(progress_callback, progress))
@@ -2,18 +2,24 @@ import argparse
 import logging
 import os
 import sys
-from typing import List, Dict, Tuple
+import time
+from typing import List, Dict, Optional, Tuple, Union
 from pathlib import Path
-import cv2
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import yaml
 
-from cortalv2i.core.video_processor import VideoProcessor
-from cortalv2i.core.audio_extractor import AudioExtractor
+# OpenCV, NumPy and PyYAML take most of the startup time, so modules that pull
+# them in are imported by the functions that need them. `--help`, and worker
+# processes that only extract audio, never load them.
+from cortalv2i.core.audio_extractor import AUDIO_CODECS, DEFAULT_CHUNK_SECONDS, AudioExtractor, parse_audio_outputs
 from cortalv2i.utils.dir_manager import DirectoryManager
-from cortalv2i.core.video_chunker import VideoChunker
-from cortalv2i.utils.config_loader import load_config
+from cortalv2i.core.chunk_executor import BACKENDS, ChunkExecutor, default_workers
+from cortalv2i.core.progress import DEFAULT_INTERVAL, report_progress
+from cortalv2i.core.batch_scheduler import (BatchScheduler, WorkItem, estimate_audio_cost,
+                                            estimate_frames_cost)
+from cortalv2i.core.video_chunker import DEFAULT_MIN_CHUNK_SECONDS, DEFAULT_UNIT_SECONDS, VideoChunker
+from cortalv2i.utils.ffmpeg_capabilities import detect_ffmpeg
+from cortalv2i.utils.media_probe import probe_media
+from cortalv2i.utils.metrics import Metrics
+from cortalv2i.utils.utils import is_url, normalize_url
 
 def setup_logging(log_file: str):
     logging.basicConfig(
@@ -34,77 +40,115 @@ def process_input_source(source: str) -> List[str]:
             return [source]
     elif os.path.isdir(source):
         return [str(p) for p in Path(source).glob('**/*') if p.suffix.lower() in ('.mp4', '.avi', '.mkv', '.mov')]
-    elif source.startswith(('http://', 'https://', 'www.')):
-        return [source]
+    elif is_url(source):
+        return [normalize_url(source)]
     return []
 
-def process_chunk(chunk_info: dict) -> bool:
+def chunk_metrics(chunk_info: dict) -> Metrics:
+    """Fresh registry for one chunk; its snapshot is merged by main()"""
+    return Metrics(enabled=bool(chunk_info['config'].get('metrics')))
+
+def process_chunk(chunk_info: dict) -> Optional[Dict]:
+    from cortalv2i.core.video_processor import VideoProcessor
+
     try:
+        started = time.perf_counter()
         source = chunk_info['source']
         start_frame, end_frame = chunk_info['chunk_path']
         output_dir = chunk_info['output_dir']
         config = chunk_info['config']
+        metrics = chunk_metrics(chunk_info)
         
-        processor = VideoProcessor(
-            frames_dir=output_dir['frames'],
-            audio_dir=output_dir['audio'] if 'audio' in config else None
+        # Audio is extracted once per video by main(), not once per chunk
+        processor = VideoProcessor(frames_dir=output_dir['frames'], metrics=metrics)
+
+        outputs = processor.process_input(
+            source,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            extraction_config=config['frames'],
+            progress_callback=lambda progress: report_progress(chunk_info, progress)
         )
-
-        with tqdm(total=end_frame - start_frame,
-                  desc=f"Chunk {chunk_info['index']}/{chunk_info['total']}",
-                  position=chunk_info['index']) as pbar:
-
-            def update_progress(progress):
-                pbar.n = int(progress * (end_frame - start_frame))
-                pbar.refresh()
-
-            processor.process_input(
-                source,
-                start_frame=start_frame,
-                end_frame=end_frame,
-                extraction_config=config['frames'],
-                audio_config=config.get('audio'),
-                progress_callback=update_progress
-            )
         
-        return True
+        return {
+            'outputs': outputs or [],
+            'suppressed': processor.suppressed_frames,
+            'metrics': metrics.snapshot() if metrics.enabled else None,
+            'wall_s': time.perf_counter() - started
+        }
 
     except Exception as e:
         print(f"\nError processing chunk {chunk_info['index']}: {str(e)}")
-        return False
+        return None
+
+def process_audio(chunk_info: dict) -> Optional[Dict]:
+    try:
+        started = time.perf_counter()
+        source = chunk_info['source']
+        config = chunk_info['config']['audio']
+        metrics = chunk_metrics(chunk_info)
+
+        # One ffmpeg pass writes every 15-minute chunk of every requested output
+        audio_processor = AudioExtractor(chunk_info['output_dir']['audio'], metrics=metrics)
+        outputs = audio_processor.extract_audio_chunks(
+            source,
+            chunk_duration=DEFAULT_CHUNK_SECONDS,
+            progress_callback=lambda progress: report_progress(chunk_info, progress),
+            duration=chunk_info['chunk_path'][1],
+            outputs=parse_audio_outputs(config)
+        )
+
+        return {
+            'outputs': outputs,
+            'metrics': metrics.snapshot() if metrics.enabled else None,
+            'wall_s': time.perf_counter() - started
+        }
+
+    except Exception as e:
+        print(f"\nError extracting audio from {chunk_info['source']}: {str(e)}")
+        return None
+
+def process_combined(chunk_info: dict) -> Optional[Dict]:
+    from cortalv2i.core.video_processor import VideoProcessor
 
-def process_audio_chunk(chunk_info: dict) -> bool:
     try:
+        started = time.perf_counter()
         source = chunk_info['source']
-        start_time, end_time = chunk_info['chunk_path']
         output_dir = chunk_info['output_dir']
         config = chunk_info['config']
-        
-        audio_processor = AudioExtractor(output_dir['audio'])
-
-        with tqdm(total=100,
-                  desc=f"Audio Chunk {chunk_info['index']}/{chunk_info['total']}",
-                  position=chunk_info['index']) as pbar:
-
-            def update_progress(progress):
-                pbar.n = int(progress * 100)
-                pbar.refresh()
-
-            audio_processor.extract_audio(
-                source,
-                format=config['audio']['format'],
-                bitrate=config['audio']['bitrate'],
-                progress_callback=update_progress,
-                start_time=start_time,
-                end_time=end_time,
-                chunk_index=chunk_info['index'] if chunk_info['total'] > 1 else None
-            )
-        
-        return True
+        metrics = chunk_metrics(chunk_info)
+
+        # Frames and audio come out of one read of the source
+        processor = VideoProcessor(frames_dir=output_dir['frames'], audio_dir=output_dir['audio'],
+                                   metrics=metrics)
+        outputs, audio_outputs = processor.extract_frames_and_audio(
+            source,
+            chunk_info['chunk_path'][1],
+            config['frames'],
+            config['audio'],
+            progress_callback=lambda progress: report_progress(chunk_info, progress),
+            chunk_duration=DEFAULT_CHUNK_SECONDS,
+            duration=chunk_info['audio_range'][1]
+        )
+
+        return {
+            'outputs': outputs or [],
+            'audio_outputs': audio_outputs,
+            'suppressed': processor.suppressed_frames,
+            'metrics': metrics.snapshot() if metrics.enabled else None,
+            'wall_s': time.perf_counter() - started
+        }
 
     except Exception as e:
-        print(f"\nError processing audio chunk {chunk_info['index']}: {str(e)}")
-        return False
+        print(f"\nError processing {chunk_info['source']} in a single pass: {str(e)}")
+        return None
+
+def process_work_item(chunk_info: dict) -> Optional[Dict]:
+    if chunk_info['kind'] == 'audio':
+        return process_audio(chunk_info)
+    if chunk_info['kind'] == 'combined':
+        return process_combined(chunk_info)
+    return process_chunk(chunk_info)
 
 def get_paths() -> Tuple[str, str]:
     print("\nPath Configuration:")
@@ -138,17 +182,18 @@ def get_processing_options() -> Dict:
         options['audio'] = get_audio_config()
     return options
 
-def get_audio_config() -> Dict:
+def get_audio_config() -> Union[Dict, List[Dict]]:
     config = {}
     supported_formats = ['mp3', 'wav', 'aac', 'm4a', 'flac']
     supported_bitrates = ['64k', '128k', '192k', '256k', '320k']
     
     while True:
-        format_choice = input(f"Select audio format ({'/'.join(supported_formats)}) [mp3]: ").strip().lower()
-        if format_choice in [''] + supported_formats:
+        format_choice = input(f"Select audio format(s), comma-separated ({'/'.join(supported_formats)}) [mp3]: ").strip().lower()
+        formats = [choice.strip() for choice in format_choice.split(',') if choice.strip()]
+        if all(choice in supported_formats for choice in formats):
             break
         print(f"Invalid format! Please select from {', '.join(supported_formats)}")
-    config['format'] = format_choice if format_choice else 'mp3'
+    config['format'] = formats[0] if formats else 'mp3'
 
     while True:
         bitrate_choice = input(f"Select audio bitrate ({'/'.join(supported_bitrates)}) [192k]: ").strip().lower()
@@ -157,6 +202,9 @@ def get_audio_config() -> Dict:
         print(f"Invalid bitrate! Please select from {', '.join(supported_bitrates)}")
     config['bitrate'] = bitrate_choice if bitrate_choice else '192k'
 
+    if len(formats) > 1:
+        # Every format is written from the same decode
+        return [{'format': choice, 'bitrate': config['bitrate']} for choice in formats]
     return config
 
 def get_frame_config() -> Dict:
@@ -165,11 +213,12 @@ def get_frame_config() -> Dict:
     print("1. Extract by FPS")
     print("2. Extract by time interval")
     print("3. Extract every second")
+    print("4. Extract keyframes only")
     while True:
-        choice = input("Select extraction method (1-3): ").strip()
-        if choice in ['1', '2', '3']:
+        choice = input("Select extraction method (1-4): ").strip()
+        if choice in ['1', '2', '3', '4']:
             break
-        print("Invalid choice! Please select 1, 2, or 3")
+        print("Invalid choice! Please select 1, 2, 3 or 4")
 
     if choice == '1':
         config['method'] = 'fps'
@@ -196,6 +245,8 @@ def get_frame_config() -> Dict:
     elif choice == '3':
         config['method'] = 'fps'
         config['params'] = {'fps': 1.0}  # One frame per second
+    elif choice == '4':
+        config['method'] = 'keyframes'
 
     while True:
         format_choice = input("Select frame format (jpg/png) [jpg]: ").strip().lower()
@@ -215,31 +266,37 @@ def main():
     parser.add_argument("--config", help="Path to config.yaml file")
     parser.add_argument("--input", help="Input path (video file/folder/URL)")
     parser.add_argument("--output", help="Output directory path")
+    parser.add_argument("--backend", choices=BACKENDS,
+                        help="Chunk execution backend: 'process' (default) or 'thread' for small jobs")
+    parser.add_argument("--workers", type=int, help="Number of chunk workers (default: number of cores)")
+    parser.add_argument("--unit-seconds", type=float, nargs="?", const=DEFAULT_UNIT_SECONDS,
+                        help="Split each video into keyframe-aligned work units of about this many seconds "
+                             f"(default: {DEFAULT_UNIT_SECONDS:g}), pulled by idle workers, instead of one chunk per worker")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Read each video once for both frames and audio (one ffmpeg pass per video, "
+                             "no frame chunks); saves I/O on network storage and URLs")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the job manifest and reprocess chunks that already completed")
+    parser.add_argument("--metrics-json", help="Write a JSON run report with per-stage timings here")
+    parser.add_argument("--metrics-prom", help="Write per-stage metrics as a Prometheus textfile here")
+    parser.add_argument("--metrics-traces", action="store_true",
+                        help="Include one trace entry per chunk in the JSON run report")
     args = parser.parse_args()
 
     try:
         setup_logging('processing.log')
         logger = logging.getLogger(__name__)
 
-        # Check for ffmpeg dependency
-        try:
-            import ffmpeg
-        except ImportError:
-            logger.error("ffmpeg-python package is not installed. Please install it using: pip install ffmpeg-python")
-            print("\nError: ffmpeg-python package is not installed. Please install it using: pip install ffmpeg-python")
-            sys.exit(1)
-
-        # Verify ffmpeg is installed on the system
-        try:
-            ffmpeg.probe('dummy')
-        except ffmpeg.Error:
-            pass  # This is expected for a dummy probe
-        except FileNotFoundError:
+        # Verify ffmpeg is installed on the system; the result is cached on
+        # disk, so this normally costs no subprocess
+        capabilities = detect_ffmpeg()
+        if not capabilities.available:
             logger.error("ffmpeg is not installed on your system. Please install ffmpeg first.")
             print("\nError: ffmpeg is not installed on your system. Please install ffmpeg first.")
             sys.exit(1)
 
         if args.config:
+            from cortalv2i.utils.config_loader import load_config
             config = load_config(args.config)
             input_path = config['input_path']
             base_output_path = config['output_path']
@@ -252,6 +309,42 @@ def main():
             input_path, base_output_path = get_paths()
             processing_options = get_processing_options()
 
+        # Metrics are enabled by the config's 'metrics' section or the CLI flags
+        metrics_options = dict(processing_options.get('metrics') or {})
+        for key, value in (('json', args.metrics_json), ('prometheus', args.metrics_prom),
+                           ('traces', args.metrics_traces)):
+            if value:
+                metrics_options[key] = value
+        if metrics_options:
+            processing_options['metrics'] = metrics_options
+        run_metrics = Metrics(enabled=bool(metrics_options), traces=bool(metrics_options.get('traces')))
+
+        # 'audio' is one output or a list of them
+        for output in parse_audio_outputs(processing_options.get('audio')):
+            codec = AUDIO_CODECS.get(output.format, 'libmp3lame')
+            if capabilities.encoders and not capabilities.has_encoder(codec):
+                logger.error(f"ffmpeg {capabilities.version} was built without the {codec} encoder")
+                print(f"\nError: ffmpeg {capabilities.version} was built without the {codec} encoder")
+                sys.exit(1)
+
+        execution = processing_options.get('execution', {})
+        chunk_executor = ChunkExecutor(
+            backend=args.backend or execution.get('backend', 'process'),
+            max_workers=args.workers or execution.get('workers') or default_workers(),
+            progress_interval=execution.get('progress_interval', DEFAULT_INTERVAL)
+        )
+
+        # One keyframe-aligned chunk per worker; 'chunk_minutes' optionally caps their
+        # length, and 'unit_seconds' switches to many small units for uneven content
+        chunker = VideoChunker(
+            workers=chunk_executor.max_workers,
+            chunk_minutes=execution.get('chunk_minutes'),
+            min_chunk_seconds=execution.get('min_chunk_seconds', DEFAULT_MIN_CHUNK_SECONDS),
+            unit_seconds=args.unit_seconds or execution.get('unit_seconds')
+        )
+
+        single_pass = bool(args.single_pass or execution.get('single_pass')) and 'audio' in processing_options
+
         dir_manager = DirectoryManager()
         
         input_sources = process_input_source(input_path)
@@ -260,85 +353,112 @@ def main():
             print("No valid input sources found. Exiting...")
             sys.exit(1)
 
+        # Chunks of every video go into one queue so workers stay busy
+        # across video boundaries
+        scheduler = BatchScheduler(chunk_executor)
+        manifests = {}
+        method = processing_options.get('frames', {}).get('method')
+
         for source in input_sources:
             try:
-                logger.info(f"\nProcessing: {source}")
-                print(f"\nProcessing: {source}")
-
                 paths = dir_manager.get_output_paths(source, base_output_path)
                 os.makedirs(paths['frames'], exist_ok=True)
 
-                chunker = VideoChunker(chunk_minutes=15)  # 15 minutes chunks
-                chunk_ranges = chunker.split_video(source)
-
-                print(f"\nProcessing {len(chunk_ranges)} chunks of 15 minutes each...")
-
-                with ThreadPoolExecutor(max_workers=min(4, len(chunk_ranges))) as executor:
-                    futures = []
-                    for idx, chunk_range in enumerate(chunk_ranges):
-                        futures.append(
-                            executor.submit(
-                                process_chunk,
-                                {
-                                    'source': source,
-                                    'chunk_path': chunk_range,
-                                    'output_dir': paths,
-                                    'config': processing_options,
-                                    'index': idx + 1,
-                                    'total': len(chunk_ranges)
-                                }
-                            )
-                        )
-
-                    for future in as_completed(futures):
-                        try:
-                            future.result()
-                        except Exception as e:
-                            logger.error(f"Chunk processing error: {str(e)}")
-
-                print(f"\nCompleted processing: {source}")
-
+                manifest = dir_manager.get_job_manifest(paths, source, processing_options)
+                if args.restart:
+                    manifest.reset()
+                manifests[source] = manifest
+
+                info = probe_media(source)
+                combined = single_pass and info.has_audio
+                if is_url(source) or combined:
+                    # A stream is decoded front to back, and a single pass
+                    # reads the whole file, so either is one chunk
+                    chunk_ranges = [(0, info.frame_count)]
+                else:
+                    # A resumed job keeps the boundaries it was planned with
+                    chunk_ranges = manifest.plan('frames', lambda: chunker.split_video(source))
+                pending_ranges = manifest.pending('frames', chunk_ranges)
+                payload = {'output_dir': paths, 'config': processing_options}
+
+                # All audio chunks come out of one ffmpeg pass, so they are
+                # checkpointed together over the whole duration
+                audio_pending = False
                 if 'audio' in processing_options:
                     os.makedirs(paths['audio'], exist_ok=True)
-                    
-                    # Get video duration
-                    probe = ffmpeg.probe(source)
-                    duration = float(probe['format']['duration'])
-                    
-                    # Create audio chunks
-                    chunk_duration = 15 * 60  # 15 minutes in seconds
-                    audio_chunks = [(i * chunk_duration, min((i + 1) * chunk_duration, duration)) 
-                                    for i in range(int(duration / chunk_duration) + 1)]
-
-                    print(f"\nProcessing {len(audio_chunks)} audio chunks...")
-
-                    with ThreadPoolExecutor(max_workers=min(4, len(audio_chunks))) as executor:
-                        futures = []
-                        for idx, chunk_range in enumerate(audio_chunks):
-                            futures.append(
-                                executor.submit(
-                                    process_audio_chunk,
-                                    {
-                                        'source': source,
-                                        'chunk_path': chunk_range,
-                                        'output_dir': paths,
-                                        'config': processing_options,
-                                        'index': idx + 1,
-                                        'total': len(audio_chunks)
-                                    }
-                                )
-                            )
-
-                        for future in as_completed(futures):
-                            try:
-                                future.result()
-                            except Exception as e:
-                                logger.error(f"Audio chunk processing error: {str(e)}")
+                    audio_range = (0, info.duration)
+                    if not info.has_audio:
+                        print(f"\nNo audio stream in {source}, skipping audio")
+                    elif manifest.is_done('audio', audio_range):
+                        print(f"\nAudio already extracted for {source}, skipping")
+                    else:
+                        audio_pending = True
+
+                if combined and pending_ranges and audio_pending:
+                    # The audio encode rides along with the frame decode
+                    chunk_range = pending_ranges[0]
+                    scheduler.add(WorkItem(source, 'combined', chunk_range,
+                                           estimate_frames_cost(info, chunk_range, method)
+                                           + estimate_audio_cost(audio_range),
+                                           dict(payload, audio_range=audio_range)))
+                else:
+                    for chunk_range in pending_ranges:
+                        scheduler.add(WorkItem(source, 'frames', chunk_range,
+                                               estimate_frames_cost(info, chunk_range, method), payload))
+                    if audio_pending:
+                        scheduler.add(WorkItem(source, 'audio', audio_range,
+                                               estimate_audio_cost(audio_range), payload))
+
+                if len(pending_ranges) < len(chunk_ranges):
+                    print(f"\nResuming {source}: {len(chunk_ranges) - len(pending_ranges)} "
+                          f"of {len(chunk_ranges)} chunks already done")
+                if not pending_ranges and not audio_pending:
+                    print(f"\nCompleted processing: {source}")
 
             except Exception as e:
                 logger.exception(f"Error processing {source}: {str(e)}")
                 print(f"\nError processing {source}: {str(e)}")
 
+        suppressed = {}
+
+        def record(item, result):
+            if not result:
+                run_metrics.count('chunks_failed')
+                return
+            if item.kind == 'combined':
+                manifests[item.source].mark_done('frames', item.chunk_range, result['outputs'])
+                manifests[item.source].mark_done('audio', item.payload['audio_range'], result['audio_outputs'])
+            else:
+                manifests[item.source].mark_done(item.kind, item.chunk_range, result['outputs'])
+            suppressed[item.source] = suppressed.get(item.source, 0) + result.get('suppressed', 0)
+            run_metrics.count('chunks_completed')
+            run_metrics.merge(result.get('metrics'))
+            run_metrics.add_trace(f"{item.kind}:{os.path.basename(item.source)}:{item.chunk_range[0]}",
+                                  result.get('wall_s', 0.0), result.get('metrics'),
+                                  source=item.source, kind=item.kind, range=list(item.chunk_range))
+
+        def report_video(status):
+            if status.failed:
+                print(f"\nFinished {status.source} with errors: "
+                      f"{status.failed} of {status.total} chunks failed")
+            else:
+                print(f"\nCompleted processing: {status.source}")
+            if suppressed.get(status.source):
+                print(f"Skipped {suppressed[status.source]} near-duplicate frames")
+
+        queued = len(scheduler.items)
+        print(f"\nProcessing {queued} chunks from {len(manifests)} video(s) "
+              f"on {chunk_executor.max_workers} workers...")
+        started = time.perf_counter()
+        scheduler.run(process_work_item, on_item_complete=record, on_video_complete=report_video)
+        run_metrics.count('run_seconds', time.perf_counter() - started)
+
+        if metrics_options.get('json'):
+            run_metrics.write_json(metrics_options['json'])
+            print(f"\nRun report written to: {metrics_options['json']}")
+        if metrics_options.get('prometheus'):
+            run_metrics.write_prometheus(metrics_options['prometheus'])
+
         print(f"\nProcessing completed! Output files can be found in: {base_output_path}")
 
     except Exception as e:
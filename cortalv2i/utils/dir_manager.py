@@ -1,8 +1,12 @@
 import os
 import pathlib
 from typing import Dict, Tuple
+from urllib.parse import urlparse
 import logging
 
+from cortalv2i.utils.job_manifest import JobManifest
+from cortalv2i.utils.utils import is_url, normalize_url, partial_path_owner, process_running
+
 class DirectoryManager:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -15,6 +19,10 @@ class DirectoryManager:
             # Get the directory name from input path
             if os.path.isfile(input_path):
                 dir_name = os.path.splitext(os.path.basename(input_path))[0]
+            elif is_url(input_path):
+                # Name URL sources after the file in the path, without the query string
+                url = urlparse(normalize_url(input_path))
+                dir_name = os.path.splitext(os.path.basename(url.path.rstrip('/')))[0] or url.netloc
             else:
                 dir_name = os.path.basename(input_path)
             
@@ -43,3 +51,30 @@ class DirectoryManager:
     def get_output_paths(self, input_path: str, output_base_path: str) -> Dict[str, str]:
         """Returns paths for frames, audio, and logs directories"""
         return self.create_directory_structure(input_path, output_base_path)
+
+    def get_job_manifest(self, paths: Dict[str, str], source: str, config: Dict) -> JobManifest:
+        """Returns the resumable job manifest kept in the logs directory"""
+        manifest_path = os.path.join(paths['logs'], 'manifest.json')
+        self.remove_partial_files(paths)
+        return JobManifest(manifest_path, source, config)
+
+    def remove_partial_files(self, paths: Dict[str, str]) -> None:
+        """Removes temporary files left behind by an interrupted run.
+
+        The writer's pid is part of each temporary name (see partial_path), so
+        files another run on the same directory is still writing are kept.
+        """
+        for key in ('frames', 'audio', 'logs'):
+            directory = paths.get(key)
+            if not directory or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                pid = partial_path_owner(name)
+                if pid is None or process_running(pid):
+                    continue
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    # Renamed into place or cleaned up by someone else meanwhile
+                    continue
+                self.logger.info(f"Removed partial file: {name}")
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from cortalv2i.utils.media_probe import DEFAULT_CACHE_DIR
+from cortalv2i.utils.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = 'ffmpeg.json'
+
+
+@dataclass(frozen=True)
+class FFmpegCapabilities:
+    ffmpeg: Optional[str] = None
+    ffprobe: Optional[str] = None
+    version: Optional[str] = None
+    encoders: Tuple[str, ...] = field(default_factory=tuple)
+    decoders: Tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg is not None
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def has_decoder(self, name: str) -> bool:
+        return name in self.decoders
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FFmpegCapabilities':
+        data = dict(data)
+        data['encoders'] = tuple(data.get('encoders', ()))
+        data['decoders'] = tuple(data.get('decoders', ()))
+        return cls(**data)
+
+
+_detected: Optional[FFmpegCapabilities] = None
+_lock = threading.Lock()
+
+
+def _binary_key(path: Optional[str]) -> Optional[List]:
+    """Identity of an executable: a rebuilt or upgraded binary gets a new key"""
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _run(cmd: List[str]) -> str:
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          universal_newlines=True, timeout=30).stdout
+
+
+def _parse_codecs(output: str) -> Tuple[str, ...]:
+    """Codec names from `ffmpeg -encoders` / `-decoders`, listed after the ' ------' separator"""
+    names, started = [], False
+    for line in output.splitlines():
+        if not started:
+            started = line.strip().startswith('---')
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            names.append(parts[1])
+    return tuple(sorted(names))
+
+
+def _probe_capabilities(ffmpeg: Optional[str], ffprobe: Optional[str]) -> FFmpegCapabilities:
+    if ffmpeg is None:
+        return FFmpegCapabilities(ffprobe=ffprobe)
+    try:
+        version_line = _run([ffmpeg, '-hide_banner', '-version']).partition('\n')[0]
+        match = re.match(r'ffmpeg version (\S+)', version_line)
+        return FFmpegCapabilities(
+            ffmpeg=ffmpeg,
+            ffprobe=ffprobe,
+            version=match.group(1) if match else None,
+            encoders=_parse_codecs(_run([ffmpeg, '-hide_banner', '-encoders'])),
+            decoders=_parse_codecs(_run([ffmpeg, '-hide_banner', '-decoders']))
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not run {ffmpeg}: {str(e)}")
+        return FFmpegCapabilities(ffprobe=ffprobe)
+
+
+def detect_ffmpeg(cache_dir: Optional[str] = None, refresh: bool = False) -> FFmpegCapabilities:
+    """Locate ffmpeg/ffprobe and list the ffmpeg version and codecs.
+
+    Running ffmpeg three times costs far more than a short job, so the result
+    is kept for the life of the process and on disk, next to the probe cache.
+    The disk entry is keyed by the path, size and mtime of both binaries, so
+    installing a different ffmpeg is picked up by the next run. A cache hit
+    costs a PATH lookup and two stat calls.
+
+    Args:
+        cache_dir: Directory of the cache file, None for the default
+            (CORTALV2I_CACHE_DIR or ~/.cache/cortalv2i); '' disables it
+        refresh: Ignore cached results and run ffmpeg again
+    """
+    global _detected
+    with _lock:
+        if _detected is not None and not refresh:
+            return _detected
+
+        if cache_dir is None:
+            cache_dir = os.environ.get('CORTALV2I_CACHE_DIR', DEFAULT_CACHE_DIR)
+        cache_path = os.path.join(cache_dir, CACHE_FILENAME) if cache_dir else None
+
+        ffmpeg, ffprobe = shutil.which('ffmpeg'), shutil.which('ffprobe')
+        key = [_binary_key(ffmpeg), _binary_key(ffprobe)]
+
+        capabilities = None
+        if cache_path and not refresh:
+            try:
+                with open(cache_path, 'r') as f:
+                    cached = json.load(f)
+                if cached.get('key') == key:
+                    capabilities = FFmpegCapabilities.from_dict(cached['capabilities'])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        if capabilities is None:
+            capabilities = _probe_capabilities(ffmpeg, ffprobe)
+            if cache_path:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    atomic_write(cache_path, json.dumps({'key': key, 'capabilities': capabilities.to_dict()}).encode())
+                except OSError as e:
+                    logger.debug(f"ffmpeg capability cache write failed: {str(e)}")
+
+        _detected = capabilities
+        return capabilities
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cortalv2i.utils.utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def config_fingerprint(config: Dict) -> str:
+    """Stable hash of the processing options that affect outputs"""
+    relevant = {key: value for key, value in config.items() if key not in ('execution', 'metrics')}
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def source_fingerprint(source: str) -> Dict:
+    try:
+        stat = os.stat(source)
+        return {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    except OSError:
+        return {'path': source}
+
+
+class JobManifest:
+    """Checkpoint of the finished chunks of one video's job.
+
+    Each completed chunk is recorded with its kind ('frames' or 'audio'),
+    its range (frames or seconds) and the files it wrote. The manifest is
+    rewritten atomically after every update, and a chunk only counts as
+    done while all of its outputs still exist. A manifest written for a
+    different source file or different processing options is discarded.
+    The chunk plan is recorded too, so a resumed run reuses the same chunk
+    boundaries even when it has a different number of workers.
+    """
+
+    def __init__(self, path: str, source: str, config: Dict):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = {
+            'source': source_fingerprint(source),
+            'config': config_fingerprint(config)
+        }
+        data = self._load()
+        self._chunks = data.get('chunks', {})
+        self._plans = data.get('plans', {})
+
+    @staticmethod
+    def chunk_key(kind: str, chunk_range: Sequence[float]) -> str:
+        return f"{kind}:{chunk_range[0]}-{chunk_range[1]}"
+
+    def is_done(self, kind: str, chunk_range: Sequence[float]) -> bool:
+        with self._lock:
+            entry = self._chunks.get(self.chunk_key(kind, chunk_range))
+        if entry is None:
+            return False
+        return all(os.path.exists(path) for path in entry['outputs'])
+
+    def pending(self, kind: str, chunk_ranges: Iterable[Sequence[float]]) -> List[Sequence[float]]:
+        """Return the chunk ranges of `kind` that still have to be processed"""
+        return [chunk_range for chunk_range in chunk_ranges if not self.is_done(kind, chunk_range)]
+
+    def plan(self, kind: str, make_plan: Callable[[], List[Sequence[float]]]) -> List[Tuple]:
+        """The recorded chunk ranges of `kind`, or those of make_plan() recorded now"""
+        with self._lock:
+            ranges = self._plans.get(kind)
+        if ranges is None:
+            ranges = [list(chunk_range) for chunk_range in make_plan()]
+            with self._lock:
+                self._plans[kind] = ranges
+                self._save()
+        return [tuple(chunk_range) for chunk_range in ranges]
+
+    def mark_done(self, kind: str, chunk_range: Sequence[float], outputs: Iterable[str]):
+        """Record a finished chunk and persist the manifest"""
+        with self._lock:
+            self._chunks[self.chunk_key(kind, chunk_range)] = {
+                'kind': kind,
+                'range': list(chunk_range),
+                'outputs': sorted(outputs),
+                'completed_at': time.time()
+            }
+            self._save()
+
+    def reset(self):
+        with self._lock:
+            self._chunks = {}
+            self._plans = {}
+            self._save()
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable job manifest {self.path}: {str(e)}")
+            return {}
+
+        if data.get('version') != MANIFEST_VERSION or any(
+                data.get(key) != value for key, value in self._identity.items()):
+            logger.info(f"Source or options changed since {self.path} was written, starting over")
+            return {}
+        return data
+
+    def _save(self):
+        data = dict(self._identity, version=MANIFEST_VERSION, chunks=self._chunks, plans=self._plans)
+        atomic_write(self.path, json.dumps(data, indent=2).encode())
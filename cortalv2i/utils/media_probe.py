@@ -0,0 +1,409 @@
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cortalv2i')
+
+# One table per cached kind of result: media metadata and keyframe indexes
+_TABLES = ('probes', 'keyframes')
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: Optional[str] = None
+    bit_rate: Optional[int] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    path: str
+    duration: float
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    format_name: Optional[str] = None
+    streams: Tuple[StreamInfo, ...] = field(default_factory=tuple)
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MediaInfo':
+        data = dict(data)
+        data['streams'] = tuple(StreamInfo(**stream) for stream in data.get('streams', ()))
+        return cls(**data)
+
+
+@dataclass(frozen=True)
+class KeyframeIndex:
+    """Keyframes of a video stream, from its packets (no decoding).
+
+    `frames` are the keyframes' positions in presentation order, counted
+    the way decoders number frames, and `timestamps` their presentation
+    timestamps in seconds as stored in the container.
+    """
+    frames: Tuple[int, ...]
+    timestamps: Tuple[float, ...]
+    frame_count: int
+
+    def between(self, start_frame: int, end_frame: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(frame, timestamp) of the keyframes in [start_frame, end_frame)"""
+        first = bisect_left(self.frames, start_frame)
+        last = len(self.frames) if end_frame is None else bisect_left(self.frames, end_frame)
+        return list(zip(self.frames[first:last], self.timestamps[first:last]))
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'KeyframeIndex':
+        return cls(tuple(data['frames']), tuple(data['timestamps']), data['frame_count'])
+
+
+class ProbeCache:
+    """Media metadata cache shared by every code path that inspects a video.
+
+    Results live in an in-memory LRU and in an SQLite store on disk, keyed by
+    absolute path, size and mtime, so a modified file is probed again. The
+    disk store is shared between processes and trimmed to the most recently
+    used `max_disk_entries` records. Keyframe indexes are cached the same
+    way, in a table of their own.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 100000):
+        """
+        Args:
+            cache_dir: Directory of the on-disk store, None for the default
+                (CORTALV2I_CACHE_DIR or ~/.cache/cortalv2i); '' disables it
+            max_memory_entries: Size of the in-memory LRU
+            max_disk_entries: Number of records kept on disk
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get('CORTALV2I_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.db_path = os.path.join(cache_dir, 'probe.sqlite3') if cache_dir else None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_ready = False
+
+    def get(self, path: str) -> MediaInfo:
+        """Return metadata for a media file or URL, probing it only on a cache miss"""
+        return self._get('probes', path, probe_uncached, MediaInfo.from_dict)
+
+    def keyframes(self, path: str) -> KeyframeIndex:
+        """Return the keyframe index of a video, reading its packets only on a cache miss"""
+        return self._get('keyframes', path, probe_keyframes, KeyframeIndex.from_dict)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path and os.path.exists(self.db_path):
+            with self._connect() as db:
+                for table in _TABLES:
+                    db.execute(f"DELETE FROM {table}")
+
+    def _get(self, table: str, path: str, probe, from_dict):
+        key = self._key(path)
+        memory_key = (table,) + key
+
+        with self._lock:
+            value = self._memory.get(memory_key)
+            if value is not None:
+                self._memory.move_to_end(memory_key)
+                self.hits += 1
+                return value
+
+        data = self._load(table, key)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            value = probe(path)
+            self._store(table, key, value)
+        else:
+            value = from_dict(data)
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._memory[memory_key] = value
+            self._memory.move_to_end(memory_key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _key(path: str) -> Tuple[str, int, int]:
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            # URLs and other non-file sources are only cached in memory
+            return path, -1, -1
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _ensure_db(self) -> bool:
+        if not self.db_path:
+            return False
+        if not self._db_ready:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self._connect() as db:
+                for table in _TABLES:
+                    db.execute(
+                        f"CREATE TABLE IF NOT EXISTS {table} ("
+                        "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                        "data TEXT, accessed REAL)"
+                    )
+            self._db_ready = True
+        return True
+
+    def _load(self, table: str, key) -> Optional[Dict]:
+        if key[1] < 0:
+            return None
+        try:
+            if not self._ensure_db():
+                return None
+            with self._connect() as db:
+                row = db.execute(
+                    f"SELECT data FROM {table} WHERE path = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+                if row is None:
+                    return None
+                db.execute(f"UPDATE {table} SET accessed = ? WHERE path = ?", (time.time(), key[0]))
+            return json.loads(row[0])
+        except (sqlite3.Error, OSError, ValueError, TypeError) as e:
+            logger.debug(f"Probe cache read failed for {key[0]}: {str(e)}")
+            return None
+
+    def _store(self, table: str, key, value):
+        if key[1] < 0:
+            return
+        try:
+            if not self._ensure_db():
+                return
+            with self._connect() as db:
+                db.execute(
+                    f"INSERT OR REPLACE INTO {table} (path, size, mtime_ns, data, accessed) VALUES (?, ?, ?, ?, ?)",
+                    key + (json.dumps(value.to_dict()), time.time())
+                )
+                db.execute(
+                    f"DELETE FROM {table} WHERE path NOT IN "
+                    f"(SELECT path FROM {table} ORDER BY accessed DESC LIMIT ?)",
+                    (self.max_disk_entries,)
+                )
+        except (sqlite3.Error, OSError) as e:
+            logger.debug(f"Probe cache write failed for {key[0]}: {str(e)}")
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    try:
+        return float(Fraction(rate)) if rate else 0.0
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_ffprobe(path: str, data: Optional[bytes] = None) -> Dict:
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_format', '-show_streams',
+        '-of', 'json',
+        path if data is None else 'pipe:0'
+    ]
+    result = subprocess.run(cmd, input=data, capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(f"Could not probe media file: {path} ({result.stderr.decode(errors='replace').strip()})")
+    return json.loads(result.stdout)
+
+
+def _packet_time(fields: Dict[str, str]) -> Optional[float]:
+    for key in ('pts_time', 'dts_time'):
+        try:
+            return float(fields[key])
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def probe_keyframes(path: str) -> KeyframeIndex:
+    """Index the keyframes of a video's first stream from its packet flags.
+
+    ffprobe only demuxes, so this reads the file at disk speed. A keyframe's
+    frame number is the rank of its timestamp among all packets, which is
+    its position in presentation order even with B-frames.
+    """
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,dts_time,flags',
+        '-of', 'compact=p=0', path
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(f"Could not index keyframes: {path} ({result.stderr.decode(errors='replace').strip()})")
+
+    times, keyframes = [], []
+    for line in result.stdout.decode(errors='replace').splitlines():
+        fields = dict(item.partition('=')[::2] for item in line.split('|'))
+        time_s = _packet_time(fields)
+        if time_s is None:
+            continue
+        times.append(time_s)
+        if fields.get('flags', '').startswith('K'):
+            keyframes.append(time_s)
+    times.sort()
+    keyframes.sort()
+    return KeyframeIndex(
+        frames=tuple(bisect_left(times, time_s) for time_s in keyframes),
+        timestamps=tuple(keyframes),
+        frame_count=len(times)
+    )
+
+
+def _probe_opencv(path: str) -> MediaInfo:
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    return MediaInfo(
+        path=path,
+        duration=frame_count / fps if fps else 0.0,
+        fps=fps,
+        frame_count=frame_count,
+        width=width,
+        height=height
+    )
+
+
+def probe_uncached(path: str) -> MediaInfo:
+    """Probe a media file with ffprobe (OpenCV when ffprobe is not installed)"""
+    try:
+        data = _run_ffprobe(path)
+    except FileNotFoundError:
+        return _probe_opencv(path)
+    return _media_info(path, data)
+
+
+def probe_head(path: str, head: bytes) -> MediaInfo:
+    """Probe the first bytes of a stream with ffprobe.
+
+    Works when the container header precedes the media data (MKV, WebM,
+    MPEG-TS, fast-start MP4); raises ValueError otherwise. Durations and
+    frame counts are those the header declares, zero when it has none.
+    """
+    return _media_info(path, _run_ffprobe(path, head))
+
+
+def _media_info(path: str, data: Dict) -> MediaInfo:
+    fmt = data.get('format', {})
+    streams = []
+    video = audio = None
+    for stream in data.get('streams', []):
+        info = StreamInfo(
+            index=int(stream.get('index', len(streams))),
+            codec_type=stream.get('codec_type', 'unknown'),
+            codec_name=stream.get('codec_name'),
+            bit_rate=_int_or_none(stream.get('bit_rate')),
+            sample_rate=_int_or_none(stream.get('sample_rate')),
+            channels=_int_or_none(stream.get('channels')),
+            width=_int_or_none(stream.get('width')),
+            height=_int_or_none(stream.get('height'))
+        )
+        streams.append(info)
+        if info.codec_type == 'video' and video is None:
+            video = stream
+        elif info.codec_type == 'audio' and audio is None:
+            audio = stream
+
+    duration = float(fmt.get('duration') or 0.0)
+    fps = 0.0
+    frame_count = 0
+    if video is not None:
+        fps = _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate'))
+        if not duration:
+            duration = float(video.get('duration') or 0.0)
+        frame_count = _int_or_none(video.get('nb_frames')) or int(round(duration * fps))
+
+    return MediaInfo(
+        path=path,
+        duration=duration,
+        fps=fps,
+        frame_count=frame_count,
+        width=int(video.get('width', 0)) if video else 0,
+        height=int(video.get('height', 0)) if video else 0,
+        video_codec=video.get('codec_name') if video else None,
+        audio_codec=audio.get('codec_name') if audio else None,
+        format_name=fmt.get('format_name'),
+        streams=tuple(streams)
+    )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    """Process-wide probe cache used by probe_media"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProbeCache()
+        return _default_cache
+
+
+def probe_media(path: str) -> MediaInfo:
+    """Return cached metadata (duration, fps, frame count, resolution, codecs, streams) for a media file"""
+    return get_probe_cache().get(path)
+
+
+def keyframe_index(path: str) -> KeyframeIndex:
+    """Return the cached keyframe index of a video; see probe_keyframes"""
+    return get_probe_cache().keyframes(path)
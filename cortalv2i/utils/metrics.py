@@ -0,0 +1,202 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from cortalv2i.utils.utils import atomic_write
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_PREFIX = 'cortalv2i'
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Per-stage counters and latency histograms for one run (or one chunk).
+
+    Stages are named after the work they time: 'decode', 'resize', 'dedup',
+    'encode', 'write', 'queue_wait', 'scene' and 'audio'. Stages can nest:
+    'scene' includes the 'decode' of its analysis frames. A disabled registry
+    hands out a shared no-op timer and returns iterables untouched, so
+    instrumented code costs one attribute check per call.
+
+    Registries are thread-safe. Snapshots are plain dicts, so a worker
+    process can return its chunk's metrics to the parent to be merged.
+    """
+
+    def __init__(self, enabled: bool = False, traces: bool = False):
+        """
+        Args:
+            enabled: Record anything at all
+            traces: Keep one trace entry per chunk (see add_trace)
+        """
+        self.enabled = enabled
+        self.traces: Optional[List[Dict]] = [] if traces else None
+        self.counters: Dict[str, float] = {}
+        # stage -> [count per bucket..., count in +Inf, total count, total seconds]
+        self.histograms: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = [0] * (len(BUCKETS) + 3)
+            histogram[bucket] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def time(self, stage: str):
+        """Context manager recording the duration of its block under `stage`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def timed(self, stage: str, iterable: Iterable) -> Iterable:
+        """Wrap an iterable so the time to produce each item is recorded under `stage`"""
+        if not self.enabled:
+            return iterable
+        return self._timed(stage, iterable)
+
+    def _timed(self, stage: str, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - start)
+            yield item
+
+    def add_trace(self, label: str, wall_s: float, snapshot: Optional[Dict] = None, **fields):
+        """Record a per-chunk trace entry with its wall time and stage totals"""
+        if not self.enabled or self.traces is None:
+            return
+        snapshot = snapshot or {}
+        entry = dict(fields, label=label, wall_s=wall_s,
+                     stages={stage: h['sum'] for stage, h in snapshot.get('stages', {}).items()},
+                     counters=dict(snapshot.get('counters', {})))
+        with self._lock:
+            self.traces.append(entry)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'stages': {
+                    stage: {
+                        'buckets': list(histogram[:-2]),
+                        'count': histogram[-2],
+                        'sum': histogram[-1]
+                    }
+                    for stage, histogram in self.histograms.items()
+                }
+            }
+
+    def merge(self, snapshot: Optional[Dict]):
+        """Add the counters and histograms of another registry's snapshot"""
+        if not self.enabled or not snapshot:
+            return
+        with self._lock:
+            for name, value in snapshot.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, data in snapshot.get('stages', {}).items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = [0] * (len(BUCKETS) + 3)
+                for i, value in enumerate(data['buckets']):
+                    histogram[i] += value
+                histogram[-2] += data['count']
+                histogram[-1] += data['sum']
+
+    def report(self) -> Dict:
+        """JSON run report: counters, per-stage latency summaries and traces"""
+        report = self.snapshot()
+        for stage, data in report['stages'].items():
+            data['mean'] = data['sum'] / data['count'] if data['count'] else 0.0
+            data['bucket_bounds'] = list(BUCKETS) + ['+Inf']
+        if self.traces is not None:
+            with self._lock:
+                report['traces'] = list(self.traces)
+        return report
+
+    def write_json(self, path: str):
+        atomic_write(path, json.dumps(self.report(), indent=2).encode())
+
+    def to_prometheus(self) -> str:
+        """Render the registry in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        metric = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        if snapshot['stages']:
+            lines.append(f"# HELP {metric} Time spent per processing stage")
+            lines.append(f"# TYPE {metric} histogram")
+        for stage, data in sorted(snapshot['stages'].items()):
+            cumulative = 0
+            for bound, value in zip(list(BUCKETS) + ['+Inf'], data['buckets']):
+                cumulative += value
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {data["sum"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {data["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Write a textfile for the node_exporter textfile collector"""
+        atomic_write(path, self.to_prometheus().encode())
+
+
+_default_metrics = Metrics(enabled=os.environ.get('CORTALV2I_METRICS', '') not in ('', '0'))
+
+
+def get_metrics() -> Metrics:
+    """Process-wide registry used when no registry is passed explicitly.
+
+    Disabled unless the CORTALV2I_METRICS environment variable is set.
+    """
+    return _default_metrics
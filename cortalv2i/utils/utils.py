@@ -1,9 +1,10 @@
 import os
-import cv2
 import logging
-from typing import List, Union
+from typing import List, Optional, Union
 from pathlib import Path
 
+from cortalv2i.utils.media_probe import probe_media
+
 def setup_logging(filename: str) -> None:
     """Setup logging configuration"""
     logging.basicConfig(
@@ -20,16 +21,7 @@ def get_video_duration(video_path: str) -> float:
     Get duration of video in seconds
     """
     try:
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            return 0
-        
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count/fps
-        
-        cap.release()
-        return duration
+        return probe_media(video_path).duration
     except Exception as e:
         logging.error(f"Error getting video duration: {str(e)}")
         return 0
@@ -91,6 +83,18 @@ def is_video_file(filepath: str) -> bool:
     video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'}
     return Path(filepath).suffix.lower() in video_extensions
 
+def is_url(source: str) -> bool:
+    """
+    Check if a source is a web URL rather than a local path
+    """
+    return isinstance(source, str) and source.lower().startswith(('http://', 'https://', 'www.'))
+
+def normalize_url(source: str) -> str:
+    """
+    Add the http scheme to URLs given as www.host/...
+    """
+    return f"http://{source}" if source.lower().startswith('www.') else source
+
 def validate_path(path: str) -> bool:
     """
     Validate if path exists and is accessible
@@ -111,6 +115,63 @@ def ensure_directory(directory: str) -> bool:
         logging.error(f"Error creating directory {directory}: {str(e)}")
         return False
 
+def partial_path(path: str) -> str:
+    """
+    Hidden temporary name a file is written under before being renamed into place
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+def partial_path_owner(name: str) -> Optional[int]:
+    """
+    Pid of the process writing a partial_path file name, None if it is not one
+    """
+    if not (name.startswith('.') and name.endswith('.tmp')):
+        return None
+    pid = name[:-len('.tmp')].rpartition('.')[2]
+    return int(pid) if pid.isdigit() else None
+
+def process_running(pid: int) -> bool:
+    """
+    Whether a process with this pid exists
+    """
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Write data to path via a temporary file and rename, so readers never see a partial file
+    """
+    tmp_path = partial_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def get_safe_filename(filename: str) -> str:
     """
     Convert filename to safe version by removing invalid characters
@@ -0,0 +1,72 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from cortalv2i.utils import ffmpeg_capabilities, media_probe
+
+HAVE_FFMPEG = bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "ffmpeg: needs the ffmpeg and ffprobe executables")
+
+
+def pytest_collection_modifyitems(config, items):
+    if HAVE_FFMPEG:
+        return
+    skip = pytest.mark.skip(reason="ffmpeg/ffprobe not installed")
+    for item in items:
+        if item.get_closest_marker('ffmpeg'):
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_cache_dir(tmp_path_factory):
+    """Keep probe results and ffmpeg capabilities out of ~/.cache: point
+    CORTALV2I_CACHE_DIR (inherited by subprocesses) at a temporary directory
+    and drop the process-wide cache"""
+    cache_dir = tmp_path_factory.mktemp("cache")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('CORTALV2I_CACHE_DIR', str(cache_dir))
+        patch.setattr(media_probe, '_default_cache', None)
+        yield str(cache_dir)
+
+
+@pytest.fixture(autouse=True)
+def fresh_ffmpeg_capabilities(monkeypatch):
+    """Detect ffmpeg anew in every test, so one faking a missing or limited
+    ffmpeg never leaves its capabilities to the next"""
+    monkeypatch.setattr(ffmpeg_capabilities, '_detected', None)
+
+
+@pytest.fixture(scope="session")
+def make_clip(tmp_path_factory):
+    """Build a clip from ffmpeg's test pattern, with a 440 Hz tone unless `audio` is None.
+
+    make_clip(name, duration, size='160x120', rate=25, video_args=(), audio='aac',
+              audio_args=(), sample_rate=None, directory=None) returns the path of
+    `name` in `directory` (default: a new temporary directory). `video_args`
+    and `audio_args` follow the mpeg4 and `audio` codec options.
+    """
+    def make(name, duration, size='160x120', rate=25, video_args=(), audio='aac', audio_args=(),
+             sample_rate=None, directory=None):
+        if not HAVE_FFMPEG:
+            pytest.skip("ffmpeg/ffprobe not installed")
+        directory = Path(directory) if directory else tmp_path_factory.mktemp(Path(name).stem)
+        path = str(directory / name)
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+               '-f', 'lavfi', '-i', f"testsrc=size={size}:rate={rate}:duration={duration}"]
+        if audio:
+            sine = f"sine=frequency=440:duration={duration}"
+            if sample_rate:
+                sine += f":sample_rate={sample_rate}"
+            cmd.extend(['-f', 'lavfi', '-i', sine])
+        cmd.extend(['-c:v', 'mpeg4', *video_args])
+        if audio:
+            cmd.extend(['-c:a', audio, *audio_args, '-shortest'])
+        subprocess.run(cmd + [path], check=True)
+        return path
+
+    return make
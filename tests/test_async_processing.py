@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from cortalv2i.core.audio_extractor import AsyncAudioExtractor
+from cortalv2i.core.video_processor import AsyncVideoProcessor
+
+pytestmark = pytest.mark.ffmpeg
+
+
+@pytest.fixture(scope="module")
+def clip(make_clip):
+    """Three-second test pattern with a sine audio track"""
+    return make_clip("clip.mp4", 3, rate=10)
+
+
+def test_async_audio_extraction_reports_progress_on_the_loop(clip, tmp_path):
+    seen = []
+
+    async def run():
+        loop_thread = threading.get_ident()
+        extractor = AsyncAudioExtractor(str(tmp_path))
+        ok = await extractor.extract_audio(
+            clip, format='wav', progress_callback=lambda p: seen.append((p, threading.get_ident() == loop_thread))
+        )
+        chunks = await extractor.extract_audio_chunks(clip, 1.0, format='wav')
+        return ok, chunks
+
+    ok, chunks = asyncio.run(run())
+    assert ok
+    assert os.path.getsize(tmp_path / "clip.wav") > 0
+    assert seen[-1] == (1.0, True)
+    assert [os.path.basename(path) for path in chunks] == ['clip_chunk1.wav', 'clip_chunk2.wav', 'clip_chunk3.wav']
+
+
+def test_async_audio_failure_raises(tmp_path):
+    with pytest.raises(Exception):
+        asyncio.run(AsyncAudioExtractor(str(tmp_path)).extract_audio(
+            str(tmp_path / "missing.mp4"), format='wav', start_time=0, end_time=1))
+
+
+def test_concurrent_jobs_on_one_loop(clip, tmp_path):
+    progress = {0: [], 1: []}
+
+    async def job(index):
+        frames_dir = tmp_path / f"frames{index}"
+        audio_dir = tmp_path / f"audio{index}"
+        frames_dir.mkdir()
+        audio_dir.mkdir()
+        processor = AsyncVideoProcessor(frames_dir=str(frames_dir), audio_dir=str(audio_dir))
+        return await processor.process_input(
+            clip, 0, 30,
+            extraction_config={'method': 'fps', 'params': {'fps': 2}, 'output_format': 'jpg'},
+            audio_config={'format': 'wav'},
+            progress_callback=progress[index].append
+        )
+
+    async def run():
+        return await asyncio.gather(job(0), job(1))
+
+    results = asyncio.run(run())
+    for index, written in enumerate(results):
+        assert len(written) == 6
+        assert all(os.path.exists(path) for path in written)
+        assert os.path.exists(tmp_path / f"audio{index}" / "clip.wav")
+        assert progress[index] == sorted(progress[index])
+        assert progress[index][-1] == pytest.approx(1.0)
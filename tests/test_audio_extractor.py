@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from cortalv2i.core.audio_extractor import AudioExtractor, AudioOutput, parse_audio_outputs
+from cortalv2i.utils.media_probe import probe_media
+
+
+@pytest.fixture(scope="module")
+def clip(make_clip):
+    """Five seconds of test pattern with an AAC tone"""
+    return make_clip("tone.mp4", 5, audio_args=['-b:a', '96k'])
+
+
+def test_parse_audio_outputs():
+    assert parse_audio_outputs({'format': 'wav', 'bitrate': '128k'}) == [AudioOutput('wav', '128k')]
+    assert parse_audio_outputs(None) == []
+    assert parse_audio_outputs(['wav', {'format': 'mp3', 'bitrate': '128k'}, {'format': 'mp3', 'bitrate': '320k'},
+                                {'format': 'm4a', 'copy': False}, 'wav']) == [
+        AudioOutput('wav'), AudioOutput('mp3', '128k', '_128k'), AudioOutput('mp3', '320k', '_320k'),
+        AudioOutput('m4a', copy=False)]
+    assert AudioOutput('mp3', suffix='_128k').filename('talk', 2) == 'talk_128k_chunk2.mp3'
+
+
+@pytest.mark.ffmpeg
+def test_compatible_source_is_copied(clip, tmp_path):
+    extractor = AudioExtractor(str(tmp_path))
+    cmd, paths = extractor._extract_command(clip, [AudioOutput('m4a'), AudioOutput('mp3')])
+    assert cmd.count('copy') == 1 and 'libmp3lame' in cmd
+    assert extractor._extract_command(clip, [AudioOutput('m4a', copy=False)])[0].count('copy') == 0
+
+    assert extractor.extract_audio(clip, outputs=[AudioOutput('m4a'), AudioOutput('mp3')])
+    copied = probe_media(paths[0]).streams[0]
+    # The AAC stream is remuxed as is, so the requested 192k does not apply
+    assert copied.codec_name == 'aac' and copied.bit_rate < 150000
+    assert probe_media(paths[1]).audio_codec == 'mp3'
+
+
+@pytest.mark.ffmpeg
+def test_several_outputs_from_one_run(clip, tmp_path):
+    outputs = parse_audio_outputs(['wav', {'format': 'mp3', 'bitrate': '64k'}, {'format': 'mp3', 'bitrate': '128k'}])
+    paths = AudioExtractor(str(tmp_path)).extract_audio_chunks(clip, 2.0, outputs=outputs)
+
+    assert [os.path.basename(path) for path in paths] == [
+        'tone_chunk1.wav', 'tone_chunk2.wav', 'tone_chunk3.wav',
+        'tone_64k_chunk1.mp3', 'tone_64k_chunk2.mp3', 'tone_64k_chunk3.mp3',
+        'tone_128k_chunk1.mp3', 'tone_128k_chunk2.mp3', 'tone_128k_chunk3.mp3']
+    assert os.path.getsize(paths[6]) > 1.5 * os.path.getsize(paths[3])
+
+
+def test_missing_chunks_raise(tmp_path):
+    extractor = AudioExtractor(str(tmp_path))
+    for name in ['talk_chunk1.wav', 'talk_chunk3.wav']:
+        (tmp_path / name).write_bytes(b'')
+    with pytest.raises(IOError, match='talk_chunk2.wav'):
+        extractor._chunks_done(0, 'talk.mp4', 2.0, [AudioOutput('wav')], 6.0)
+
+    (tmp_path / 'talk_chunk2.wav').write_bytes(b'')
+    # Container duration a hair past the audio: no fourth chunk expected
+    assert len(extractor._chunks_done(0, 'talk.mp4', 2.0, [AudioOutput('wav')], 6.05)) == 3
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("tqdm")
+
+from cortalv2i.core.batch_scheduler import (BatchScheduler, WorkItem, estimate_audio_cost,
+                                            estimate_frames_cost)
+from cortalv2i.core.chunk_executor import ChunkExecutor
+from cortalv2i.utils.media_probe import MediaInfo
+
+
+def echo_chunk(chunk_info):
+    if chunk_info.get('fail'):
+        return None
+    return {'outputs': [f"{chunk_info['source']}:{chunk_info['kind']}"]}
+
+
+def test_items_run_longest_first_across_videos():
+    scheduler = BatchScheduler(ChunkExecutor(backend='thread', max_workers=1))
+    scheduler.add(WorkItem('a.mp4', 'frames', (0, 100), cost=1.0))
+    scheduler.add(WorkItem('b.mp4', 'frames', (0, 100), cost=5.0))
+    scheduler.add(WorkItem('a.mp4', 'audio', (0, 10), cost=3.0))
+
+    order = []
+    scheduler.run(echo_chunk, on_item_complete=lambda item, result: order.append((item.source, item.kind)))
+
+    assert order == [('b.mp4', 'frames'), ('a.mp4', 'audio'), ('a.mp4', 'frames')]
+
+
+def test_per_video_completion_is_reported_once():
+    scheduler = BatchScheduler(ChunkExecutor(backend='thread', max_workers=2))
+    scheduler.add(WorkItem('a.mp4', 'frames', (0, 100), cost=1.0))
+    scheduler.add(WorkItem('a.mp4', 'frames', (100, 200), cost=1.0))
+    scheduler.add(WorkItem('b.mp4', 'frames', (0, 100), cost=2.0, payload={'fail': True}))
+
+    completed = []
+    statuses = scheduler.run(echo_chunk, on_video_complete=completed.append)
+
+    assert sorted(status.source for status in completed) == ['a.mp4', 'b.mp4']
+    assert (statuses['a.mp4'].succeeded, statuses['a.mp4'].failed) == (2, 0)
+    assert (statuses['b.mp4'].succeeded, statuses['b.mp4'].failed) == (0, 1)
+
+
+def test_cost_grows_with_resolution_and_method():
+    sd = MediaInfo(path='sd', duration=60, fps=30, frame_count=1800, width=640, height=360)
+    hd = MediaInfo(path='hd', duration=60, fps=30, frame_count=1800, width=1920, height=1080)
+
+    assert estimate_frames_cost(hd, (0, 1800)) > estimate_frames_cost(sd, (0, 1800))
+    assert estimate_frames_cost(sd, (0, 1800), 'scene') > estimate_frames_cost(sd, (0, 1800), 'fps')
+    assert estimate_audio_cost((0, 60)) < estimate_frames_cost(sd, (0, 1800))
+
+
+def test_unknown_kind_rejected():
+    scheduler = BatchScheduler(ChunkExecutor(backend='thread'))
+    with pytest.raises(ValueError):
+        scheduler.add(WorkItem('a.mp4', 'subtitles', (0, 1), cost=1.0))
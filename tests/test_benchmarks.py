@@ -0,0 +1,55 @@
+import json
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from benchmarks import run
+from benchmarks.run import compare, run_case
+from benchmarks.synthetic import VideoSpec, render_frame
+
+
+def make_results(wall, rss=100.0):
+    return {'results': {'clip/fps_extractor': {'wall_s': wall, 'fps': 100 / wall, 'frames_out': 10,
+                                               'peak_rss_mb': rss}}}
+
+
+def test_render_frame_is_deterministic_with_cuts():
+    spec = VideoSpec('t', 64, 48, 10, 2, cut_every=1.0)
+    assert np.array_equal(render_frame(spec, 3), render_frame(spec, 3))
+    before, after = render_frame(spec, 9).astype(int), render_frame(spec, 10).astype(int)
+    assert (np.abs(after - before).max(axis=2) > 25).mean() > 0.5
+
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    baseline = make_results(2.0)
+    assert compare(make_results(2.4), baseline, tolerance=0.25) == []
+    assert len(compare(make_results(2.6), baseline, tolerance=0.25)) == 1
+
+
+def test_compare_tolerates_noise_on_short_cases():
+    assert compare(make_results(0.15), make_results(0.1), tolerance=0.1, min_delta_s=0.1) == []
+
+
+def test_compare_checks_memory_and_failures():
+    baseline = make_results(1.0, rss=100.0)
+    assert len(compare(make_results(1.0, rss=200.0), baseline, rss_tolerance=0.5)) == 1
+    assert compare(make_results(1.0, rss=200.0), baseline, rss_tolerance=None) == []
+    failed = {'results': {'clip/fps_extractor': {'error': ['boom']}}}
+    assert len(compare(failed, baseline)) == 1
+
+
+def test_every_attempt_starts_with_a_cold_probe_cache(tmp_path, monkeypatch):
+    cache_dirs = []
+
+    def fake_run(cmd, env=None, **kwargs):
+        cache_dirs.append(env['CORTALV2I_CACHE_DIR'])
+        result = {'wall_s': 1.0, 'fps': 10.0, 'frames_out': 10, 'peak_rss_mb': None}
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(result))
+
+    monkeypatch.setattr(run.subprocess, 'run', fake_run)
+    run_case('fps_extractor', VideoSpec('t', 64, 48, 10, 2), 'clip.mp4', str(tmp_path), repeat=3)
+    assert len(set(cache_dirs)) == 3
+    assert all(path.startswith(str(tmp_path)) for path in cache_dirs)
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("tqdm")
+
+from cortalv2i.core.chunk_executor import ChunkExecutor, report_progress
+
+
+def square_chunk(chunk_info):
+    report_progress(chunk_info, 0.5)
+    report_progress(chunk_info, 1.0)
+    return chunk_info['index'] ** 2
+
+
+def failing_chunk(chunk_info):
+    raise RuntimeError("boom")
+
+
+def make_chunks(count):
+    return [{'index': i + 1, 'total': count} for i in range(count)]
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_run_returns_results_in_order(backend):
+    executor = ChunkExecutor(backend=backend, max_workers=2)
+    assert executor.run(square_chunk, make_chunks(4)) == [1, 4, 9, 16]
+
+
+def test_run_reports_failures_as_false():
+    executor = ChunkExecutor(backend='thread', max_workers=2)
+    assert executor.run(failing_chunk, make_chunks(2)) == [False, False]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        ChunkExecutor(backend='gpu')
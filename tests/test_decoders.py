@@ -0,0 +1,73 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from cortalv2i.core.decoders import FFmpegPipeDecoder, open_decoder
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("decoders") / "counter.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (320, 240))
+    for i in range(100):
+        writer.write(np.full((240, 320, 3), (i * 2) % 256, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_select_expression():
+    assert FFmpegPipeDecoder._select_expression(range(10, 50, 5), 10) == "lt(n\\,40)*not(mod(n\\,5))"
+    assert FFmpegPipeDecoder._select_expression([10, 12, 30], 10) == "eq(n\\,0)+eq(n\\,2)+eq(n\\,20)"
+    assert FFmpegPipeDecoder._select_expression(range(10, 50, 5), 0) == "between(n\\,10\\,49)*not(mod(n-10\\,5))"
+
+
+def test_opencv_decoder_scales_and_converts(video):
+    decoder = open_decoder(video)
+    frames = list(decoder.read(range(0, 100, 40), size=(160, 120), gray=True))
+    decoder.release()
+
+    assert [index for index, _ in frames] == [0, 40, 80]
+    assert frames[0][1].shape == (120, 160)
+
+
+@pytest.mark.ffmpeg
+@pytest.mark.parametrize("schedule", [range(0, 100, 10), range(33, 90, 7), [1, 2, 50, 99]])
+def test_ffmpeg_pipe_matches_opencv(video, schedule):
+    reference = open_decoder(video)
+    expected = dict(reference.read(schedule))
+    reference.release()
+
+    decoded = dict(open_decoder(video, 'ffmpeg-pipe').read(schedule))
+
+    assert list(decoded) == list(expected)
+    for index, frame in decoded.items():
+        assert np.abs(frame.astype(int) - expected[index]).mean() < 2
+
+
+def test_unknown_decoder_rejected(video):
+    with pytest.raises(ValueError):
+        open_decoder(video, 'gstreamer')
+
+
+@pytest.mark.ffmpeg
+@pytest.mark.parametrize("mode", ['fit', 'letterbox'])
+def test_backends_agree_on_aspect_preserving_modes(video, mode):
+    schedule = range(0, 100, 30)
+    reference = open_decoder(video)
+    expected = dict(reference.read(schedule, size=(200, 200), resize_mode=mode))
+    reference.release()
+
+    # Reused buffers are overwritten as decoding continues, so keep copies
+    decoded = {index: frame.copy() for index, frame in
+               open_decoder(video, 'ffmpeg-pipe').read(schedule, size=(200, 200), resize_mode=mode, buffers=2)}
+
+    assert expected[0].shape == decoded[0].shape == ((150, 200, 3) if mode == 'fit' else (200, 200, 3))
+    for index in (30, 90):
+        assert np.abs(decoded[index].astype(int) - expected[index]).mean() < 2
+
+
+@pytest.mark.ffmpeg
+def test_ffmpeg_pipe_reads_into_reused_buffers(video):
+    frames = [frame for _, frame in open_decoder(video, 'ffmpeg-pipe').read(range(0, 100, 20), buffers=2)]
+    assert frames[0] is frames[2] is frames[4]
+    assert frames[0].flags.writeable
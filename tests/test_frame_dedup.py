@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cortalv2i.core.frame_dedup import BKTree, FrameDeduplicator, dhash, hamming_distance, make_deduplicator
+
+
+def gradient_frame(seed, size=(120, 160)):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (6, 8), dtype=np.uint8)
+    frame = np.kron(base, np.ones((size[0] // 6, size[1] // 8), dtype=np.uint8))
+    return np.dstack([frame] * 3)
+
+
+def test_dhash_is_stable_under_noise_and_scaling():
+    frame = gradient_frame(1)
+    noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(0).integers(-3, 4, frame.shape), 0, 255)
+    scaled = np.repeat(np.repeat(frame, 2, axis=0), 2, axis=1)
+
+    assert hamming_distance(dhash(frame), dhash(noisy.astype(np.uint8))) <= 4
+    assert dhash(frame) == dhash(scaled)
+    assert hamming_distance(dhash(frame), dhash(gradient_frame(2))) > 10
+
+
+def test_bk_tree_matches_linear_scan():
+    rng = random.Random(3)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for value in values:
+        tree.add(value)
+
+    for _ in range(50):
+        query = rng.choice(values) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        expected = any(hamming_distance(query, value) <= 2 for value in values)
+        assert (tree.find(query, 2) is not None) == expected
+    assert len(tree) == len(set(values))
+
+
+def test_deduplicator_counts_suppressed_frames():
+    dedup = FrameDeduplicator(max_distance=4)
+    frames = [gradient_frame(1), gradient_frame(1), gradient_frame(2), gradient_frame(1)]
+
+    assert [dedup.is_duplicate(frame) for frame in frames] == [False, True, False, True]
+    assert (dedup.kept, dedup.suppressed) == (2, 2)
+
+
+def test_make_deduplicator_config():
+    assert make_deduplicator(None) is None
+    assert make_deduplicator(False) is None
+    assert make_deduplicator(True).max_distance == 4
+    assert make_deduplicator(6).max_distance == 6
+    assert make_deduplicator({'max_distance': 2, 'hash_size': 16}).hash_size == 16
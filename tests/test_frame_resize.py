@@ -0,0 +1,63 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from cortalv2i.core.frame_resize import BufferRing, FrameResizer, ffmpeg_scale_filters, parse_resolution, resize_plan
+
+
+def test_parse_resolution():
+    assert parse_resolution("1280*720") == (1280, 720)
+    assert parse_resolution("640x360") == (640, 360)
+    assert parse_resolution([320, 240]) == (320, 240)
+    assert parse_resolution(None) is None
+    for value in ("1280", "a*b", "0*720", (1, 2, 3)):
+        with pytest.raises(ValueError):
+            parse_resolution(value)
+
+
+def test_resize_plan_keeps_the_aspect_ratio():
+    assert resize_plan(3840, 2160, (1280, 1280), 'stretch') == ((1280, 1280), (0, 0), (1280, 1280))
+    assert resize_plan(3840, 2160, (1280, 1280), 'fit') == ((1280, 720), (0, 0), (1280, 720))
+    assert resize_plan(3840, 2160, (1280, 1280), 'letterbox') == ((1280, 720), (0, 280), (1280, 1280))
+    assert resize_plan(480, 640, (400, 400), 'letterbox') == ((300, 400), (50, 0), (400, 400))
+    with pytest.raises(ValueError):
+        resize_plan(640, 480, (320, 240), 'crop')
+
+
+def test_ffmpeg_filters_pad_only_for_letterbox():
+    assert ffmpeg_scale_filters(3840, 2160, (1280, 720), 'fit', 'bgr24') == ["scale=1280:720:flags=area"]
+    assert ffmpeg_scale_filters(320, 240, (640, 640), 'letterbox', 'gray') == [
+        "scale=640:480:flags=bicubic", "format=gray", "pad=640:640:0:80:black"]
+
+
+def test_buffer_ring_rotates():
+    ring = BufferRing(2)
+    first, second, third = (ring.next((4, 4, 3)) for _ in range(3))
+    assert first is third and first is not second
+    assert BufferRing(0).next((4, 4)) is not BufferRing(0).next((4, 4))
+
+
+def test_resizer_writes_into_reused_buffers():
+    frame = np.random.RandomState(0).randint(0, 256, (720, 1280, 3), dtype=np.uint8)
+    resizer = FrameResizer((320, 180), buffers=2)
+    outputs = [resizer(frame) for _ in range(3)]
+    assert outputs[0] is outputs[2]
+    assert outputs[0].shape == (180, 320, 3)
+
+    # The two-step downscale stays close to a single area pass
+    reference = cv2.resize(frame, (320, 180), interpolation=cv2.INTER_AREA)
+    assert np.abs(outputs[0].astype(int) - reference).mean() < 4
+
+    assert resizer(outputs[1]) is outputs[1]
+
+
+def test_letterbox_pads_with_black():
+    frame = np.full((240, 320, 3), 200, dtype=np.uint8)
+    boxed = FrameResizer((160, 160), 'letterbox', buffers=1)(frame)
+    assert boxed.shape == (160, 160, 3)
+    assert not boxed[:20].any() and not boxed[140:].any()
+    assert (boxed[20:140] == 200).all()
+
+    gray = FrameResizer((160, 160), 'fit', gray=True)(frame)
+    assert gray.shape == (120, 160)
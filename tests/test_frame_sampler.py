@@ -0,0 +1,98 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from cortalv2i.core.frame_sampler import FrameSampler, build_schedule, build_time_schedule
+
+
+class FakeCapture:
+    """Minimal VideoCapture stand-in that counts decode work"""
+
+    def __init__(self, total_frames, overshoot=0):
+        self.total_frames = total_frames
+        self.overshoot = overshoot
+        self.position = 0
+        self.grabs = 0
+        self.retrieves = 0
+        self.seeks = 0
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            # Like containers that land on the next keyframe instead of the requested frame
+            self.position = int(value) + (self.overshoot if value else 0)
+            self.seeks += 1
+
+    def grab(self):
+        if self.position >= self.total_frames:
+            return False
+        self.position += 1
+        self.grabs += 1
+        return True
+
+    def read(self):
+        if self.position >= self.total_frames:
+            return False, None
+        frame = np.full((2, 2, 3), self.position % 256, dtype=np.uint8)
+        self.position += 1
+        self.retrieves += 1
+        return True, frame
+
+
+def test_build_schedule():
+    assert list(build_schedule(0, 10, 3)) == [0, 3, 6, 9]
+    assert list(build_schedule(5, 12, 3, origin=0)) == [6, 9]
+    assert list(build_schedule(0, 3, 0)) == [0, 1, 2]
+
+
+def test_build_time_schedule():
+    assert list(build_time_schedule(10.0, 1.0, 0, 35)) == [10, 20, 30]
+
+
+def test_sampler_decodes_only_scheduled_frames():
+    cap = FakeCapture(100)
+    sampler = FrameSampler(cap, seek_cost=1000)
+    sampled = [(index, int(frame[0, 0, 0])) for index, frame in sampler.sample(range(0, 100, 30))]
+
+    assert sampled == [(0, 0), (30, 30), (60, 60), (90, 90)]
+    assert cap.retrieves == 4
+    assert cap.seeks == 0
+
+
+def test_sampler_seeks_across_large_gaps():
+    cap = FakeCapture(10000)
+    sampler = FrameSampler(cap, seek_cost=10)
+    indices = [index for index, _ in sampler.sample([0, 5, 5000])]
+
+    assert indices == [0, 5, 5000]
+    assert cap.seeks == 1
+    assert cap.grabs == 4
+
+
+def test_sampler_stops_at_end_of_stream():
+    cap = FakeCapture(10)
+    assert [index for index, _ in FrameSampler(cap).sample(range(0, 50, 4))] == [0, 4, 8]
+
+
+def test_sampler_walks_forward_when_a_seek_overshoots():
+    cap = FakeCapture(10000, overshoot=7)
+    sampler = FrameSampler(cap, seek_cost=10)
+    sampled = [(index, int(frame[0, 0, 0])) for index, frame in sampler.sample([0, 5000])]
+
+    assert sampled == [(0, 0), (5000, 5000 % 256)]
+    assert sampler.skipped == 0
+
+
+def test_sampler_skips_targets_it_cannot_reach():
+    cap = FakeCapture(100)
+    sampler = FrameSampler(cap)
+    cap.position = 50
+    sampler.position = 50
+    cap.set = lambda prop, value: None
+    assert [index for index, _ in sampler.sample([10, 60])] == [60]
+    assert sampler.skipped == 1
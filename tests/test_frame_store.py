@@ -0,0 +1,51 @@
+import json
+import os
+import tarfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cortalv2i.core.frame_store import TarShardWriter, TensorStoreWriter, open_tensor_store, read_tar_frame
+
+
+def test_tar_shards_are_size_bounded_and_indexed(tmp_path):
+    payloads = {index: bytes([index]) * (3000 + index) for index in range(10)}
+    with TarShardWriter(str(tmp_path), 'frames', 'jpg', shard_size_mb=8000 / (1024 * 1024)) as shards:
+        for index, data in payloads.items():
+            shards.add(data, index, index / 25.0)
+
+    assert len(shards.shards) > 1
+    assert all(os.path.exists(path) for path in shards.outputs)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+    with tarfile.open(shards.shards[0]) as tar:
+        assert tar.getnames()[0] == 'frame_000000.jpg'
+
+    index = json.loads((tmp_path / 'frames-index.json').read_text())
+    assert [sample['frame'] for sample in index['samples']] == list(range(10))
+    for frame_index, data in payloads.items():
+        assert read_tar_frame(str(tmp_path / 'frames-index.json'), frame_index) == data
+
+
+def test_tensor_store_round_trip(tmp_path):
+    frames = [np.full((4, 6, 3), value, dtype=np.uint8) for value in range(5)]
+    with TensorStoreWriter(str(tmp_path), 'chunk') as store:
+        for value, frame in enumerate(frames):
+            store.append(frame, value * 10, value * 0.4)
+
+    data, index = open_tensor_store(str(tmp_path / 'chunk.npy'))
+    assert isinstance(data, np.memmap)
+    assert data.shape == (5, 4, 6, 3)
+    assert (data[3] == 3).all()
+    assert index['frame'].tolist() == [0, 10, 20, 30, 40]
+    assert index['timestamp'][2] == pytest.approx(0.8)
+
+
+def test_tensor_store_rejects_mismatched_frames(tmp_path):
+    with pytest.raises(ValueError):
+        with TensorStoreWriter(str(tmp_path), 'chunk') as store:
+            store.append(np.zeros((4, 6, 3), dtype=np.uint8), 0)
+            store.append(np.zeros((4, 4, 3), dtype=np.uint8), 1)
+
+    assert os.listdir(tmp_path) == []
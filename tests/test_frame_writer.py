@@ -0,0 +1,47 @@
+import threading
+import time
+
+from cortalv2i.core.frame_writer import FrameWriterPipeline
+
+
+class FakeFrame:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+def test_pipeline_writes_every_frame():
+    written = []
+    lock = threading.Lock()
+
+    def write(frame, index):
+        with lock:
+            written.append(index)
+
+    with FrameWriterPipeline(write, max_workers=3) as pipeline:
+        for i in range(50):
+            pipeline.submit(FakeFrame(10), i)
+
+    assert sorted(written) == list(range(50))
+    assert pipeline.frames_written == 50
+
+
+def test_pipeline_respects_memory_budget():
+    mb = 1024 * 1024
+
+    def slow_write(frame):
+        time.sleep(0.005)
+
+    with FrameWriterPipeline(slow_write, max_workers=2, memory_budget_mb=3) as pipeline:
+        for _ in range(20):
+            pipeline.submit(FakeFrame(mb))
+
+    assert pipeline.frames_written == 20
+    assert pipeline.peak_bytes <= 3 * mb
+
+
+def test_pipeline_admits_oversized_frame():
+    with FrameWriterPipeline(lambda frame: None, memory_budget_mb=1) as pipeline:
+        pipeline.submit(FakeFrame(8 * 1024 * 1024))
+        pipeline.submit(FakeFrame(8 * 1024 * 1024))
+
+    assert pipeline.frames_written == 2
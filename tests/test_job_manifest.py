@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+from cortalv2i.utils.dir_manager import DirectoryManager
+from cortalv2i.utils.job_manifest import JobManifest
+from cortalv2i.utils.utils import atomic_write, partial_path, partial_path_owner
+
+CONFIG = {'frames': {'method': 'fps', 'params': {'fps': 1}}}
+
+
+def make_job(tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+    output = tmp_path / "frame_000000.jpg"
+    output.write_bytes(b"jpg")
+    return str(source), str(output), str(tmp_path / "manifest.json")
+
+
+def test_completed_chunks_survive_restart(tmp_path):
+    source, output, manifest_path = make_job(tmp_path)
+    JobManifest(manifest_path, source, CONFIG).mark_done('frames', (0, 100), [output])
+
+    manifest = JobManifest(manifest_path, source, CONFIG)
+    assert manifest.is_done('frames', (0, 100))
+    assert manifest.pending('frames', [(0, 100), (100, 200)]) == [(100, 200)]
+
+
+def test_chunk_with_missing_output_is_redone(tmp_path):
+    source, output, manifest_path = make_job(tmp_path)
+    JobManifest(manifest_path, source, CONFIG).mark_done('frames', (0, 100), [output])
+    os.remove(output)
+
+    assert not JobManifest(manifest_path, source, CONFIG).is_done('frames', (0, 100))
+
+
+def test_changed_options_discard_manifest(tmp_path):
+    source, output, manifest_path = make_job(tmp_path)
+    JobManifest(manifest_path, source, CONFIG).mark_done('frames', (0, 100), [output])
+
+    other = {'frames': {'method': 'fps', 'params': {'fps': 2}}}
+    assert not JobManifest(manifest_path, source, other).is_done('frames', (0, 100))
+
+
+def test_execution_options_do_not_invalidate(tmp_path):
+    source, output, manifest_path = make_job(tmp_path)
+    JobManifest(manifest_path, source, CONFIG).mark_done('audio', (0, 12.5), [output])
+
+    resumed = dict(CONFIG, execution={'backend': 'thread'})
+    assert JobManifest(manifest_path, source, resumed).is_done('audio', (0, 12.5))
+
+
+def test_chunk_plan_is_reused_on_resume(tmp_path):
+    source, output, manifest_path = make_job(tmp_path)
+    plan = JobManifest(manifest_path, source, CONFIG).plan('frames', lambda: [(0, 120), (120, 250)])
+    assert plan == [(0, 120), (120, 250)]
+
+    # A resumed run with more workers would plan differently
+    resumed = JobManifest(manifest_path, source, dict(CONFIG, execution={'workers': 8}))
+    assert resumed.plan('frames', lambda: [(0, 50), (50, 250)]) == plan
+
+    resumed.reset()
+    assert resumed.plan('frames', lambda: [(0, 250)]) == [(0, 250)]
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write(path, json.dumps({'a': 1}).encode())
+
+    assert os.listdir(str(tmp_path)) == ["data.json"]
+    with open(path) as f:
+        assert json.load(f) == {'a': 1}
+
+
+def test_only_partial_files_of_finished_runs_are_removed(tmp_path):
+    finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+    finished.wait()
+    live = os.path.basename(partial_path(str(tmp_path / "frame_000001.jpg")))
+    dead = f".frame_000002.jpg.{finished.pid}.tmp"
+    for name in (live, dead, ".notes.tmp"):
+        (tmp_path / name).write_bytes(b"partial")
+
+    assert partial_path_owner(live) == os.getpid() and partial_path_owner(".notes.tmp") is None
+    DirectoryManager().remove_partial_files({'frames': str(tmp_path)})
+    assert sorted(os.listdir(str(tmp_path))) == sorted([live, ".notes.tmp"])
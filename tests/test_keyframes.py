@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cortalv2i.core.decoders import open_decoder
+from cortalv2i.core.frame_store import INDEX_DTYPE
+from cortalv2i.core.video_processor import VideoProcessor
+from cortalv2i.utils.media_probe import probe_keyframes
+
+pytestmark = pytest.mark.ffmpeg
+
+
+@pytest.fixture(scope="module")
+def clip(make_clip):
+    """Ten seconds at 25 fps with a keyframe at most every 2 s and B-frames in between"""
+    return make_clip("gop.mp4", 10, size='320x240', video_args=['-q:v', '3', '-g', '50', '-bf', '2'], audio=None)
+
+
+def test_keyframe_index_from_packets(clip):
+    index = probe_keyframes(clip)
+    assert index.frame_count == 250
+    assert len(index.frames) >= 4 and index.frames[0] == 0
+    # Frame numbers follow presentation order although B-frames are stored out of order
+    assert list(index.frames) == [round(timestamp * 25) for timestamp in index.timestamps]
+    assert index.between(index.frames[1], index.frames[3]) == list(zip(index.frames[1:3], index.timestamps[1:3]))
+
+
+def test_keyframes_match_a_full_decode(clip):
+    expected = list(probe_keyframes(clip).frames[1:])
+    decoder = open_decoder(clip, 'ffmpeg-pipe')
+    keyframes = {index: frame.copy() for index, frame in decoder.keyframes(1)}
+    assert sorted(keyframes) == expected
+
+    for index, frame in decoder.read(expected):
+        assert np.array_equal(frame, keyframes[index])
+
+
+def test_video_processor_tags_keyframes_with_timestamps(clip, tmp_path):
+    index = probe_keyframes(clip)
+    start = index.frames[1] - 5
+    expected = index.between(start, 250)
+
+    processor = VideoProcessor(frames_dir=str(tmp_path))
+    written = processor.extract_frames(clip, start, 250, {'method': 'keyframes', 'output_format': 'jpg'})
+
+    assert sorted(os.path.basename(path) for path in written) == [f"frame_{frame:06d}.jpg" for frame, _ in expected]
+    listing = json.loads((tmp_path / f"frames_{start:06d}-keyframes.json").read_text())
+    assert [(entry['frame'], entry['timestamp'], entry['file']) for entry in listing['frames']] == [
+        (frame, timestamp, f"frame_{frame:06d}.jpg") for frame, timestamp in expected]
+
+    store_dir = tmp_path / "npy"
+    store_dir.mkdir()
+    written = VideoProcessor(frames_dir=str(store_dir)).extract_frames(
+        clip, 0, 250, {'method': 'keyframes', 'output_mode': 'npy', 'resolution': '160*120'})
+    tensor = np.load(written[0])
+    rows = np.load(written[1])
+    assert rows.dtype == INDEX_DTYPE
+    assert tensor.shape == (len(index.frames), 120, 160, 3)
+    assert list(rows['frame']) == list(index.frames)
+    assert list(rows['timestamp']) == pytest.approx(index.timestamps)
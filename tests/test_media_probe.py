@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from cortalv2i.utils import media_probe
+from cortalv2i.utils.media_probe import MediaInfo, ProbeCache
+
+FFPROBE_OUTPUT = {
+    'format': {'duration': '10.0', 'format_name': 'mov,mp4'},
+    'streams': [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264', 'width': 640, 'height': 360,
+         'avg_frame_rate': '25/1', 'nb_frames': '250'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channels': 2},
+    ]
+}
+
+
+@pytest.fixture
+def probe_calls(monkeypatch):
+    calls = []
+
+    def fake_ffprobe(path):
+        calls.append(path)
+        return FFPROBE_OUTPUT
+
+    monkeypatch.setattr(media_probe, '_run_ffprobe', fake_ffprobe)
+    return calls
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"fake")
+    return str(path)
+
+
+def test_probe_parses_metadata(probe_calls, video_file):
+    info = ProbeCache(cache_dir='').get(video_file)
+
+    assert (info.duration, info.fps, info.frame_count) == (10.0, 25.0, 250)
+    assert (info.width, info.height) == (640, 360)
+    assert (info.video_codec, info.audio_codec) == ('h264', 'aac')
+    assert info.has_audio
+    assert info.streams[1].sample_rate == 48000
+
+
+def test_memory_cache_avoids_reprobing(probe_calls, video_file):
+    cache = ProbeCache(cache_dir='')
+    cache.get(video_file)
+    cache.get(video_file)
+
+    assert len(probe_calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_cache_shared_between_instances(probe_calls, video_file, tmp_path):
+    first = ProbeCache(cache_dir=str(tmp_path / "cache")).get(video_file)
+    second = ProbeCache(cache_dir=str(tmp_path / "cache")).get(video_file)
+
+    assert len(probe_calls) == 1
+    assert second == first
+
+
+def test_modified_file_is_probed_again(probe_calls, video_file, tmp_path):
+    cache = ProbeCache(cache_dir=str(tmp_path / "cache"))
+    cache.get(video_file)
+    with open(video_file, 'ab') as f:
+        f.write(b"more")
+    cache.get(video_file)
+
+    assert len(probe_calls) == 2
+
+
+def test_lru_eviction(probe_calls, tmp_path):
+    cache = ProbeCache(cache_dir='', max_memory_entries=2)
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.mp4"
+        path.write_bytes(b"x")
+        paths.append(str(path))
+        cache.get(str(path))
+    cache.get(paths[0])
+
+    assert len(probe_calls) == 4
+
+
+def test_media_info_round_trip():
+    info = MediaInfo(
+        path='a.mp4', duration=1.0, fps=30.0, frame_count=30, width=2, height=2)
+    assert MediaInfo.from_dict(info.to_dict()) == info
+
+
+def test_suite_cache_stays_out_of_home(isolated_cache_dir):
+    assert media_probe.get_probe_cache().db_path == os.path.join(isolated_cache_dir, 'probe.sqlite3')
+    assert not media_probe.get_probe_cache().db_path.startswith(media_probe.DEFAULT_CACHE_DIR)
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from cortalv2i.utils.job_manifest import config_fingerprint
+from cortalv2i.utils.metrics import BUCKETS, Metrics
+
+
+def test_disabled_registry_is_a_no_op():
+    metrics = Metrics()
+    items = [1, 2, 3]
+    assert metrics.timed('decode', items) is items
+    assert metrics.time('encode') is metrics.time('write')
+    with metrics.time('encode'):
+        pass
+    metrics.count('frames_written')
+    assert metrics.snapshot() == {'counters': {}, 'stages': {}}
+
+
+def test_counters_histograms_and_merge():
+    worker = Metrics(enabled=True)
+    worker.count('frames_written', 3)
+    worker.observe('encode', 0.002)
+    worker.observe('encode', 0.2)
+    assert list(worker.timed('decode', iter('ab'))) == ['a', 'b']
+
+    snapshot = worker.snapshot()
+    assert snapshot['stages']['encode']['count'] == 2
+    assert snapshot['stages']['encode']['sum'] == pytest.approx(0.202)
+    assert snapshot['stages']['decode']['count'] == 2
+    assert len(snapshot['stages']['encode']['buckets']) == len(BUCKETS) + 1
+
+    run = Metrics(enabled=True, traces=True)
+    run.merge(snapshot)
+    run.merge(snapshot)
+    run.add_trace('frames:a.mp4:0', 1.5, snapshot, kind='frames')
+    report = run.report()
+    assert report['counters']['frames_written'] == 6
+    assert report['stages']['encode']['count'] == 4
+    assert report['stages']['encode']['mean'] == pytest.approx(0.101)
+    assert report['traces'][0]['stages']['encode'] == pytest.approx(0.202)
+    json.dumps(report)
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = Metrics(enabled=True)
+    metrics.count('frames_written', 2)
+    metrics.observe('write', 0.003)
+    metrics.observe('write', 100.0)
+    text = metrics.to_prometheus()
+
+    assert 'cortalv2i_frames_written_total 2' in text
+    assert 'cortalv2i_stage_seconds_bucket{stage="write",le="0.0025"} 0' in text
+    assert 'cortalv2i_stage_seconds_bucket{stage="write",le="0.005"} 1' in text
+    assert 'cortalv2i_stage_seconds_bucket{stage="write",le="30.0"} 1' in text
+    assert 'cortalv2i_stage_seconds_bucket{stage="write",le="+Inf"} 2' in text
+    assert 'cortalv2i_stage_seconds_count{stage="write"} 2' in text
+
+
+def test_metrics_options_do_not_change_the_fingerprint():
+    config = {'frames': {'method': 'fps'}}
+    assert config_fingerprint(config) == config_fingerprint(dict(config, metrics={'json': 'run.json'}))
+
+
+def test_video_processor_records_stages(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    from cortalv2i.core.video_processor import VideoProcessor
+
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120))
+    for i in range(20):
+        writer.write(np.full((120, 160, 3), i * 10, dtype=np.uint8))
+    writer.release()
+
+    (tmp_path / "frames").mkdir()
+    metrics = Metrics(enabled=True)
+    processor = VideoProcessor(frames_dir=str(tmp_path / "frames"), metrics=metrics)
+    outputs = processor.extract_frames(path, 0, 20, {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg'})
+
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['frames_written'] == len(outputs) > 0
+    assert snapshot['counters']['bytes_written'] > 0
+    for stage in ('decode', 'encode', 'write'):
+        assert snapshot['stages'][stage]['count'] > 0
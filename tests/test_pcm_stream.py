@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cortalv2i.core.pcm_stream import PCMStream, time_ranges
+from cortalv2i.core.video_processor import VideoProcessor
+
+pytestmark = pytest.mark.ffmpeg
+
+
+@pytest.fixture(scope="module")
+def clip(make_clip):
+    """Four seconds of test pattern with an uncompressed 440 Hz tone at 16 kHz"""
+    return make_clip("tone.mkv", 4, audio='pcm_s16le', sample_rate=16000)
+
+
+def test_time_ranges():
+    assert time_ranges(10.0, 4.0) == [(0.0, 4.0), (4.0, 8.0), (8.0, 10.0)]
+    assert time_ranges(0.0, 4.0) == []
+
+
+def test_fixed_size_blocks(clip):
+    blocks = list(PCMStream(clip, block_size=6000))
+    assert [offset for offset, _ in blocks] == list(range(0, 64000, 6000))
+    assert all(block.shape == (6000, 1) and block.dtype == np.float32 for _, block in blocks[:-1])
+    assert blocks[-1][1].shape == (4000, 1)
+    # A 440 Hz tone at ffmpeg's default amplitude of 1/8
+    assert np.abs(blocks[0][1]).max() == pytest.approx(0.125, abs=0.01)
+
+    padded = list(PCMStream(clip, block_size=6000, pad=True, channels=2, dtype='int16'))
+    assert padded[-1][1].shape == (6000, 2) and padded[-1][1].dtype == np.int16
+    assert not padded[-1][1][4000:].any()
+
+
+def test_time_ranges_line_up(clip):
+    whole = PCMStream(clip, dtype='int16').read()
+    streams = [PCMStream(clip, dtype='int16', start_time=start, end_time=end) for start, end in time_ranges(4.0, 1.5)]
+    assert [stream.first_sample for stream in streams] == [0, 24000, 48000]
+    assert np.array_equal(np.concatenate([stream.read() for stream in streams]), whole)
+
+
+def test_streams_next_to_frame_extraction(clip, tmp_path):
+    samples = []
+    consumer = threading.Thread(target=lambda: samples.extend(block for _, block in PCMStream(clip, block_size=800)))
+    consumer.start()
+    written = VideoProcessor(frames_dir=str(tmp_path)).extract_frames(
+        clip, 0, 100, {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg'})
+    consumer.join()
+    assert len(written) == 20
+    assert sum(len(block) for block in samples) == 64000
+
+
+def test_rejects_bad_arguments(clip, make_clip):
+    with pytest.raises(ValueError):
+        PCMStream(clip, dtype='uint8')
+    with pytest.raises(ValueError):
+        PCMStream(make_clip("silent.mp4", 1, size='64x48', audio=None))
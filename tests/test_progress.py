@@ -0,0 +1,90 @@
+import queue
+import time
+
+import pytest
+
+pytest.importorskip("tqdm")
+
+from cortalv2i.core.chunk_executor import ChunkExecutor
+from cortalv2i.core.progress import ProgressBus, report_progress, throttle
+
+
+def drain(progress_queue):
+    messages = []
+    while not progress_queue.empty():
+        messages.append(progress_queue.get())
+    return messages
+
+
+def test_report_progress_is_throttled_per_chunk():
+    progress_queue = queue.Queue()
+    chunk = {'index': 7, 'progress_queue': progress_queue}
+    for step in range(1000):
+        report_progress(chunk, step / 1000)
+    report_progress(chunk, 1.0)
+
+    messages = drain(progress_queue)
+    assert messages[0] == (7, 0.0)
+    assert messages[-1] == (7, 1.0)
+    assert len(messages) < 10
+
+
+def test_throttle_always_passes_the_final_update():
+    seen = []
+    callback = throttle(seen.append, interval=60)
+    for progress in (0.1, 0.2, 0.3, 1.0):
+        callback(progress)
+    assert seen == [0.1, 1.0]
+    assert throttle(None) is None
+
+
+def test_bus_aggregates_weighted_progress_per_source():
+    progress_queue = queue.Queue()
+    chunks = [{'index': 1, 'source': 'a'}, {'index': 2, 'source': 'a'}, {'index': 3, 'source': 'b'}]
+    bus = ProgressBus(chunks, progress_queue, weights=[1, 1, 2], interval=0.01)
+    updates = []
+    bus.subscribe(updates.append)
+    bus.start()
+
+    progress_queue.put((1, 0.5))
+    progress_queue.put((3, 0.5))
+    time.sleep(0.1)
+    bus.complete(2)
+    bus.stop()
+
+    assert len(updates) >= 2
+    final = updates[-1]
+    assert final.final
+    assert final.completed == 1 and final.total == 3
+    assert final.overall == pytest.approx(0.5 * 0.25 + 0.25 + 0.5 * 0.5)
+    assert final.sources == pytest.approx({'a': 0.75, 'b': 0.5})
+    assert not any(update.final for update in updates[:-1])
+
+
+def test_bus_publishes_at_most_once_per_interval():
+    progress_queue = queue.Queue()
+    bus = ProgressBus([{'index': 1}], progress_queue, interval=0.2)
+    updates = []
+    bus.subscribe(updates.append)
+    bus.start()
+    for step in range(200):
+        progress_queue.put((1, step / 200))
+    bus.stop()
+    assert len(updates) <= 2
+    assert updates[-1].chunks[1] == pytest.approx(199 / 200)
+
+
+def slow_chunk(chunk_info):
+    for step in range(20):
+        report_progress(chunk_info, step / 20)
+    return True
+
+
+def test_executor_streams_updates_to_consumers():
+    executor = ChunkExecutor(backend='thread', max_workers=2, progress_interval=0.01, show_progress=False)
+    updates = []
+    chunks = [{'index': i + 1, 'total': 3} for i in range(3)]
+    assert executor.run(slow_chunk, chunks, on_progress=updates.append) == [True] * 3
+    assert updates[-1].final
+    assert updates[-1].overall == pytest.approx(1.0)
+    assert updates[-1].completed == 3
@@ -0,0 +1,123 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from cortalv2i.core.scene_detector import SceneDetector
+from cortalv2i.core.video_processor import VideoProcessor
+
+CUTS = [30, 60, 90]
+
+
+def contour_changes(video_path, threshold, min_area=500):
+    """Reference: the original full-resolution contour-based change detection"""
+    cap = cv2.VideoCapture(video_path)
+    prev, index, changes = None, 0, []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if prev is not None:
+            delta = cv2.absdiff(prev, gray)
+            thresh = cv2.dilate(cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)[1], None, iterations=2)
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            area = sum(cv2.contourArea(c) for c in contours)
+            if area / (gray.shape[0] * gray.shape[1]) >= threshold and area >= min_area:
+                changes.append(index)
+        prev = gray
+        index += 1
+    cap.release()
+    return changes
+
+
+@pytest.fixture(scope="module")
+def cut_video(tmp_path_factory):
+    """Synthetic clip: four flat scenes with a small moving square, cut every 30 frames"""
+    path = str(tmp_path_factory.mktemp("scene") / "cuts.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (640, 360))
+    colors = [(40, 40, 40), (200, 60, 60), (60, 200, 60), (230, 230, 230)]
+    for i in range(120):
+        frame = np.full((360, 640, 3), colors[i // 30], dtype=np.uint8)
+        x = 20 + 3 * (i % 30)
+        cv2.rectangle(frame, (x, 150), (x + 20, 170), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_detects_synthetic_cuts(cut_video):
+    cap = cv2.VideoCapture(cut_video)
+    assert SceneDetector(threshold=0.1, batch_size=16).detect(cap) == CUTS
+    cap.release()
+
+
+def test_matches_contour_detection(cut_video):
+    cap = cv2.VideoCapture(cut_video)
+    assert SceneDetector(threshold=0.1).detect(cap) == contour_changes(cut_video, 0.1)
+    cap.release()
+
+
+def write_clip(path, render, count=60):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (640, 360))
+    for i in range(count):
+        writer.write(render(i))
+    writer.release()
+    return path
+
+
+def test_local_motion_matches_contour_detection(tmp_path):
+    def moving_square(i):
+        frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+        x, size = (i * 12) % 560, 40 + (i // 20) * 40
+        cv2.rectangle(frame, (x, 100), (x + size, 100 + size), (230, 230, 230), -1)
+        return frame
+
+    path = write_clip(str(tmp_path / "square.avi"), moving_square)
+    for threshold in (0.005, 0.02, 0.05):
+        assert SceneDetector(threshold=threshold).detect(path) == contour_changes(path, threshold)
+
+
+def test_thin_changes_are_not_inflated_like_contours(tmp_path):
+    def wipe(i):
+        frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+        frame[:, :min(640, i * 11)] = 200
+        return frame
+
+    # Each frame brightens an 11 px band, which the dilated contours widen by a few pixels
+    path = write_clip(str(tmp_path / "wipe.avi"), wipe)
+    kept, baseline = SceneDetector(threshold=0.02, min_area=50).detect(path), contour_changes(path, 0.02, 50)
+    assert set(kept) < set(baseline)
+    assert SceneDetector(threshold=0.01, min_area=50).detect(path) == contour_changes(path, 0.01, 50)
+
+
+def test_detect_within_range_uses_previous_frame_as_reference(cut_video):
+    cap = cv2.VideoCapture(cut_video)
+    assert SceneDetector(threshold=0.1, batch_size=4).detect(cap, 60, 100) == [60, 90]
+    cap.release()
+
+
+def test_detect_can_include_the_first_frame(cut_video):
+    detector = SceneDetector(threshold=0.1, batch_size=4)
+    assert detector.detect(cut_video, include_start=True) == [0] + CUTS
+    assert detector.detect(cut_video, 60, 100, include_start=True) == [60, 90]
+    assert detector.detect(cut_video, 65, 85, include_start=True) == [65]
+    assert detector.detect(cut_video, 200, 210, include_start=True) == []
+
+
+def test_scene_method_keeps_the_opening_frame(cut_video, tmp_path):
+    processor = VideoProcessor(frames_dir=str(tmp_path))
+    config = {'method': 'scene', 'params': {'threshold': 0.1}, 'output_format': 'jpg'}
+    assert len(processor.extract_frames(cut_video, 0, 120, config)) == 4
+    # No cut inside the range: still one frame for the scene it falls in
+    assert len(processor.extract_frames(cut_video, 35, 55, config)) == 1
+
+    progress = []
+    assert processor.extract_frames(cut_video, 50, 50, config, progress.append) == []
+    assert progress and all(value == 1.0 for value in progress)
+
+
+def test_score_frames():
+    frames = np.zeros((3, 4, 4), dtype=np.uint8)
+    frames[2, :2] = 255
+    assert SceneDetector().score_frames(frames).tolist() == [0.0, 0.5]
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from cortalv2i.core.frame_extractor import FPSFrameExtractor
+from cortalv2i.core.shm_encoder import SharedMemoryEncoderPool
+
+
+def make_frames(count, shape=(48, 64, 3)):
+    return [np.full(shape, 10 * i, dtype=np.uint8) for i in range(count)]
+
+
+def test_encoded_bytes_come_back_through_callback():
+    results = {}
+    frames = make_frames(6)
+    with SharedMemoryEncoderPool(max_workers=2, on_encoded=lambda data, path, i: results.update({i: data})) as pool:
+        for i, frame in enumerate(frames):
+            pool.submit(frame, '.png', [], None, i)
+
+    assert sorted(results) == list(range(6))
+    for i, frame in enumerate(frames):
+        decoded = cv2.imdecode(np.frombuffer(results[i], dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert np.array_equal(decoded, frame)
+
+
+def test_single_slot_recycles_with_backpressure(tmp_path):
+    paths = [str(tmp_path / f"frame_{i:06d}.jpg") for i in range(8)]
+    with SharedMemoryEncoderPool(max_workers=2, slots=1) as pool:
+        for frame, path in zip(make_frames(8), paths):
+            pool.submit(frame, '.jpg', [cv2.IMWRITE_JPEG_QUALITY, 95], path)
+
+    assert pool.frames_written == 8
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_oversized_frame_rejected():
+    with SharedMemoryEncoderPool(max_workers=1) as pool:
+        pool.submit(np.zeros((8, 8, 3), dtype=np.uint8), '.png', [], None)
+        with pytest.raises(ValueError):
+            pool.submit(np.zeros((16, 16, 3), dtype=np.uint8), '.png', [], None)
+
+
+def test_failures_are_not_counted_as_written(tmp_path):
+    def on_encoded(data, path, i):
+        if i == 1:
+            raise IOError("disk full")
+
+    with SharedMemoryEncoderPool(max_workers=1, on_encoded=on_encoded) as pool:
+        pool.submit(make_frames(1)[0], '.png', [], str(tmp_path / "missing" / "frame.png"), 0)
+        for i, frame in enumerate(make_frames(3)[1:], start=1):
+            pool.submit(frame, '.png', [], None, i)
+
+    assert pool.failures == 2
+    assert pool.frames_written == 1
+
+
+def test_extractor_counts_only_frames_the_pool_wrote(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for frame in make_frames(20):
+        writer.write(frame)
+    writer.release()
+
+    (tmp_path / "frames").mkdir()
+    extractor = FPSFrameExtractor(str(tmp_path / "frames"), 5, encoder='processes', encoder_workers=1)
+    assert extractor.extract_frames(path) == 10
+    # The output directory does not exist, so every write fails in the encoder process
+    failing = FPSFrameExtractor(str(tmp_path / "missing"), 5, encoder='processes', encoder_workers=1)
+    assert failing.extract_frames(path) == 0
+    assert failing.frames_failed == 10
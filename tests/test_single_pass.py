@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cortalv2i.core.decoders import open_decoder
+from cortalv2i.core.video_processor import VideoProcessor
+from cortalv2i.utils.media_probe import probe_media
+
+pytestmark = pytest.mark.ffmpeg
+
+
+@pytest.fixture(scope="module")
+def clip(make_clip):
+    """Six seconds at 25 fps with a sine tone"""
+    return make_clip("tone.mp4", 6)
+
+
+def duration(path):
+    return probe_media(path).duration
+
+
+def test_attached_outputs_share_the_decode(clip, tmp_path):
+    expected = {index: frame.copy() for index, frame in open_decoder(clip, 'ffmpeg-pipe').read(range(0, 150, 25))}
+
+    audio = str(tmp_path / "tone.wav")
+    decoder = open_decoder(clip, 'ffmpeg-pipe')
+    decoder.attach_outputs(['-vn', '-c:a', 'pcm_s16le', audio])
+    frames = {index: frame.copy() for index, frame in decoder.read(range(0, 150, 25))}
+
+    assert sorted(frames) == sorted(expected)
+    assert all(np.array_equal(frames[index], expected[index]) for index in frames)
+    # The audio runs to the end of the input, past the last frame read
+    assert duration(audio) == pytest.approx(6.0, abs=0.1)
+
+    # Outputs no decode picked up are written by finish_outputs
+    other = str(tmp_path / "other.wav")
+    decoder.attach_outputs(['-vn', '-c:a', 'pcm_s16le', other])
+    assert list(decoder.read([])) == []
+    decoder.finish_outputs()
+    assert duration(other) == pytest.approx(6.0, abs=0.1)
+
+
+def test_attached_outputs_start_at_the_beginning(clip, tmp_path):
+    decoder = open_decoder(clip, 'ffmpeg-pipe')
+    keyframes = [index for index, _ in decoder.keyframe_index.between(1)]
+    expected = {index: frame.copy() for index, frame in decoder.keyframes(1)}
+    seeked = {index: frame.copy() for index, frame in decoder.read(range(40, 150, 25))}
+
+    audio = [str(tmp_path / "keyframes.wav"), str(tmp_path / "read.wav")]
+    decoder.attach_outputs(['-vn', '-c:a', 'pcm_s16le', audio[0]])
+    frames = {index: frame.copy() for index, frame in decoder.keyframes(1)}
+    decoder.attach_outputs(['-vn', '-c:a', 'pcm_s16le', audio[1]])
+    read = {index: frame.copy() for index, frame in decoder.read(range(40, 150, 25))}
+
+    assert keyframes and sorted(frames) == keyframes
+    assert all(np.array_equal(frames[index], expected[index]) for index in frames)
+    assert sorted(read) == list(range(40, 150, 25))
+    assert all(np.array_equal(read[index], seeked[index]) for index in read)
+    assert all(duration(path) == pytest.approx(6.0, abs=0.1) for path in audio)
+
+
+def test_frames_and_audio_in_one_pass(clip, tmp_path):
+    config = {'method': 'fps', 'params': {'fps': 2}, 'output_format': 'jpg'}
+    frames_dir, audio_dir = tmp_path / "frames", tmp_path / "audio"
+    frames_dir.mkdir()
+    audio_dir.mkdir()
+
+    processor = VideoProcessor(frames_dir=str(frames_dir), audio_dir=str(audio_dir))
+    frames, audio = processor.extract_frames_and_audio(clip, 150, config, {'format': 'mp3'}, chunk_duration=2.5)
+
+    assert sorted(os.path.basename(path) for path in frames) == [f"frame_{index:06d}.jpg" for index in range(0, 150, 12)]
+    assert [os.path.basename(path) for path in audio] == ['tone_chunk1.mp3', 'tone_chunk2.mp3', 'tone_chunk3.mp3']
+    assert sum(duration(path) for path in audio) == pytest.approx(6.0, abs=0.2)
+
+    with pytest.raises(ValueError):
+        processor.extract_frames(clip, 25, 150, config, outputs=['-vn', str(tmp_path / "late.wav")])
@@ -0,0 +1,130 @@
+import json
+import os
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cortalv2i.utils import ffmpeg_capabilities
+from cortalv2i.utils.ffmpeg_capabilities import detect_ffmpeg
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds a CLI may take on top of a bare interpreter start. Importing OpenCV
+# and NumPy alone costs about 0.2 s, so this fails if they are loaded eagerly
+STARTUP_BUDGET_S = 0.15
+
+HEAVY_MODULES = ('cv2', 'numpy', 'yaml', 'tqdm', 'ffmpeg', 'asyncio')
+
+
+def run_python(*args, env=None):
+    return subprocess.run([sys.executable] + list(args), cwd=PACKAGE_ROOT, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def best_time(*args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_python(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def test_entry_points_do_not_import_heavy_modules():
+    output = run_python('-c', (
+        "import json, sys\n"
+        "import cortalv2i.main, cortalv2i.cli.commands\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )).stdout
+    assert json.loads(output) == []
+
+
+@pytest.mark.parametrize("module", ["cortalv2i.main", "cortalv2i.extract_frames", "cortalv2i.extract_audio"])
+def test_cli_startup_budget(module):
+    baseline = best_time('-c', 'pass')
+    startup = best_time('-m', module, '--help')
+    assert startup - baseline < STARTUP_BUDGET_S, f"{module} took {startup - baseline:.3f}s over the interpreter"
+
+
+def test_extract_frames_leaves_the_decoder_to_the_processor():
+    from cortalv2i.cli.commands import extract_frames_parser
+    assert extract_frames_parser().parse_args(['https://example.com/talk.mp4', 'out']).decoder is None
+
+
+def test_extract_frames_choices_match_the_backends():
+    pytest.importorskip("cv2")
+    from cortalv2i.cli.commands import extract_frames_parser
+    from cortalv2i.core.decoders import DECODERS
+    from cortalv2i.core.frame_resize import RESIZE_MODES
+    from cortalv2i.core.frame_store import OUTPUT_MODES
+    from cortalv2i.core.shm_encoder import ENCODERS
+
+    choices = {action.dest: action.choices for action in extract_frames_parser()._actions}
+    assert tuple(choices['decoder']) == DECODERS
+    assert tuple(choices['resize_mode']) == RESIZE_MODES
+    assert tuple(choices['output_mode']) == OUTPUT_MODES
+    assert tuple(choices['encoder']) == ENCODERS
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """An `ffmpeg` on PATH that logs each run and prints canned output"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "runs.log"
+    script = bin_dir / "ffmpeg"
+    script.write_text(
+        "#!/bin/sh\n"
+        f"echo run >> '{log}'\n"
+        "case \"$2\" in\n"
+        "  -version) echo 'ffmpeg version 6.1-test Copyright (c) the FFmpeg developers' ;;\n"
+        "  *) printf ' A..... = Audio\\n ------\\n A..... aac  AAC\\n A..... pcm_s16le  PCM\\n' ;;\n"
+        "esac\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', str(bin_dir))
+    return script, log
+
+
+def runs(log):
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="uses a shell script as ffmpeg")
+def test_capabilities_are_cached_on_disk(fake_ffmpeg, tmp_path, monkeypatch):
+    script, log = fake_ffmpeg
+    cache_dir = str(tmp_path / "cache")
+
+    capabilities = detect_ffmpeg(cache_dir)
+    assert capabilities.available
+    assert capabilities.version == '6.1-test'
+    assert capabilities.has_encoder('aac') and not capabilities.has_encoder('libmp3lame')
+    assert capabilities.ffprobe is None
+    first_runs = runs(log)
+    assert first_runs == 3
+
+    # A new process (simulated by clearing the memo) reads the disk cache
+    monkeypatch.setattr(ffmpeg_capabilities, '_detected', None)
+    assert detect_ffmpeg(cache_dir) == capabilities
+    assert runs(log) == first_runs
+
+    # Replacing the binary invalidates the entry
+    monkeypatch.setattr(ffmpeg_capabilities, '_detected', None)
+    script.write_text(script.read_text().replace('6.1-test', '7.0.1-test'))
+    assert detect_ffmpeg(cache_dir).version == '7.0.1-test'
+    assert runs(log) == 2 * first_runs
+
+
+def test_missing_ffmpeg_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    capabilities = detect_ffmpeg('')
+    assert not capabilities.available
+    assert not capabilities.has_encoder('aac')
+
+
+def test_capabilities_are_not_shared_between_tests():
+    assert ffmpeg_capabilities._detected is None
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cortalv2i.core import decoders
+from cortalv2i.core.decoders import FFmpegPipeDecoder, StreamDecoder, default_decoder
+from cortalv2i.core.stream_ingest import HTTPStream, ReadAheadBuffer
+from cortalv2i.core.video_processor import VideoProcessor
+
+class MediaHandler(SimpleHTTPRequestHandler):
+    """Static files with single-range support, sent in small pieces.
+
+    `sent` maps each path to the bytes written so far. Paths in `delays` wait
+    that many seconds between pieces; a path listed in `drop_once` loses its
+    connection halfway through the first response.
+    """
+
+    sent = {}
+    delays = {'/slow.mp4': 0.02}
+    drop_once = set()
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        size = os.path.getsize(path)
+        start = 0
+        header = self.headers.get('Range')
+        if header and header.startswith('bytes='):
+            start = int(header[len('bytes='):].split('-')[0])
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(size - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        f = open(path, 'rb')
+        f.seek(start)
+        return f
+
+    def copyfile(self, source, outputfile):
+        name = self.path
+        limit = None
+        if name in self.drop_once:
+            self.drop_once.discard(name)
+            limit = os.path.getsize(self.translate_path(name)) // 2
+        written = 0
+        while True:
+            data = source.read(8192)
+            if not data:
+                break
+            if limit is not None and written + len(data) > limit:
+                self.close_connection = True
+                return
+            outputfile.write(data)
+            written += len(data)
+            self.sent[name] = self.sent.get(name, 0) + len(data)
+            if name in self.delays:
+                time.sleep(self.delays[name])
+
+
+@pytest.fixture(scope="module")
+def media_dir(tmp_path_factory, make_clip):
+    directory = tmp_path_factory.mktemp("media")
+    for name, seconds, flags in (('faststart.mp4', 8, ['-movflags', '+faststart']),
+                                 ('moov_last.mp4', 8, []),
+                                 ('slow.mp4', 30, ['-movflags', '+faststart'])):
+        make_clip(name, seconds, size='320x240', video_args=['-q:v', '2', '-g', '25'] + flags, audio=None,
+                  directory=directory)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def server(media_dir):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), partial(MediaHandler, directory=str(media_dir)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_read_ahead_buffer_is_bounded():
+    buffer = ReadAheadBuffer(10)
+    writer = threading.Thread(target=lambda: (buffer.write(bytes(range(100))), buffer.finish()))
+    writer.start()
+    time.sleep(0.05)
+    assert writer.is_alive()
+    assert buffer.peek(4) == bytes(range(4))
+
+    received = b''
+    while True:
+        data = buffer.read(7)
+        if not data:
+            break
+        assert len(data) <= 7
+        received += data
+    writer.join()
+    assert received == bytes(range(100))
+
+
+def test_closed_buffer_releases_the_writer():
+    buffer = ReadAheadBuffer(10)
+    result = []
+    writer = threading.Thread(target=lambda: result.append(buffer.write(bytes(100))))
+    writer.start()
+    buffer.close()
+    writer.join(1)
+    assert result == [False]
+    assert buffer.read(10) == b''
+
+
+def test_http_stream_resumes_with_range_requests(server, media_dir):
+    MediaHandler.drop_once.add('/faststart.mp4')
+    with HTTPStream(f"{server}/faststart.mp4", read_ahead_mb=1, retries=2) as stream:
+        received = b''.join(iter(lambda: stream.read(65536), b''))
+        assert stream.complete
+    assert received == (media_dir / 'faststart.mp4').read_bytes()
+
+
+def test_http_stream_reports_missing_files(server):
+    with HTTPStream(f"{server}/missing.mp4") as stream:
+        with pytest.raises(IOError):
+            stream.read()
+
+
+def test_stream_decoder_matches_local_decode(server, media_dir, monkeypatch):
+    schedule = range(3, 180, 7)
+    decoder = StreamDecoder(f"{server}/faststart.mp4")
+    assert decoder.piped
+    assert (decoder.width, decoder.height, decoder.fps) == (320, 240, 25)
+    streamed = list(decoder.read(schedule))
+    local = list(FFmpegPipeDecoder(str(media_dir / 'faststart.mp4')).read(schedule))
+
+    assert [index for index, _ in streamed] == list(schedule)
+    for (_, a), (_, b) in zip(streamed, local):
+        assert np.array_equal(a, b)
+
+    # Long explicit lists are filtered in Python rather than by ffmpeg
+    monkeypatch.setattr(decoders, '_MAX_SELECT_TERMS', 10)
+    targets = list(range(5, 190, 3)) + [197]
+    frames = dict(decoder.read(targets, size=(80, 60), gray=True))
+    assert sorted(frames) == targets
+    assert frames[197].shape == (60, 80)
+
+
+def test_decoding_starts_before_the_download_finishes(server, media_dir):
+    size = os.path.getsize(media_dir / 'slow.mp4')
+    decoder = StreamDecoder(f"{server}/slow.mp4", read_ahead_mb=0.1)
+    frames = decoder.read(range(0, 750, 10))
+    next(frames)
+    assert MediaHandler.sent['/slow.mp4'] < size
+
+    # Stopping early aborts the download
+    frames.close()
+    time.sleep(0.1)
+    sent = MediaHandler.sent['/slow.mp4']
+    time.sleep(0.2)
+    assert MediaHandler.sent['/slow.mp4'] == sent < size
+
+
+def test_moov_at_end_falls_back_to_range_requests(server):
+    decoder = StreamDecoder(f"{server}/moov_last.mp4")
+    assert not decoder.piped
+    assert [index for index, _ in decoder.read(range(0, 200, 25))] == list(range(0, 200, 25))
+
+
+def test_video_processor_streams_urls(server, tmp_path):
+    assert default_decoder(f"{server}/faststart.mp4") == 'stream'
+    processor = VideoProcessor(frames_dir=str(tmp_path))
+    written = processor.extract_frames(f"{server}/faststart.mp4", 0, 200,
+                                       {'method': 'fps', 'params': {'fps': 5}, 'output_format': 'jpg'})
+    assert len(written) == 40
+    assert all(os.path.exists(path) for path in written)
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from cortalv2i.core import video_chunker
+from cortalv2i.core.video_chunker import VideoChunker, align_to_keyframes
+from cortalv2i.utils import media_probe
+from cortalv2i.utils.media_probe import KeyframeIndex, MediaInfo, ProbeCache
+
+
+def fake_video(monkeypatch, frame_count, fps, keyframes=None):
+    info = MediaInfo(path='clip.mp4', duration=frame_count / fps, fps=fps, frame_count=frame_count,
+                     width=640, height=360)
+    monkeypatch.setattr(video_chunker, 'probe_media', lambda path: info)
+    if keyframes is None:
+        def missing(path):
+            raise FileNotFoundError('ffprobe')
+        monkeypatch.setattr(video_chunker, 'keyframe_index', missing)
+    else:
+        index = KeyframeIndex(tuple(keyframes), tuple(frame / fps for frame in keyframes), frame_count)
+        monkeypatch.setattr(video_chunker, 'keyframe_index', lambda path: index)
+
+
+def test_align_to_keyframes():
+    keyframes = [0, 250, 500, 750, 1000]
+    assert align_to_keyframes([333, 667], keyframes, 1100) == [250, 750]
+    # Targets snapping to the same keyframe are merged
+    assert align_to_keyframes([240, 260], keyframes, 1100) == [250]
+    assert align_to_keyframes([500], [0], 1100) == []
+
+
+def test_chunk_count_follows_workers():
+    chunker = VideoChunker(workers=4, min_chunk_seconds=30)
+    assert chunker.chunk_count(25 * 3600, 25) == 4
+    # Short videos get fewer, longer chunks
+    assert chunker.chunk_count(25 * 70, 25) == 2
+    assert chunker.chunk_count(25 * 10, 25) == 1
+    # chunk_minutes caps the chunk length
+    assert VideoChunker(workers=2, chunk_minutes=15).chunk_count(25 * 3600, 25) == 4
+
+
+def test_split_video_cuts_at_keyframes(monkeypatch):
+    fake_video(monkeypatch, 3000, 25, keyframes=range(0, 3000, 250))
+    chunks = VideoChunker(workers=3, min_chunk_seconds=1).split_video('clip.mp4')
+    assert chunks == [(0, 1000), (1000, 2000), (2000, 3000)]
+
+    fake_video(monkeypatch, 3000, 25, keyframes=range(0, 3000, 300))
+    chunks = VideoChunker(workers=4, min_chunk_seconds=1).split_video('clip.mp4')
+    assert chunks == [(0, 600), (600, 1500), (1500, 2100), (2100, 3000)]
+
+
+def test_split_video_without_an_index_cuts_evenly(monkeypatch):
+    fake_video(monkeypatch, 1000, 25)
+    assert VideoChunker(workers=4, min_chunk_seconds=1).split_video('clip.mp4') == [
+        (0, 250), (250, 500), (500, 750), (750, 1000)]
+
+
+@pytest.mark.ffmpeg
+def test_keyframe_index_is_cached(make_clip, tmp_path, monkeypatch):
+    path = make_clip("gop.mp4", 8, video_args=['-g', '50', '-bf', '0'], audio=None, directory=tmp_path)
+
+    calls = []
+    probe = media_probe.probe_keyframes
+    monkeypatch.setattr(media_probe, 'probe_keyframes', lambda p: calls.append(p) or probe(p))
+    cache_dir = str(tmp_path / "cache")
+    index = ProbeCache(cache_dir=cache_dir).keyframes(path)
+    assert index.frames == (0, 50, 100, 150)
+
+    # A second process reads the index back from disk
+    assert ProbeCache(cache_dir=cache_dir).keyframes(path) == index
+    assert calls == [path]
+
+    monkeypatch.setattr(media_probe, 'get_probe_cache', lambda: ProbeCache(cache_dir=cache_dir))
+    assert VideoChunker(workers=3, min_chunk_seconds=1).split_video(path) == [(0, 50), (50, 150), (150, 200)]
+
+
+def test_split_video_into_work_units(monkeypatch):
+    # 16 minutes would otherwise be one chunk per worker, each a GOP multiple
+    fake_video(monkeypatch, 25 * 960, 25, keyframes=range(0, 25 * 960, 250))
+    units = VideoChunker(workers=2, unit_seconds=60).split_video('clip.mp4')
+    assert len(units) == 16
+    assert all(start % 250 == 0 for start, _ in units)
+    assert units[0][0] == 0 and units[-1][1] == 25 * 960
+    assert all(end == start for (_, end), (start, _) in zip(units, units[1:]))
+
+    # Units shorter than a GOP collapse onto the keyframes
+    units = VideoChunker(workers=2, unit_seconds=2).split_video('clip.mp4')
+    assert units == [(start, start + 250) for start in range(0, 25 * 960, 250)]
+
+
+@pytest.mark.ffmpeg
+def test_work_units_number_frames_like_a_single_chunk(make_clip, tmp_path):
+    pytest.importorskip("cv2")
+    from cortalv2i.core.video_processor import VideoProcessor
+
+    path = make_clip("clip.mp4", 8, video_args=['-g', '30', '-bf', '0'], audio=None, directory=tmp_path)
+    config = {'method': 'fps', 'params': {'fps': 2}, 'output_format': 'jpg'}
+
+    whole = tmp_path / "whole"
+    whole.mkdir()
+    expected = VideoProcessor(frames_dir=str(whole)).extract_frames(path, 0, 200, config)
+
+    units = VideoChunker(workers=1, unit_seconds=2, min_chunk_seconds=1).split_video(path)
+    assert [start for start, _ in units] == [0, 60, 90, 150]
+    split = tmp_path / "split"
+    split.mkdir()
+    written = []
+    for start, end in units:
+        written.extend(VideoProcessor(frames_dir=str(split)).extract_frames(path, start, end, config))
+
+    names = sorted(os.path.basename(name) for name in written)
+    assert names == sorted(os.path.basename(name) for name in expected)
+    assert names[:3] == ['frame_000000.jpg', 'frame_000012.jpg', 'frame_000024.jpg']